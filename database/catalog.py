@@ -0,0 +1,167 @@
+"""
+Caché de catálogos - Servicios, precios y lavadores en memoria
+Son tablas pequeñas que cambian poco: se leen una vez y se sirven desde memoria.
+Al vencer el TTL, una consulta de versión (conteo y MAX(actualizado_en) de cada
+tabla) decide si hay que recargar, lo que cubre cambios hechos desde otras
+terminales. Los módulos que modifican catálogos llaman a invalidate().
+"""
+
+import threading
+import time
+
+from database.db_config import db, env_vars
+
+
+class CatalogCache:
+    """Catálogo de servicios, precios y lavadores con TTL e invalidación"""
+    
+    VERSION_QUERY = """
+        SELECT
+            (SELECT COUNT(*) FROM servicios) as servicios,
+            (SELECT MAX(actualizado_en) FROM servicios) as servicios_actualizado,
+            (SELECT COUNT(*) FROM servicio_precios) as precios,
+            (SELECT MAX(actualizado_en) FROM servicio_precios) as precios_actualizado,
+            (SELECT COUNT(*) FROM lavadores) as lavadores,
+            (SELECT MAX(actualizado_en) FROM lavadores) as lavadores_actualizado
+    """
+    
+    SERVICES_QUERY = "SELECT id, nombre, descripcion FROM servicios"
+    
+    PRICES_QUERY = """
+        SELECT id_servicio, tipo_vehiculo, precio
+        FROM servicio_precios
+        WHERE activo = 1
+    """
+    
+    LAVADORES_QUERY = """
+        SELECT id, TRIM(CONCAT(nombre, ' ', apellido)) as nombre_completo, activo
+        FROM lavadores
+        ORDER BY nombre, apellido
+    """
+    
+    VEHICLE_ORDER = ['motorcycle', 'car', 'pickup', 'suv', 'truck']
+    
+    def __init__(self, db_connection, ttl=60):
+        self.db = db_connection
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = None
+        self._version = None
+        self._checked_at = 0.0
+        # Cambia con cada invalidate(): una carga que empezó antes no se publica
+        self._generation = 0
+    
+    def invalidate(self):
+        """Descartar el catálogo; la próxima lectura lo recarga"""
+        with self._lock:
+            self._data = None
+            self._version = None
+            self._generation += 1
+    
+    def services_for_vehicle(self, vehicle_type):
+        """Servicios con precio activo para un tipo de vehículo, del más barato al más caro"""
+        return list(self._get()['by_vehicle'].get(vehicle_type, []))
+    
+    def prices_for_service(self, service_id):
+        """Precios activos de un servicio por tipo de vehículo"""
+        return dict(self._get()['by_service'].get(int(service_id), {}))
+    
+    def price_matrix(self):
+        """Filas servicio × tipo de vehículo con precio activo, ordenadas por servicio"""
+        return list(self._get()['matrix'])
+    
+    def lavadores(self, include_ids=()):
+        """Lavadores activos, más los inactivos cuyo id esté en include_ids"""
+        return [
+            lavador for lavador in self._get()['lavadores']
+            if lavador['activo'] or lavador['id'] in include_ids
+        ]
+    
+    def _get(self):
+        """Devolver el catálogo vigente, verificando la versión si venció el TTL
+        
+        Las consultas corren sin el candado, que solo protege la lectura y la
+        publicación del snapshot: un hilo esperando a MySQL no bloquea al
+        hilo de Tk mientras el catálogo en memoria siga vigente.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._data is not None and now - self._checked_at < self.ttl:
+                return self._data
+            data, known_version, generation = self._data, self._version, self._generation
+        
+        version = self._fetch_version()
+        if version is None and data is not None:
+            # Sin conexión: seguir con el catálogo conocido hasta el próximo TTL
+            with self._lock:
+                if self._generation == generation:
+                    self._checked_at = now
+            return data
+        
+        if data is None or version != known_version:
+            data = self._load()
+        
+        with self._lock:
+            # Si se invalidó durante la carga, lo leído se entrega pero no se
+            # guarda: puede ser anterior al cambio que provocó la invalidación
+            if self._generation == generation:
+                self._data = data
+                self._version = version
+                self._checked_at = now
+        return data
+    
+    def _fetch_version(self):
+        """Firma barata del contenido de los catálogos"""
+        result = self.db.execute_query(self.VERSION_QUERY)
+        return tuple(result[0].values()) if result else None
+    
+    def _load(self):
+        """Leer los catálogos completos y armar los índices en memoria"""
+        services = self.db.execute_query(self.SERVICES_QUERY)
+        prices = self.db.execute_query(self.PRICES_QUERY)
+        lavadores = self.db.execute_query(self.LAVADORES_QUERY)
+        if services is None or prices is None or lavadores is None:
+            raise RuntimeError("No se pudo cargar el catálogo de servicios y lavadores")
+        
+        services_by_id = {service['id']: service for service in services}
+        by_vehicle = {}
+        by_service = {}
+        matrix = []
+        
+        for price in prices:
+            service = services_by_id.get(price['id_servicio'])
+            if not service:
+                continue
+            
+            by_service.setdefault(service['id'], {})[price['tipo_vehiculo']] = price['precio']
+            by_vehicle.setdefault(price['tipo_vehiculo'], []).append({
+                'id': service['id'],
+                'nombre': service['nombre'],
+                'descripcion': service['descripcion'],
+                'precio': price['precio'],
+                'precio_formato': f"${price['precio']:,.0f}"
+            })
+            matrix.append({
+                'servicio_id': service['id'],
+                'servicio_nombre': service['nombre'],
+                'descripcion': service['descripcion'],
+                'tipo_vehiculo': price['tipo_vehiculo'],
+                'precio': price['precio']
+            })
+        
+        for vehicle_services in by_vehicle.values():
+            vehicle_services.sort(key=lambda service: service['precio'])
+        
+        vehicle_rank = {vehicle: i for i, vehicle in enumerate(self.VEHICLE_ORDER)}
+        matrix.sort(key=lambda row: (row['servicio_id'], vehicle_rank.get(row['tipo_vehiculo'], len(vehicle_rank))))
+        
+        return {
+            'by_vehicle': by_vehicle,
+            'by_service': by_service,
+            'matrix': matrix,
+            'lavadores': lavadores
+        }
+
+
+# Instancia global del catálogo
+catalog = CatalogCache(db, ttl=float(env_vars.get('CATALOG_TTL', 60)))
@@ -0,0 +1,203 @@
+"""
+Resumen diario - Tabla de agregados mantenida incrementalmente
+Una fila por fecha × lavador × servicio × vehículo × estado de pago
+
+Uso para reconstruir la tabla completa:
+    python database/daily_summary.py
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mysql.connector import Error
+from database.db_config import db
+from database.materialized import MaterializedColumns
+
+
+class DailySummary:
+    """Mantiene la tabla resumen_diario sincronizada con registros"""
+    
+    # Las columnas de la llave son NOT NULL porque MySQL no agrupa NULL en llaves únicas
+    CREATE_TABLE = """
+        CREATE TABLE IF NOT EXISTS resumen_diario (
+            fecha DATE NOT NULL,
+            id_lavador INT NOT NULL DEFAULT 0,
+            id_servicio INT NOT NULL DEFAULT 0,
+            vehiculo VARCHAR(50) NOT NULL DEFAULT '',
+            pago VARCHAR(20) NOT NULL DEFAULT '',
+            cantidad INT NOT NULL DEFAULT 0,
+            total_costo DECIMAL(14,2) NOT NULL DEFAULT 0,
+            total_comision DECIMAL(14,2) NOT NULL DEFAULT 0,
+            total_ganancia DECIMAL(14,2) NOT NULL DEFAULT 0,
+            PRIMARY KEY (fecha, id_lavador, id_servicio, vehiculo, pago),
+            KEY idx_resumen_lavador (id_lavador, fecha)
+        )
+    """
+    
+    # Agregado de registros con el signo (+1 / -1) aplicado a cada total. Comisión
+    # y ganancia suman el mismo valor redondeado por registro que las columnas
+    # materializadas, para que el resumen coincida con la suma de las filas
+    AGGREGATE_SELECT = f"""
+        SELECT
+            fecha,
+            COALESCE(id_lavador, 0),
+            COALESCE(id_servicio, 0),
+            COALESCE(vehiculo, ''),
+            COALESCE(pago, ''),
+            %s * COUNT(*),
+            %s * COALESCE(SUM(costo), 0),
+            %s * COALESCE(SUM({MaterializedColumns.DEFINITIONS['comision_calculada']}), 0),
+            %s * COALESCE(SUM({MaterializedColumns.DEFINITIONS['ganancia_neta']}), 0)
+        FROM registros r
+        WHERE {{where}}
+        GROUP BY fecha, COALESCE(id_lavador, 0), COALESCE(id_servicio, 0),
+            COALESCE(vehiculo, ''), COALESCE(pago, '')
+    """
+    
+    INSERT_PREFIX = """
+        INSERT INTO resumen_diario
+        (fecha, id_lavador, id_servicio, vehiculo, pago,
+         cantidad, total_costo, total_comision, total_ganancia)
+    """
+    
+    UPSERT_SUFFIX = """
+        ON DUPLICATE KEY UPDATE
+            cantidad = cantidad + VALUES(cantidad),
+            total_costo = total_costo + VALUES(total_costo),
+            total_comision = total_comision + VALUES(total_comision),
+            total_ganancia = total_ganancia + VALUES(total_ganancia)
+    """
+    
+    def __init__(self, db_connection):
+        self.db = db_connection
+    
+    def ensure_table(self, populate=True):
+        """Crear la tabla si no existe y poblarla la primera vez"""
+        try:
+            existing = self.db.execute_query("SHOW TABLES LIKE 'resumen_diario'")
+            if existing is None:
+                return False
+            if existing:
+                return True
+            
+            with self.db.transaction() as cursor:
+                cursor.execute(self.CREATE_TABLE)
+            print("🆕 Tabla resumen_diario creada")
+            return self.rebuild() if populate else True
+        
+        except Error as e:
+            print(f"❌ Error creando resumen_diario: {e}")
+            return False
+    
+    def rebuild(self, start_date=None, end_date=None):
+        """Recalcular el resumen desde registros (todo o un rango de fechas)"""
+        if start_date and end_date:
+            where = "fecha BETWEEN %s AND %s"
+            range_params = (start_date, end_date)
+        else:
+            where = "1 = 1"
+            range_params = ()
+        
+        try:
+            with self.db.transaction() as cursor:
+                rows = self.populate(cursor, where, range_params)
+            print(f"✅ resumen_diario reconstruido ({rows} filas)")
+            return True
+        
+        except Error as e:
+            print(f"❌ Error reconstruyendo resumen_diario: {e}")
+            return False
+    
+    def recreate(self, cursor):
+        """Volver a crear la tabla con la definición actual y poblarla"""
+        cursor.execute("DROP TABLE IF EXISTS resumen_diario")
+        cursor.execute(self.CREATE_TABLE)
+        return self.populate(cursor)
+    
+    def populate(self, cursor, where="1 = 1", params=()):
+        """Reemplazar los grupos que cumplen where con el agregado de registros"""
+        cursor.execute(f"DELETE FROM resumen_diario WHERE {where}", params or None)
+        cursor.execute(
+            self.INSERT_PREFIX + self.AGGREGATE_SELECT.format(where=where),
+            (1, 1, 1, 1) + tuple(params)
+        )
+        return cursor.rowcount
+    
+    def add(self, cursor, registro_ids):
+        """Sumar al resumen el aporte de los registros indicados"""
+        self._apply(cursor, registro_ids, 1)
+    
+    def subtract(self, cursor, registro_ids):
+        """Restar del resumen el aporte de los registros indicados"""
+        self._apply(cursor, registro_ids, -1)
+        
+        # Eliminar grupos que quedaron vacíos en las fechas afectadas
+        placeholders = ', '.join(['%s'] * len(registro_ids))
+        cursor.execute(f"""
+            DELETE FROM resumen_diario
+            WHERE cantidad <= 0
+            AND fecha IN (SELECT fecha FROM registros WHERE id IN ({placeholders}))
+        """, tuple(registro_ids))
+    
+    def insert_registros(self, cursor, query, rows):
+        """Insertar un lote con executemany dentro de una transacción abierta y
+        recalcular el resumen de sus fechas"""
+        cursor.executemany(query, rows)
+        inserted = cursor.rowcount
+        # Los id de un INSERT múltiple no son necesariamente consecutivos:
+        # se reagregan los días afectados en lugar de sumar por id
+        fechas = sorted({str(row['fecha']) for row in rows})
+        placeholders = ', '.join(['%s'] * len(fechas))
+        self.populate(cursor, f"fecha IN ({placeholders})", fechas)
+        return inserted
+    
+    def apply_update(self, cursor, registro_id, query, params):
+        """Ejecutar el UPDATE de un registro dentro de una transacción abierta"""
+        self.subtract(cursor, [registro_id])
+        cursor.execute(query, params)
+        rowcount = cursor.rowcount
+        self.add(cursor, [registro_id])
+        return rowcount
+    
+    def apply_delete(self, cursor, registro_id):
+        """Ejecutar el DELETE de un registro dentro de una transacción abierta"""
+        self.subtract(cursor, [registro_id])
+        cursor.execute("DELETE FROM registros WHERE id = %s", (registro_id,))
+        return cursor.rowcount
+    
+    def day_totals(self, fecha):
+        """Totales del día (todos los estados de pago) para el cierre de caja"""
+        return self.db.execute_query("""
+            SELECT
+                CAST(COALESCE(SUM(cantidad), 0) AS SIGNED) as total_servicios,
+                COALESCE(SUM(total_costo), 0) as total_ingresos,
+                COALESCE(SUM(total_comision), 0) as total_comisiones,
+                COALESCE(SUM(total_ganancia), 0) as balance_neto
+            FROM resumen_diario
+            WHERE fecha = %s
+        """, (fecha,))
+    
+    def _apply(self, cursor, registro_ids, sign):
+        """Aplicar al resumen el aporte de los registros con el signo indicado"""
+        if not registro_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(registro_ids))
+        query = (
+            self.INSERT_PREFIX
+            + self.AGGREGATE_SELECT.format(where=f"id IN ({placeholders})")
+            + self.UPSERT_SUFFIX
+        )
+        cursor.execute(query, (sign, sign, sign, sign) + tuple(registro_ids))
+
+
+# Instancia global del resumen diario
+daily_summary = DailySummary(db)
+
+
+if __name__ == "__main__":
+    if db.connect():
+        if daily_summary.ensure_table(populate=False):
+            daily_summary.rebuild()
+        db.disconnect()
@@ -1,6 +1,11 @@
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, errors
+from contextlib import contextmanager
 import os
+import queue
+import socket
+import threading
+import time
 
 # Función para cargar variables de entorno manualmente (sin python-dotenv)
 def load_env_manual():
@@ -17,21 +22,142 @@ def load_env_manual():
 # Cargar variables de entorno
 env_vars = load_env_manual()
 
+class ConnectionPool:
+    """Pool de conexiones MySQL con préstamo/devolución y chequeo de salud por intervalo"""
+    
+    def __init__(self, size, health_check_interval, checkout_timeout, connect_timeout=None, **connect_args):
+        self.size = max(1, size)
+        self.health_check_interval = health_check_interval
+        self.checkout_timeout = checkout_timeout
+        self.connect_timeout = connect_timeout
+        self.connect_args = connect_args
+        # LIFO: se reutiliza primero la conexión usada más recientemente
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._all = set()
+    
+    def acquire(self):
+        """Prestar una conexión del pool (bloquea hasta checkout_timeout si está agotado)"""
+        if not self._slots.acquire(timeout=self.checkout_timeout):
+            raise errors.PoolError("Pool de conexiones agotado")
+        
+        try:
+            while True:
+                try:
+                    connection, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._open()
+                
+                # Solo se hace ping si la conexión estuvo ociosa más del intervalo
+                idle_time = time.monotonic() - last_used
+                if idle_time < self.health_check_interval or connection.is_connected():
+                    return connection
+                
+                self._discard(connection)
+        except Exception:
+            self._slots.release()
+            raise
+    
+    def release(self, connection, broken=False):
+        """Devolver una conexión al pool; las conexiones rotas se descartan"""
+        with self._lock:
+            # Conexiones cerradas por close_all() mientras estaban prestadas
+            broken = broken or connection not in self._all
+        try:
+            if broken:
+                self._discard(connection)
+            else:
+                self._idle.put((connection, time.monotonic()))
+        finally:
+            self._slots.release()
+    
+    def close_all(self):
+        """Cerrar las conexiones ociosas y olvidar las prestadas
+        
+        Las prestadas no se cierran mientras otro hilo las usa: al salir de
+        _all, release() las descarta cuando se devuelven.
+        """
+        idle = []
+        with self._lock:
+            while True:
+                try:
+                    idle.append(self._idle.get_nowait()[0])
+                except queue.Empty:
+                    break
+            self._all.clear()
+        for connection in idle:
+            try:
+                connection.close()
+            except Error:
+                pass
+    
+    def _open(self):
+        """Abrir una conexión nueva"""
+        if self.connect_timeout:
+            # Si el servidor cae a mitad de sesión, reconectar falla en
+            # connect_timeout y no en el timeout TCP del sistema. Se verifica con
+            # un socket aparte: connection_timeout quedaría como timeout de cada consulta
+            address = (self.connect_args.get('host'), self.connect_args.get('port'))
+            try:
+                socket.create_connection(address, self.connect_timeout).close()
+            except OSError as e:
+                raise errors.InterfaceError(
+                    msg=f"No se pudo conectar a {address[0]}:{address[1]} ({e})", errno=2003
+                )
+        
+        connection = mysql.connector.connect(**self.connect_args)
+        with self._lock:
+            self._all.add(connection)
+        return connection
+    
+    def _discard(self, connection):
+        """Cerrar una conexión y sacarla del registro del pool"""
+        with self._lock:
+            self._all.discard(connection)
+        try:
+            connection.close()
+        except Error:
+            pass
+
+
 class DatabaseConfig:
     """Configuración y manejo de conexión a MySQL"""
     
+    # Errores que indican que la conexión ya no es utilizable
+    CONNECTION_ERRORS = (errors.OperationalError, errors.InterfaceError)
+    
     def __init__(self):
         self.host = env_vars.get('DB_HOST', 'localhost')
         self.user = env_vars.get('DB_USER', 'root')
         self.password = env_vars.get('DB_PASS', '')
         self.database = env_vars.get('DB_NAME', 'lavadero_db')
         self.port = int(env_vars.get('DB_PORT', 3306))
-        self.connection = None
+        self.pool_size = int(env_vars.get('DB_POOL_SIZE', 5))
+        self.pool_timeout = float(env_vars.get('DB_POOL_TIMEOUT', 10))
+        self.health_check_interval = float(env_vars.get('DB_HEALTH_CHECK_INTERVAL', 30))
+        self.connect_timeout = float(env_vars.get('DB_CONNECT_TIMEOUT', 5))
+        self.pool = None
+        # Pool que prestó cada conexión: tras reconectar, las prestadas por el
+        # pool anterior se le devuelven a él y no al nuevo
+        self._lenders = {}
+        # Protege la creación del pool y _lenders, que usan todos los hilos
+        # del executor de segundo plano
+        self._lock = threading.Lock()
     
     def connect(self):
-        """Establecer conexión con la base de datos"""
+        """Verificar que el servidor responde (en connect_timeout segundos) y crear el pool"""
+        with self._lock:
+            return self._connect()
+    
+    def _connect(self):
+        """Cuerpo de connect(); llamar con el candado tomado"""
         try:
-            self.connection = mysql.connector.connect(
+            if self.pool:
+                self.pool.close_all()
+                self.pool = None
+            
+            connect_args = dict(
                 host=self.host,
                 user=self.user,
                 password=self.password,
@@ -41,59 +167,161 @@ class DatabaseConfig:
                 autocommit=True
             )
             
-            if self.connection.is_connected():
-                print("✅ Conexión exitosa a MySQL")
-                return True
+            # Un host caído o inalcanzable falla en connect_timeout y no en el
+            # timeout TCP del sistema. La prueba usa su propia conexión porque
+            # el conector en Python puro deja ese valor como timeout de cada
+            # consulta, y las del pool no deben cortarse a los pocos segundos;
+            # el pool acota sus reconexiones con su propio chequeo (ver _open)
+            probe = mysql.connector.connect(connection_timeout=self.connect_timeout, **connect_args)
+            probe.close()
+            
+            self.pool = ConnectionPool(
+                self.pool_size,
+                self.health_check_interval,
+                self.pool_timeout,
+                connect_timeout=self.connect_timeout,
+                **connect_args
+            )
+            print(f"✅ Conexión exitosa a MySQL (pool de {self.pool.size} conexiones)")
+            return True
                 
         except Error as e:
             print(f"❌ Error conectando a MySQL: {e}")
+            self.pool = None
             return False
     
+    @property
+    def ready(self):
+        """Indica si hay un pool creado contra un servidor que respondió"""
+        return self.pool is not None
+    
     def disconnect(self):
-        """Cerrar conexión con la base de datos"""
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
-            print("🔌 Conexión MySQL cerrada")
+        """Cerrar todas las conexiones del pool"""
+        with self._lock:
+            pool, self.pool = self.pool, None
+        if pool:
+            pool.close_all()
+            print("🔌 Conexiones MySQL cerradas")
     
     def get_connection(self):
-        """Obtener la conexión actual o crear una nueva"""
-        if not self.connection or not self.connection.is_connected():
-            self.connect()
-        return self.connection
+        """Prestar una conexión del pool; devolver con release_connection()"""
+        pool = self.pool
+        if not pool:
+            # Varios hilos pueden llegar sin pool a la vez: solo el primero
+            # lo crea y los demás usan ese mismo
+            with self._lock:
+                if not self.pool:
+                    self._connect()
+                pool = self.pool
+        if not pool:
+            raise errors.InterfaceError("No hay conexión con la base de datos")
+        
+        connection = pool.acquire()
+        with self._lock:
+            self._lenders[connection] = pool
+        return connection
+    
+    def release_connection(self, connection, broken=False):
+        """Devolver una conexión obtenida con get_connection() al pool que la prestó"""
+        with self._lock:
+            pool = self._lenders.pop(connection, None)
+        if pool:
+            pool.release(connection, broken)
+        else:
+            connection.close()
+    
+    @contextmanager
+    def connection(self):
+        """Context manager que presta una conexión y la devuelve al terminar"""
+        connection = self.get_connection()
+        broken = False
+        try:
+            yield connection
+        except self.CONNECTION_ERRORS:
+            broken = True
+            raise
+        finally:
+            self.release_connection(connection, broken)
+    
+    @contextmanager
+    def transaction(self):
+        """Context manager que entrega un cursor y confirma todo al salir (o revierte si falla)"""
+        with self.connection() as connection:
+            cursor = connection.cursor(dictionary=True)
+            try:
+                connection.start_transaction()
+                yield cursor
+                connection.commit()
+            except Exception:
+                try:
+                    connection.rollback()
+                except Error:
+                    pass
+                raise
+            finally:
+                cursor.close()
     
     def execute_query(self, query, params=None):
         """Ejecutar consulta SELECT"""
         try:
-            connection = self.get_connection()
-            cursor = connection.cursor(dictionary=True)
-            
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
-                
-            result = cursor.fetchall()
-            cursor.close()
-            return result
+            with self.connection() as connection:
+                cursor = connection.cursor(dictionary=True)
+                try:
+                    if params:
+                        cursor.execute(query, params)
+                    else:
+                        cursor.execute(query)
+                    
+                    return cursor.fetchall()
+                finally:
+                    cursor.close()
             
         except Error as e:
             print(f"❌ Error ejecutando consulta: {e}")
             return None
     
-    def execute_insert(self, query, params=None):
-        """Ejecutar consulta INSERT"""
+    def stream_query(self, query, params=None, batch_size=1000):
+        """Iterar un SELECT por lotes con un cursor sin buffer (lado del servidor)
+        
+        Si se deja de iterar antes del final, la conexión se descarta porque
+        aún tiene filas sin leer.
+        """
+        connection = self.get_connection()
+        cursor = None
+        finished = False
         try:
-            connection = self.get_connection()
-            cursor = connection.cursor()
-            
+            cursor = connection.cursor(dictionary=True, buffered=False)
             if params:
                 cursor.execute(query, params)
             else:
                 cursor.execute(query)
-                
-            last_id = cursor.lastrowid
-            cursor.close()
-            return last_id
+            
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+            
+            finished = True
+        finally:
+            if cursor is not None and finished:
+                cursor.close()
+            self.release_connection(connection, broken=not finished)
+    
+    def execute_insert(self, query, params=None):
+        """Ejecutar consulta INSERT"""
+        try:
+            with self.connection() as connection:
+                cursor = connection.cursor()
+                try:
+                    if params:
+                        cursor.execute(query, params)
+                    else:
+                        cursor.execute(query)
+                    
+                    return cursor.lastrowid
+                finally:
+                    cursor.close()
             
         except Error as e:
             print(f"❌ Error en INSERT: {e}")
@@ -102,17 +330,17 @@ class DatabaseConfig:
     def execute_update(self, query, params=None):
         """Ejecutar consulta UPDATE o DELETE"""
         try:
-            connection = self.get_connection()
-            cursor = connection.cursor()
-            
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
-                
-            affected_rows = cursor.rowcount
-            cursor.close()
-            return affected_rows
+            with self.connection() as connection:
+                cursor = connection.cursor()
+                try:
+                    if params:
+                        cursor.execute(query, params)
+                    else:
+                        cursor.execute(query)
+                    
+                    return cursor.rowcount
+                finally:
+                    cursor.close()
             
         except Error as e:
             print(f"❌ Error en UPDATE/DELETE: {e}")
@@ -0,0 +1,289 @@
+"""
+Diario local de operaciones - Escritura anticipada en SQLite
+Registros nuevos, ediciones y eliminaciones que no llegan a MySQL se guardan
+primero en un archivo SQLite local (WAL con synchronous=FULL: cada operación
+queda en disco antes de confirmarse) y se reenvían en orden al volver la
+conexión. Cada operación lleva un uuid: los INSERT lo guardan en registros.uuid,
+así que reenviar una operación que ya se aplicó no la duplica.
+
+Uso para ver o reenviar las operaciones pendientes:
+    python database/journal.py [--replay]
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+import uuid
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mysql.connector import Error, errors
+from database.db_config import db, env_vars, DatabaseConfig
+from database.daily_summary import daily_summary
+from database.plate_summary import plate_summary
+from database.plates import plate_index
+from database.replica import replica
+
+
+# Los montos y nombres materializados llegan calculados desde el formulario
+REGISTRO_INSERT = """
+    INSERT INTO registros
+    (uuid, fecha, hora, vehiculo, vehiculo_nombre, placa, id_servicio, servicio_nombre,
+     costo, porcentaje, comision_calculada, ganancia_neta, id_lavador, lavador_nombre,
+     observaciones, pago, id_usuario, usuario_nombre)
+    VALUES (%(uuid)s, %(fecha)s, %(hora)s, %(vehiculo)s, %(vehiculo_nombre)s, %(placa)s,
+            %(id_servicio)s, %(servicio_nombre)s, %(costo)s, %(porcentaje)s,
+            %(comision_calculada)s, %(ganancia_neta)s, %(id_lavador)s, %(lavador_nombre)s,
+            %(observaciones)s, %(pago)s, %(id_usuario)s, %(usuario_nombre)s)
+    ON DUPLICATE KEY UPDATE id = id
+"""
+
+REGISTRO_UPDATE = """
+    UPDATE registros
+    SET fecha = %(fecha)s, hora = %(hora)s, vehiculo = %(vehiculo)s,
+        vehiculo_nombre = %(vehiculo_nombre)s, placa = %(placa)s, costo = %(costo)s,
+        porcentaje = %(porcentaje)s, comision_calculada = %(comision_calculada)s,
+        ganancia_neta = %(ganancia_neta)s, id_lavador = %(id_lavador)s,
+        lavador_nombre = %(lavador_nombre)s, observaciones = %(observaciones)s, pago = %(pago)s
+    WHERE id = %(id)s
+"""
+
+# Errores por los que vale la pena conservar la operación y reintentar
+RETRY_ERRORS = DatabaseConfig.CONNECTION_ERRORS + (errors.PoolError,)
+
+# Resultado de submit()
+APLICADA = 'aplicada'
+PENDIENTE = 'pendiente'
+
+DEFAULT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'diario_local.sqlite3'
+)
+
+
+def is_retryable(error):
+    """Indica si el error es de conexión y la operación debe quedar en el diario"""
+    if isinstance(error, RETRY_ERRORS):
+        return True
+    # 2000-2999: errores del cliente MySQL (servidor caído, conexión perdida, ...)
+    return bool(getattr(error, 'errno', None)) and 2000 <= error.errno < 3000
+
+
+class OfflineJournal:
+    """Cola durable de operaciones sobre registros pendientes de enviar a MySQL"""
+    
+    CREATE_TABLE = """
+        CREATE TABLE IF NOT EXISTS operaciones (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            uuid TEXT NOT NULL UNIQUE,
+            tipo TEXT NOT NULL CHECK (tipo IN ('insert', 'update', 'delete')),
+            registro_id INTEGER,
+            datos TEXT NOT NULL,
+            estado TEXT NOT NULL DEFAULT 'pendiente',
+            error TEXT,
+            creado_en TEXT NOT NULL
+        )
+    """
+    
+    # Inserciones consecutivas que se envían en un solo executemany
+    MAX_BATCH = 200
+    
+    def __init__(self, db_connection, path=DEFAULT_PATH):
+        self.db = db_connection
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+    
+    def _connection(self):
+        """Abrir el archivo del diario la primera vez que se usa"""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            # FULL: el WAL se sincroniza a disco (fsync) en cada commit
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.execute(self.CREATE_TABLE)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+    
+    def append(self, tipo, datos, registro_id=None, op_uuid=None):
+        """Guardar una operación en el diario y devolver su uuid"""
+        op_uuid = op_uuid or str(uuid.uuid4())
+        if tipo == 'insert':
+            datos = dict(datos, uuid=op_uuid)
+        
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "INSERT INTO operaciones (uuid, tipo, registro_id, datos, creado_en) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (op_uuid, tipo, registro_id, json.dumps(datos, default=str),
+                     datetime.now().isoformat(timespec='seconds'))
+                )
+        return op_uuid
+    
+    def pending(self):
+        """Operaciones pendientes en el orden en que se hicieron"""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT seq, uuid, tipo, registro_id, datos FROM operaciones "
+                "WHERE estado = 'pendiente' ORDER BY seq"
+            ).fetchall()
+        return [dict(row, datos=json.loads(row['datos'])) for row in rows]
+    
+    def count(self, estado='pendiente'):
+        """Cantidad de operaciones en el estado indicado"""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT COUNT(*) FROM operaciones WHERE estado = ?", (estado,)
+            ).fetchone()
+        return row[0]
+    
+    def status(self, op_uuid):
+        """Estado de una operación agregada con append(): PENDIENTE, 'rechazada'
+        o APLICADA si ya salió del diario"""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT estado FROM operaciones WHERE uuid = ?", (op_uuid,)
+            ).fetchone()
+        return row['estado'] if row else APLICADA
+    
+    def submit(self, tipo, datos, registro_id=None):
+        """Aplicar una operación en MySQL o, sin conexión, dejarla en el diario
+        
+        Devuelve APLICADA, PENDIENTE o None si MySQL la rechazó. Mientras haya
+        operaciones pendientes las nuevas se encolan detrás para no alterar el orden.
+        """
+        if self.count():
+            self.append(tipo, datos, registro_id)
+            return PENDIENTE
+        
+        op_uuid = str(uuid.uuid4())
+        op = {'uuid': op_uuid, 'tipo': tipo, 'registro_id': registro_id, 'datos': datos}
+        if tipo == 'insert':
+            op['datos'] = dict(datos, uuid=op_uuid)
+        
+        try:
+            self._apply([op])
+            return APLICADA
+        except Error as e:
+            if not is_retryable(e):
+                print(f"❌ Operación {tipo} rechazada: {e}")
+                return None
+            # Mismo uuid: si el commit sí llegó, el reenvío no duplica el registro
+            print(f"🔌 Sin conexión, operación {tipo} guardada en el diario local: {e}")
+            self.append(tipo, datos, registro_id, op_uuid=op_uuid)
+            return PENDIENTE
+    
+    def replay(self):
+        """Reenviar a MySQL las operaciones pendientes, en orden
+        
+        Devuelve (aplicadas, rechazadas). Ante un error de conexión se detiene y
+        propaga la excepción; lo ya aplicado sale del diario y el resto queda.
+        """
+        applied = rejected = 0
+        for group in self._groups(self.pending()):
+            try:
+                self._apply(group)
+                self._finish(group)
+                applied += len(group)
+                continue
+            except Error as e:
+                if is_retryable(e):
+                    raise
+                if len(group) == 1:
+                    self._reject(group[0], e)
+                    rejected += 1
+                    continue
+            
+            # Una operación inválida no debe bloquear al resto del lote
+            for op in group:
+                try:
+                    self._apply([op])
+                    self._finish([op])
+                    applied += 1
+                except Error as e:
+                    if is_retryable(e):
+                        raise
+                    self._reject(op, e)
+                    rejected += 1
+        
+        return applied, rejected
+    
+    def _groups(self, ops):
+        """Agrupar inserciones consecutivas; ediciones y eliminaciones van solas"""
+        group = []
+        for op in ops:
+            if group and (op['tipo'] != 'insert' or group[0]['tipo'] != 'insert'
+                          or len(group) >= self.MAX_BATCH):
+                yield group
+                group = []
+            group.append(op)
+        if group:
+            yield group
+    
+    def _apply(self, group):
+        """Ejecutar en MySQL un grupo de operaciones del mismo tipo"""
+        tipo = group[0]['tipo']
+        op = group[0]
+        with self.db.transaction() as cursor:
+            if tipo == 'insert':
+                daily_summary.insert_registros(cursor, REGISTRO_INSERT, [op['datos'] for op in group])
+                placas = [op['datos'].get('placa') for op in group]
+            else:
+                # La edición puede cambiar la placa: se recalculan la anterior y la nueva
+                placas = plate_summary.plates_of(cursor, [op['registro_id']])
+                if tipo == 'update':
+                    params = dict(op['datos'], id=op['registro_id'])
+                    daily_summary.apply_update(cursor, op['registro_id'], REGISTRO_UPDATE, params)
+                    placas.append(op['datos'].get('placa'))
+                else:
+                    daily_summary.apply_delete(cursor, op['registro_id'])
+            plate_summary.refresh(cursor, [placa for placa in placas if placa])
+        
+        replica.mark_stale()
+        plate_summary.invalidate([placa for placa in placas if placa])
+        for placa in placas:
+            plate_index.add(placa)
+    
+    def _finish(self, group):
+        """Quitar del diario las operaciones ya aplicadas"""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany(
+                    "DELETE FROM operaciones WHERE uuid = ?", [(op['uuid'],) for op in group]
+                )
+    
+    def _reject(self, op, error):
+        """Apartar una operación que MySQL no acepta (se conserva para revisión)"""
+        print(f"❌ Operación {op['tipo']} rechazada ({op['datos'].get('placa') or 'sin placa'}): {error}")
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "UPDATE operaciones SET estado = 'rechazada', error = ? WHERE uuid = ?",
+                    (str(error), op['uuid'])
+                )
+
+
+# Instancia global del diario local
+journal = OfflineJournal(db, env_vars.get('JOURNAL_PATH', DEFAULT_PATH))
+
+
+if __name__ == "__main__":
+    print(f"📒 {journal.path}")
+    print(f"   Pendientes: {journal.count()}  ·  Rechazadas: {journal.count('rechazada')}")
+    
+    if '--replay' in sys.argv and db.connect():
+        try:
+            applied, rejected = journal.replay()
+            print(f"✅ Reenviadas: {applied}  ·  Rechazadas: {rejected}")
+        except Error as e:
+            print(f"🔌 No se pudo reenviar el diario: {e}")
+        db.disconnect()
@@ -0,0 +1,144 @@
+"""
+Columnas materializadas de registros
+Comisión, ganancia neta y los nombres de vehículo, servicio, lavador y usuario
+se guardan en la misma fila al escribir, de modo que vista_registros_completos
+lee una sola tabla. El verificador compara lo guardado con la definición
+original basada en joins y puede reparar las diferencias.
+
+Uso para verificar (y reparar con --fix):
+    python database/materialized.py [--fix]
+"""
+
+import os
+import sys
+from decimal import Decimal, ROUND_HALF_UP
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mysql.connector import Error
+from database.db_config import db
+
+
+VEHICLE_NAMES = {
+    'motorcycle': 'Motocicleta',
+    'car': 'Automóvil',
+    'pickup': 'Camioneta',
+    'suv': 'SUV',
+    'truck': 'Camión'
+}
+
+CENT = Decimal('0.01')
+
+
+def _decimal(value):
+    """Valor como lo guarda una columna DECIMAL(…, 2)"""
+    return Decimal(str(value)).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def calculated_fields(costo, porcentaje, vehiculo):
+    """Comisión, ganancia y nombre del vehículo con el mismo redondeo que MySQL"""
+    costo = _decimal(costo or 0)
+    porcentaje = _decimal(porcentaje or 0)
+    return {
+        'comision_calculada': str((costo * porcentaje / 100).quantize(CENT, rounding=ROUND_HALF_UP)),
+        'ganancia_neta': str((costo * (100 - porcentaje) / 100).quantize(CENT, rounding=ROUND_HALF_UP)),
+        'vehiculo_nombre': VEHICLE_NAMES.get(vehiculo)
+    }
+
+
+class MaterializedColumns:
+    """Mantiene y verifica las columnas calculadas de registros"""
+    
+    # Definición de referencia de cada columna (la que antes calculaba la vista)
+    DEFINITIONS = {
+        'comision_calculada': "ROUND(r.costo * r.porcentaje / 100, 2)",
+        'ganancia_neta': "ROUND(r.costo * (100 - r.porcentaje) / 100, 2)",
+        'vehiculo_nombre': "CASE r.vehiculo " + " ".join(
+            f"WHEN '{value}' THEN '{name}'" for value, name in VEHICLE_NAMES.items()
+        ) + " END",
+        'servicio_nombre': "s.nombre",
+        'lavador_nombre': "TRIM(CONCAT(l.nombre, ' ', l.apellido))",
+        'usuario_nombre': "u.nombre"
+    }
+    
+    JOINS = """
+        LEFT JOIN servicios s ON r.id_servicio = s.id
+        LEFT JOIN lavadores l ON r.id_lavador = l.id
+        LEFT JOIN usuarios u ON r.id_usuario = u.id
+    """
+    
+    def __init__(self, db_connection):
+        self.db = db_connection
+    
+    def populate(self, cursor, where="1 = 1", params=()):
+        """Recalcular las columnas de los registros que cumplen where"""
+        assignments = ",\n".join(f"r.{column} = {expression}" for column, expression in self.DEFINITIONS.items())
+        cursor.execute(f"""
+            UPDATE registros r
+            {self.JOINS}
+            SET {assignments}
+            WHERE {where}
+        """, tuple(params) or None)
+        return cursor.rowcount
+    
+    def refresh(self, where="1 = 1", params=()):
+        """Recalcular en su propia transacción (p. ej. tras renombrar un servicio)"""
+        try:
+            with self.db.transaction() as cursor:
+                return self.populate(cursor, where, params)
+        except Error as e:
+            print(f"❌ Error actualizando columnas materializadas: {e}")
+            return None
+    
+    def check(self, limit=100):
+        """Registros cuyas columnas guardadas difieren de la definición con joins"""
+        expected = ",\n".join(
+            f"r.{column}, {expression} as {column}_esperado"
+            for column, expression in self.DEFINITIONS.items()
+        )
+        return self.db.execute_query(f"""
+            SELECT r.id, {expected}
+            FROM registros r
+            {self.JOINS}
+            WHERE {self._mismatch()}
+            ORDER BY r.id
+            LIMIT %s
+        """, (limit,))
+    
+    def repair(self):
+        """Recalcular solo los registros con diferencias"""
+        return self.refresh(self._mismatch())
+    
+    def _mismatch(self):
+        """Condición que cumple un registro con alguna columna desactualizada"""
+        return " OR ".join(
+            f"NOT (r.{column} <=> {expression})" for column, expression in self.DEFINITIONS.items()
+        )
+
+
+# Instancia global de las columnas materializadas
+materialized = MaterializedColumns(db)
+
+
+if __name__ == "__main__":
+    if db.connect():
+        differences = materialized.check()
+        if differences is None:
+            print("❌ No se pudo verificar registros")
+        elif not differences:
+            print("✅ Columnas materializadas consistentes")
+        else:
+            print(f"⚠️ {len(differences)} registros con diferencias (máx. 100):")
+            for row in differences:
+                columns = [
+                    f"{column}: {row[column]!r} ≠ {row[column + '_esperado']!r}"
+                    for column in MaterializedColumns.DEFINITIONS
+                    if row[column] != row[column + '_esperado']
+                ]
+                print(f"   #{row['id']}  " + "; ".join(columns))
+            
+            if '--fix' in sys.argv:
+                fixed = materialized.repair()
+                if fixed is not None:
+                    print(f"🛠️ {fixed} registros recalculados")
+        db.disconnect()
@@ -0,0 +1,508 @@
+"""
+Migraciones versionadas del esquema de la base de datos
+Cada migración se aplica una sola vez y queda registrada en schema_migrations.
+Los pasos son idempotentes (IF NOT EXISTS / verificación de índices) porque
+MySQL confirma implícitamente cada sentencia DDL.
+
+Uso:
+    python database/migrations.py            # aplicar migraciones pendientes
+    python database/migrations.py --explain  # verificar uso de índices con EXPLAIN
+"""
+
+import os
+import sys
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mysql.connector import Error
+from database.db_config import db
+from database.daily_summary import daily_summary
+from database.materialized import materialized
+from database.plate_summary import plate_summary
+
+
+class Deferred:
+    """Paso sobre objetos derivados (vistas, agregados) que se ejecuta una sola
+    vez después de todas las migraciones pendientes, con el esquema final"""
+    
+    def __init__(self, step):
+        self.step = step
+
+
+def column_exists(cursor, table, column):
+    """Verificar si una columna existe en la base actual"""
+    cursor.execute("""
+        SELECT COUNT(*) as total
+        FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+    """, (table, column))
+    return cursor.fetchone()['total'] > 0
+
+
+def index_exists(cursor, table, name):
+    """Verificar si un índice existe en la base actual"""
+    cursor.execute("""
+        SELECT COUNT(*) as total
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+    """, (table, name))
+    return cursor.fetchone()['total'] > 0
+
+
+def add_column(table, column, definition):
+    """Paso que agrega una columna solo si todavía no existe"""
+    def step(cursor):
+        if not column_exists(cursor, table, column):
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    return step
+
+
+def drop_column(table, column):
+    """Paso que elimina una columna si existe"""
+    def step(cursor):
+        if column_exists(cursor, table, column):
+            cursor.execute(f"ALTER TABLE {table} DROP COLUMN {column}")
+    return step
+
+
+def drop_index(table, name):
+    """Paso que elimina un índice si existe"""
+    def step(cursor):
+        if index_exists(cursor, table, name):
+            cursor.execute(f"DROP INDEX {name} ON {table}")
+    return step
+
+
+def add_foreign_key(table, name, column, reference):
+    """Paso que crea una llave foránea solo si todavía no existe"""
+    def step(cursor):
+        cursor.execute("""
+            SELECT COUNT(*) as total
+            FROM information_schema.TABLE_CONSTRAINTS
+            WHERE CONSTRAINT_SCHEMA = DATABASE() AND TABLE_NAME = %s
+            AND CONSTRAINT_NAME = %s AND CONSTRAINT_TYPE = 'FOREIGN KEY'
+        """, (table, name))
+        if cursor.fetchone()['total'] == 0:
+            cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} FOREIGN KEY ({column}) REFERENCES {reference}")
+    return step
+
+
+def add_index(table, name, columns, unique=False):
+    """Paso que crea un índice solo si todavía no existe"""
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    
+    def step(cursor):
+        if not index_exists(cursor, table, name):
+            cursor.execute(f"CREATE {kind} {name} ON {table} ({columns})")
+    return step
+
+
+def backfill_lavadores(cursor):
+    """Asignar id_lavador a partir del nombre guardado en registros.lavador
+    
+    Los nombres que no corresponden a ningún lavador se crean como lavadores
+    inactivos para no perder el historial.
+    """
+    if not column_exists(cursor, 'registros', 'lavador'):
+        return
+    
+    cursor.execute("""
+        INSERT INTO lavadores (nombre, apellido, activo)
+        SELECT
+            SUBSTRING_INDEX(huerfano.nombre, ' ', 1),
+            TRIM(SUBSTRING(huerfano.nombre, LENGTH(SUBSTRING_INDEX(huerfano.nombre, ' ', 1)) + 1)),
+            0
+        FROM (
+            SELECT DISTINCT TRIM(r.lavador) as nombre
+            FROM registros r
+            WHERE r.id_lavador IS NULL AND TRIM(COALESCE(r.lavador, '')) <> ''
+            AND NOT EXISTS (
+                SELECT 1 FROM lavadores l
+                WHERE TRIM(CONCAT(l.nombre, ' ', l.apellido)) = TRIM(r.lavador)
+            )
+        ) huerfano
+    """)
+    
+    # Con nombres repetidos se toma el lavador más antiguo
+    cursor.execute("""
+        UPDATE registros r
+        JOIN (
+            SELECT TRIM(CONCAT(nombre, ' ', apellido)) as nombre_completo, MIN(id) as id
+            FROM lavadores
+            GROUP BY nombre_completo
+        ) l ON l.nombre_completo = TRIM(r.lavador)
+        SET r.id_lavador = l.id
+        WHERE r.id_lavador IS NULL
+    """)
+
+
+def rebuild_summary(cursor):
+    """Recrear resumen_diario con la definición actual"""
+    daily_summary.recreate(cursor)
+
+
+def refresh_materialized(cursor):
+    """Recalcular montos y nombres materializados de todos los registros"""
+    materialized.populate(cursor)
+
+
+def rebuild_plate_summary(cursor):
+    """Recrear resumen_placas con la definición actual"""
+    plate_summary.recreate(cursor)
+
+
+BASE_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS usuarios (
+        id INT PRIMARY KEY AUTO_INCREMENT,
+        nombre VARCHAR(100) NOT NULL,
+        email VARCHAR(100) UNIQUE NOT NULL,
+        password VARCHAR(255) NOT NULL,
+        rol ENUM('admin', 'secretario') DEFAULT 'secretario',
+        activo TINYINT DEFAULT 1,
+        provider VARCHAR(50) DEFAULT 'local',
+        creado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS servicios (
+        id INT PRIMARY KEY AUTO_INCREMENT,
+        nombre VARCHAR(100) NOT NULL,
+        descripcion TEXT,
+        categoria VARCHAR(50),
+        activo TINYINT DEFAULT 1,
+        creado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS servicio_precios (
+        id INT PRIMARY KEY AUTO_INCREMENT,
+        id_servicio INT NOT NULL,
+        tipo_vehiculo ENUM('motorcycle', 'car', 'pickup', 'suv', 'truck') NOT NULL,
+        precio DECIMAL(10,2) NOT NULL,
+        activo TINYINT DEFAULT 1,
+        actualizado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        FOREIGN KEY (id_servicio) REFERENCES servicios(id) ON DELETE CASCADE,
+        UNIQUE KEY unique_servicio_vehiculo (id_servicio, tipo_vehiculo)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS lavadores (
+        id INT PRIMARY KEY AUTO_INCREMENT,
+        nombre VARCHAR(50) NOT NULL,
+        apellido VARCHAR(50) NOT NULL,
+        telefono VARCHAR(20),
+        activo TINYINT DEFAULT 1,
+        creado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS registros (
+        id INT PRIMARY KEY AUTO_INCREMENT,
+        fecha DATE NOT NULL,
+        hora TIME NOT NULL,
+        vehiculo VARCHAR(50),
+        placa VARCHAR(10),
+        id_servicio INT,
+        costo DECIMAL(10,2),
+        porcentaje DECIMAL(5,2) DEFAULT 50.00,
+        lavador VARCHAR(100),
+        observaciones TEXT,
+        pago VARCHAR(20) DEFAULT 'Pendiente',
+        id_usuario INT,
+        creado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (id_servicio) REFERENCES servicios(id),
+        FOREIGN KEY (id_usuario) REFERENCES usuarios(id)
+    )
+    """
+]
+
+# Una sola tabla: los montos y nombres están materializados en registros.
+# MERGE permite que los filtros sobre la vista usen los índices de registros
+REPORT_VIEW = Deferred("""
+    CREATE OR REPLACE ALGORITHM=MERGE VIEW vista_registros_completos AS
+    SELECT
+        r.id,
+        r.fecha,
+        r.hora,
+        r.vehiculo_nombre,
+        r.placa,
+        r.placa_normalizada,
+        r.servicio_nombre,
+        r.costo,
+        r.porcentaje,
+        r.comision_calculada,
+        r.ganancia_neta,
+        r.id_lavador,
+        r.lavador_nombre as lavador,
+        r.pago,
+        r.usuario_nombre,
+        r.observaciones
+    FROM registros r
+""")
+
+REBUILD_SUMMARY = Deferred(rebuild_summary)
+
+REFRESH_MATERIALIZED = Deferred(refresh_materialized)
+
+REBUILD_PLATE_SUMMARY = Deferred(rebuild_plate_summary)
+
+# (versión, descripción, pasos); un paso es SQL, una función que recibe el cursor
+# o un Deferred (vistas y agregados, que siempre se crean con la definición actual)
+MIGRATIONS = [
+    (1, "Esquema base y vista de reportes", BASE_TABLES + [REPORT_VIEW]),
+    (2, "Índices para las consultas de reportes", [
+        # Cierre de caja e historial: fecha exacta/rango ordenado por hora (id va implícito)
+        add_index('registros', 'idx_registros_fecha_hora', 'fecha, hora'),
+        # Servicios recientes del dashboard y filtro por estado de pago
+        add_index('registros', 'idx_registros_pago_fecha', 'pago, fecha, hora'),
+        # Filtro por lavador en historial y estadísticas
+        add_index('registros', 'idx_registros_lavador_fecha', 'lavador, fecha'),
+        # Búsqueda por placa del secretario
+        add_index('registros', 'idx_registros_placa', 'placa'),
+        # Servicios disponibles por tipo de vehículo al registrar
+        add_index('servicio_precios', 'idx_precios_vehiculo', 'tipo_vehiculo, activo, id_servicio'),
+        # Precios activos de un servicio (cubre el LEFT JOIN de la matriz de precios)
+        add_index('servicio_precios', 'idx_precios_servicio', 'id_servicio, tipo_vehiculo, activo')
+    ]),
+    (3, "Tabla de agregados resumen_diario", [REBUILD_SUMMARY]),
+    (4, "Llave foránea id_lavador en registros", [
+        add_column('registros', 'id_lavador', 'INT NULL AFTER porcentaje'),
+        backfill_lavadores,
+        drop_index('registros', 'idx_registros_lavador_fecha'),
+        # Filtro por lavador, estadísticas y verificación antes de eliminar
+        add_index('registros', 'idx_registros_id_lavador', 'id_lavador, fecha'),
+        add_foreign_key('registros', 'fk_registros_lavador', 'id_lavador', 'lavadores(id)'),
+        drop_column('registros', 'lavador'),
+        REPORT_VIEW,
+        REBUILD_SUMMARY
+    ]),
+    (5, "Marca actualizado_en en servicios y lavadores", [
+        # Versión del catálogo en memoria: COUNT + MAX(actualizado_en) por tabla
+        add_column('servicios', 'actualizado_en',
+                   'TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP'),
+        add_column('lavadores', 'actualizado_en',
+                   'TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP')
+    ]),
+    (6, "Llave de idempotencia uuid en registros", [
+        # Un registro reenviado desde el diario local no se duplica
+        add_column('registros', 'uuid', 'CHAR(36) NULL AFTER id'),
+        add_index('registros', 'uq_registros_uuid', 'uuid', unique=True)
+    ]),
+    (7, "Marca actualizado_en en registros", [
+        # Sincronización incremental de la réplica local del secretario
+        add_column('registros', 'actualizado_en',
+                   'TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP'),
+        add_index('registros', 'idx_registros_actualizado', 'actualizado_en')
+    ]),
+    (8, "Montos y nombres materializados en registros", [
+        add_column('registros', 'comision_calculada', 'DECIMAL(12,2) NULL AFTER porcentaje'),
+        add_column('registros', 'ganancia_neta', 'DECIMAL(12,2) NULL AFTER comision_calculada'),
+        add_column('registros', 'vehiculo_nombre', 'VARCHAR(20) NULL AFTER vehiculo'),
+        add_column('registros', 'servicio_nombre', 'VARCHAR(100) NULL AFTER id_servicio'),
+        add_column('registros', 'lavador_nombre', 'VARCHAR(101) NULL AFTER id_lavador'),
+        add_column('registros', 'usuario_nombre', 'VARCHAR(100) NULL AFTER id_usuario'),
+        REFRESH_MATERIALIZED,
+        REPORT_VIEW
+    ]),
+    (9, "Placa normalizada e índice de búsqueda por placa", [
+        # Columna generada: se calcula sola en cada INSERT/UPDATE, incluso desde el diario
+        add_column('registros', 'placa_normalizada',
+                   "VARCHAR(10) AS (UPPER(REPLACE(REPLACE(TRIM(placa), ' ', ''), '-', ''))) STORED AFTER placa"),
+        # Placa exacta o por prefijo, con los registros de cada placa ya ordenados
+        add_index('registros', 'idx_registros_placa_fecha', 'placa_normalizada, fecha, hora'),
+        drop_index('registros', 'idx_registros_placa'),
+        REPORT_VIEW
+    ]),
+    (10, "Tabla de agregados resumen_placas", [REBUILD_PLATE_SUMMARY]),
+    # Comisión y ganancia de resumen_diario con el redondeo por registro
+    (11, "Totales redondeados por registro en resumen_diario", [REBUILD_SUMMARY])
+]
+
+
+class MigrationRunner:
+    """Aplica las migraciones pendientes en orden de versión"""
+    
+    CREATE_VERSION_TABLE = """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            descripcion VARCHAR(200) NOT NULL,
+            aplicada_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """
+    
+    # Tablas grandes en las que un recorrido completo (type=ALL) es un problema
+    INDEXED_TABLES = ('r', 'rd', 'rp', 'registros', 'resumen_diario', 'resumen_placas')
+    
+    # Candado de MySQL que serializa las migraciones entre terminales
+    LOCK_NAME = 'lavadero_migrations'
+    LOCK_TIMEOUT = 120
+    
+    def __init__(self, db_connection, migrations=MIGRATIONS):
+        self.db = db_connection
+        self.migrations = sorted(migrations, key=lambda migration: migration[0])
+    
+    def current_version(self):
+        """Última versión aplicada (0 si la base no tiene migraciones)"""
+        result = self.db.execute_query("SELECT COALESCE(MAX(version), 0) as version FROM schema_migrations")
+        if result is None:
+            raise RuntimeError("No se pudo leer schema_migrations")
+        return result[0]['version']
+    
+    def run(self):
+        """Aplicar las migraciones pendientes; devuelve False si alguna falla
+        
+        Varias terminales pueden arrancar a la vez: solo una aplica las
+        migraciones mientras las demás esperan el candado y luego ven que ya
+        no queda nada pendiente.
+        """
+        try:
+            with self.db.transaction() as cursor:
+                cursor.execute(self.CREATE_VERSION_TABLE)
+            
+            # Con el esquema al día no hace falta el candado
+            if not self.pending():
+                return True
+            
+            # GET_LOCK pertenece a la sesión: se toma en una conexión propia que
+            # se conserva hasta liberarlo (si se corta, MySQL lo libera solo)
+            with self.db.connection() as connection:
+                lock = connection.cursor()
+                try:
+                    lock.execute("SELECT GET_LOCK(%s, %s)", (self.LOCK_NAME, self.LOCK_TIMEOUT))
+                    if lock.fetchone()[0] != 1:
+                        raise RuntimeError(
+                            f"Otra terminal sigue aplicando migraciones después de {self.LOCK_TIMEOUT} s"
+                        )
+                    try:
+                        # Se relee la versión: otra terminal pudo aplicarlas mientras se esperaba
+                        self._apply(self.pending())
+                    finally:
+                        lock.execute("SELECT RELEASE_LOCK(%s)", (self.LOCK_NAME,))
+                        lock.fetchone()
+                finally:
+                    lock.close()
+            
+            return True
+        
+        except (Error, RuntimeError) as e:
+            print(f"❌ Error aplicando migraciones: {e}")
+            return False
+    
+    def pending(self):
+        """Migraciones con versión mayor a la última aplicada"""
+        current = self.current_version()
+        return [migration for migration in self.migrations if migration[0] > current]
+    
+    def _apply(self, pending):
+        """Ejecutar los pasos de las migraciones pendientes y registrar sus versiones"""
+        if not pending:
+            return
+        
+        deferred = []
+        for version, description, steps in pending:
+            print(f"🛠️ Aplicando migración {version}: {description}")
+            with self.db.transaction() as cursor:
+                for step in steps:
+                    if isinstance(step, Deferred):
+                        if step not in deferred:
+                            deferred.append(step)
+                    else:
+                        self._execute(cursor, step)
+        
+        # Las versiones se registran al final: si algo falla, el siguiente
+        # inicio repite los pasos (idempotentes) y los objetos derivados.
+        # IGNORE: una versión ya registrada no es un error
+        with self.db.transaction() as cursor:
+            for step in deferred:
+                self._execute(cursor, step.step)
+            cursor.executemany(
+                "INSERT IGNORE INTO schema_migrations (version, descripcion) VALUES (%s, %s)",
+                [(version, description) for version, description, _ in pending]
+            )
+    
+    def _execute(self, cursor, step):
+        """Ejecutar un paso SQL o una función que recibe el cursor"""
+        if callable(step):
+            step(cursor)
+        else:
+            cursor.execute(step)
+    
+    def explain_queries(self):
+        """Consultas representativas del dashboard y del historial"""
+        # Importación diferida: database/ no depende de la interfaz al arrancar
+        from src.admin.dashboard_data import DashboardDataProvider
+        from src.admin.historial_data import HistorialQuery
+        from src.secretary.history_data import HistoryQuery
+        from database.replica import LocalReplica
+        
+        today = date.today()
+        month_start = today.replace(day=1)
+        filters = {
+            'fecha_inicio': (today - timedelta(days=30)).isoformat(),
+            'fecha_fin': today.isoformat(),
+            'lavador': 'Todos',
+            'id_lavador': None,
+            'vehiculo': 'Todos',
+            'servicio': 'Todos',
+            'estado_pago': 'Todos'
+        }
+        historial = HistorialQuery(filters)
+        pendientes = HistorialQuery(dict(filters, estado_pago='Pendiente'))
+        por_lavador = HistorialQuery(dict(filters, id_lavador=1))
+        first_page = historial.rows_query(limit=200)
+        secretario = HistoryQuery({'fecha': '', 'placa': '', 'id_lavador': None})
+        por_placa = HistoryQuery({'fecha': '', 'placa': 'ABC', 'id_lavador': None, 'placas': ['ABC123', 'ABC12D']})
+        
+        return [
+            ("Dashboard - período", DashboardDataProvider.PERIOD_QUERY, (month_start, today)),
+            ("Dashboard - hoy", DashboardDataProvider.TODAY_QUERY, (today,)),
+            ("Dashboard - recientes", DashboardDataProvider.RECENT_QUERY, None),
+            ("Historial - primera página", *first_page),
+            ("Historial - página siguiente",
+             *historial.rows_query(after={'fecha': today, 'hora': '12:00:00', 'id': 1}, limit=200)),
+            ("Historial - pendientes", *pendientes.rows_query(limit=200)),
+            ("Historial - por lavador", *por_lavador.rows_query(limit=200)),
+            ("Historial - estadísticas", *historial.stats_query()),
+            ("Secretario - página siguiente",
+             *secretario.rows_query(after={'fecha': today, 'hora': '12:00:00', 'id': 1}, limit=100)),
+            ("Secretario - por placa", *por_placa.rows_query(limit=100)),
+            ("Registro - visitas de la placa", plate_summary.VISITS_QUERY, ('ABC123',)),
+            ("Réplica local - cambios", LocalReplica.CHANGES_QUERY,
+             (today - timedelta(days=1), today - timedelta(days=30)))
+        ]
+    
+    def explain_check(self):
+        """Ejecutar EXPLAIN y marcar las consultas con recorridos completos"""
+        results = []
+        for name, query, params in self.explain_queries():
+            plan = self.db.execute_query("EXPLAIN " + query, params or None)
+            if plan is None:
+                results.append((name, False, "EXPLAIN falló"))
+                continue
+            
+            full_scans = [
+                row['table'] for row in plan
+                if row.get('type') == 'ALL' and row.get('table') in self.INDEXED_TABLES
+            ]
+            detail = ", ".join(f"{row.get('table')}:{row.get('key') or 'sin índice'}" for row in plan)
+            results.append((name, not full_scans, detail))
+        return results
+
+
+# Instancia global del ejecutor de migraciones
+migrations = MigrationRunner(db)
+
+
+if __name__ == "__main__":
+    if db.connect():
+        if migrations.run():
+            print(f"✅ Esquema en la versión {migrations.current_version()}")
+        
+        if '--explain' in sys.argv:
+            print("\n🔎 Verificación de índices (EXPLAIN):")
+            for name, ok, detail in migrations.explain_check():
+                print(f"{'✅' if ok else '⚠️'} {name:<30} {detail}")
+        
+        db.disconnect()
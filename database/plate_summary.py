@@ -0,0 +1,169 @@
+"""
+Resumen por placa - Visitas de cada vehículo mantenidas incrementalmente
+Una fila por placa × servicio con la cantidad, el gasto y la primera y última
+visita. Cada escritura sobre registros recalcula solo las placas que tocó
+(un rango de idx_registros_placa_fecha), y las lecturas del formulario de
+registro pasan por una caché LRU en memoria.
+
+Uso para reconstruir la tabla o consultar una placa:
+    python database/plate_summary.py [PLACA]
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mysql.connector import Error
+from database.db_config import db, env_vars
+from database.plates import normalize_plate
+
+
+class PlateSummary:
+    """Mantiene la tabla resumen_placas y sirve el historial de cada vehículo"""
+    
+    CREATE_TABLE = """
+        CREATE TABLE IF NOT EXISTS resumen_placas (
+            placa_normalizada VARCHAR(10) NOT NULL,
+            id_servicio INT NOT NULL DEFAULT 0,
+            cantidad INT NOT NULL DEFAULT 0,
+            total_costo DECIMAL(14,2) NOT NULL DEFAULT 0,
+            primera_visita DATE NOT NULL,
+            ultima_visita DATE NOT NULL,
+            PRIMARY KEY (placa_normalizada, id_servicio)
+        )
+    """
+    
+    AGGREGATE_SELECT = """
+        SELECT
+            placa_normalizada,
+            COALESCE(id_servicio, 0),
+            COUNT(*),
+            COALESCE(SUM(costo), 0),
+            MIN(fecha),
+            MAX(fecha)
+        FROM registros
+        WHERE placa_normalizada <> '' AND {where}
+        GROUP BY placa_normalizada, COALESCE(id_servicio, 0)
+    """
+    
+    INSERT_PREFIX = """
+        INSERT INTO resumen_placas
+        (placa_normalizada, id_servicio, cantidad, total_costo, primera_visita, ultima_visita)
+    """
+    
+    VISITS_QUERY = """
+        SELECT rp.id_servicio, s.nombre as servicio, rp.cantidad, rp.total_costo,
+               rp.primera_visita, rp.ultima_visita
+        FROM resumen_placas rp
+        LEFT JOIN servicios s ON s.id = rp.id_servicio
+        WHERE rp.placa_normalizada = %s
+    """
+    
+    def __init__(self, db_connection, cache_size=500, ttl=60):
+        self.db = db_connection
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+    
+    def recreate(self, cursor):
+        """Volver a crear la tabla con la definición actual y poblarla"""
+        cursor.execute("DROP TABLE IF EXISTS resumen_placas")
+        cursor.execute(self.CREATE_TABLE)
+        return self.populate(cursor)
+    
+    def populate(self, cursor, where="1 = 1", params=()):
+        """Reemplazar las placas que cumplen where con el agregado de registros"""
+        cursor.execute(f"DELETE FROM resumen_placas WHERE {where}", tuple(params) or None)
+        cursor.execute(self.INSERT_PREFIX + self.AGGREGATE_SELECT.format(where=where), tuple(params) or None)
+        return cursor.rowcount
+    
+    def refresh(self, cursor, placas):
+        """Recalcular dentro de una transacción abierta las placas indicadas"""
+        plates = sorted({normalize_plate(placa) for placa in placas} - {''})
+        if not plates:
+            return 0
+        placeholders = ', '.join(['%s'] * len(plates))
+        return self.populate(cursor, f"placa_normalizada IN ({placeholders})", plates)
+    
+    def plates_of(self, cursor, registro_ids):
+        """Placas actuales de los registros indicados (antes de editarlos o borrarlos)"""
+        placeholders = ', '.join(['%s'] * len(registro_ids))
+        cursor.execute(
+            f"SELECT placa_normalizada FROM registros WHERE id IN ({placeholders})",
+            tuple(registro_ids)
+        )
+        return [row['placa_normalizada'] for row in cursor.fetchall()]
+    
+    def invalidate(self, placas):
+        """Quitar de la caché las placas modificadas en esta terminal"""
+        with self._lock:
+            for placa in placas:
+                self._cache.pop(normalize_plate(placa), None)
+    
+    def visits(self, placa):
+        """Historial del vehículo: visitas, última visita, servicio favorito y gasto
+        
+        Devuelve None si la placa nunca vino y lanza RuntimeError sin conexión.
+        Las respuestas (también las vacías) se guardan ttl segundos en la caché.
+        """
+        plate = normalize_plate(placa)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(plate)
+            if cached and now - cached[0] < self.ttl:
+                self._cache.move_to_end(plate)
+                return cached[1]
+        
+        rows = self.db.execute_query(self.VISITS_QUERY, (plate,))
+        if rows is None:
+            raise RuntimeError("No se pudo consultar el historial del vehículo")
+        result = self._summarize(plate, rows)
+        
+        with self._lock:
+            self._cache[plate] = (now, result)
+            self._cache.move_to_end(plate)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+    
+    def _summarize(self, plate, rows):
+        """Sumar las filas por servicio de una placa"""
+        if not rows:
+            return None
+        favorite = max(rows, key=lambda row: (row['cantidad'], row['ultima_visita']))
+        return {
+            'placa': plate,
+            'visitas': sum(row['cantidad'] for row in rows),
+            'gasto_total': sum(row['total_costo'] for row in rows),
+            'primera_visita': min(row['primera_visita'] for row in rows),
+            'ultima_visita': max(row['ultima_visita'] for row in rows),
+            'servicio_favorito': favorite['servicio'] or 'Servicio eliminado',
+            'veces_favorito': favorite['cantidad']
+        }
+
+
+# Instancia global del resumen por placa
+plate_summary = PlateSummary(db, ttl=float(env_vars.get('PLATE_SUMMARY_TTL', 60)))
+
+
+if __name__ == "__main__":
+    if db.connect():
+        if len(sys.argv) > 1:
+            for placa in sys.argv[1:]:
+                start = time.perf_counter()
+                visits = plate_summary.visits(placa)
+                elapsed = (time.perf_counter() - start) * 1000
+                print(f"🚗 {placa}: {visits or 'sin visitas'} ({elapsed:.1f} ms)")
+        else:
+            try:
+                with db.transaction() as cursor:
+                    rows = plate_summary.recreate(cursor)
+                print(f"✅ resumen_placas reconstruido ({rows} filas)")
+            except Error as e:
+                print(f"❌ Error reconstruyendo resumen_placas: {e}")
+        db.disconnect()
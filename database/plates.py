@@ -0,0 +1,227 @@
+"""
+Índice de placas - Búsqueda por prefijo, contenido y con un error de tipeo
+Las placas distintas (unas pocas decenas de miles aunque registros tenga
+millones de filas) se cargan en memoria desde registros.placa_normalizada:
+- prefijo: lista ordenada + bisect
+- contenido: índice de trigramas (cada placa colombiana tiene 4)
+- un error (cambio, falta o sobra una letra): variantes con una letra borrada;
+  dos placas a una edición de distancia comparten al menos una variante
+Las placas encontradas se consultan luego con placa_normalizada IN (...), que
+usa idx_registros_placa_fecha. Las placas nuevas se agregan en cada refresco
+consultando solo los registros con actualizado_en posterior al último.
+
+Uso para probar una búsqueda:
+    python database/plates.py ABC12
+"""
+
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.db_config import db, env_vars
+
+
+def normalize_plate(text):
+    """Placa en mayúsculas y sin espacios ni guiones
+    
+    Es la misma definición de la columna generada registros.placa_normalizada
+    (migración 9): lo que se busca aquí tiene que coincidir con lo que guarda MySQL.
+    """
+    return (text or '').replace(' ', '').replace('-', '').upper()
+
+
+def one_edit_apart(a, b):
+    """Indica si b se obtiene de a cambiando, quitando o agregando una letra"""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        return sum(x != y for x, y in zip(a, b)) == 1
+    
+    shorter, longer = (a, b) if len(a) < len(b) else (b, a)
+    for i in range(len(longer)):
+        if longer[:i] + longer[i + 1:] == shorter:
+            return True
+    return False
+
+
+class PlateIndex:
+    """Placas distintas de registros con índices en memoria para buscarlas"""
+    
+    # Recorre idx_registros_placa_fecha sin leer las filas de registros
+    PLATES_QUERY = """
+        SELECT DISTINCT placa_normalizada
+        FROM registros
+        WHERE placa_normalizada <> ''
+    """
+    
+    # Usa idx_registros_actualizado
+    CHANGES_QUERY = """
+        SELECT DISTINCT placa_normalizada
+        FROM registros
+        WHERE actualizado_en >= %s AND placa_normalizada <> ''
+    """
+    
+    WATERMARK_QUERY = "SELECT MAX(actualizado_en) as actualizado_en FROM registros"
+    
+    NGRAM = 3
+    
+    # Margen para no perder placas de filas confirmadas tarde
+    OVERLAP = timedelta(seconds=60)
+    
+    def __init__(self, db_connection, ttl=30):
+        self.db = db_connection
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._sorted = []
+        self._plates = set()
+        self._ngrams = {}
+        self._deletes = {}
+        self._watermark = None
+        self._loaded = False
+        self._checked_at = 0.0
+    
+    def __len__(self):
+        return len(self._plates)
+    
+    def search(self, text, limit=None):
+        """Placas que contienen el texto (o empiezan por él si es corto)
+        
+        Devuelve (placas, aproximada): si no hay ninguna coincidencia y el texto
+        parece una placa completa, devuelve las que están a una edición y
+        aproximada es True. Devuelve (None, False) si el índice no pudo cargarse.
+        """
+        query = normalize_plate(text)
+        if not query or not self.refresh():
+            return None, False
+        
+        with self._lock:
+            if len(query) < self.NGRAM:
+                plates = self._prefix(query)
+            else:
+                plates = self._contains(query)
+            
+            approximate = False
+            if not plates and len(query) >= 5:
+                plates = self._fuzzy(query)
+                approximate = bool(plates)
+        
+        plates = sorted(plates)
+        return (plates[:limit] if limit else plates), approximate
+    
+    def add(self, placa):
+        """Agregar una placa recién registrada sin esperar al próximo refresco"""
+        plate = normalize_plate(placa)
+        if plate:
+            with self._lock:
+                if self._loaded:
+                    self._insert([plate])
+    
+    def refresh(self, force=False):
+        """Cargar el índice la primera vez y luego agregar las placas nuevas
+        
+        Sin conexión se sigue usando lo cargado; devuelve False solo si nunca
+        pudo cargarse. Las consultas corren sin el candado, así que search()
+        sigue respondiendo con lo cargado mientras MySQL contesta.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._loaded and not force and now - self._checked_at < self.ttl:
+                return True
+            loaded, known_watermark = self._loaded, self._watermark
+        
+        rows = None
+        watermark = self.db.execute_query(self.WATERMARK_QUERY)
+        if watermark is not None:
+            watermark = watermark[0]['actualizado_en']
+            if not loaded or known_watermark is None:
+                rows = self.db.execute_query(self.PLATES_QUERY)
+            elif watermark != known_watermark:
+                rows = self.db.execute_query(self.CHANGES_QUERY, (known_watermark - self.OVERLAP,))
+            else:
+                rows = []
+        
+        with self._lock:
+            self._checked_at = now
+            if rows is None:
+                return self._loaded
+            
+            # Agregar placas no depende del orden: si otro hilo refrescó mientras
+            # tanto, solo se cuida que la marca no retroceda
+            self._insert(row['placa_normalizada'] for row in rows)
+            if watermark is not None and (self._watermark is None or watermark > self._watermark):
+                self._watermark = watermark
+            self._loaded = True
+            return True
+    
+    def _insert(self, plates):
+        """Agregar placas a los tres índices (llamar con el candado tomado)"""
+        new = [plate for plate in plates if plate and plate not in self._plates]
+        if not new:
+            return
+        
+        self._plates.update(new)
+        if len(new) > 100:
+            self._sorted = sorted(self._plates)
+        else:
+            for plate in new:
+                insort(self._sorted, plate)
+        for plate in new:
+            for gram in self._grams(plate):
+                self._ngrams.setdefault(gram, set()).add(plate)
+            for variant in self._variants(plate):
+                self._deletes.setdefault(variant, set()).add(plate)
+    
+    def _grams(self, text):
+        return {text[i:i + self.NGRAM] for i in range(len(text) - self.NGRAM + 1)}
+    
+    def _variants(self, text):
+        """El texto y sus versiones con una letra borrada"""
+        return {text} | {text[:i] + text[i + 1:] for i in range(len(text))}
+    
+    def _prefix(self, query):
+        """Rango de la lista ordenada que empieza por el texto"""
+        start = bisect_left(self._sorted, query)
+        end = bisect_left(self._sorted, query + '\uffff', start)
+        return set(self._sorted[start:end])
+    
+    def _contains(self, query):
+        """Intersección de las listas de los trigramas, verificada con 'in'"""
+        postings = sorted(
+            (self._ngrams.get(gram, set()) for gram in self._grams(query)), key=len
+        )
+        if not postings[0]:
+            return set()
+        candidates = set(postings[0]).intersection(*postings[1:])
+        return {plate for plate in candidates if query in plate}
+    
+    def _fuzzy(self, query):
+        candidates = set()
+        for variant in self._variants(query):
+            candidates |= self._deletes.get(variant, set())
+        return {plate for plate in candidates if one_edit_apart(query, plate)}
+
+
+# Instancia global del índice de placas
+plate_index = PlateIndex(db, ttl=float(env_vars.get('PLATE_INDEX_TTL', 30)))
+
+
+if __name__ == "__main__":
+    if db.connect():
+        start = time.perf_counter()
+        plate_index.refresh(force=True)
+        print(f"✅ {len(plate_index)} placas indexadas ({(time.perf_counter() - start) * 1000:.0f} ms)")
+        
+        for text in sys.argv[1:]:
+            start = time.perf_counter()
+            plates, approximate = plate_index.search(text)
+            elapsed = (time.perf_counter() - start) * 1000
+            kind = "parecidas" if approximate else "coincidencias"
+            print(f"🔍 {text}: {len(plates or [])} {kind} ({elapsed:.2f} ms) {', '.join((plates or [])[:10])}")
+        db.disconnect()
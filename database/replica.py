@@ -0,0 +1,316 @@
+"""
+Réplica local de lectura - Registros recientes y catálogos en SQLite
+El panel del secretario consulta casi siempre los registros del día, hechos en
+esta misma terminal. La réplica guarda los últimos REPLICA_DAYS días de
+registros (con sus montos y nombres materializados, así que no necesita copiar
+los catálogos) y se sincroniza de forma incremental:
+solo se traen las filas con actualizado_en posterior a la última sincronización,
+y si el conteo del período no coincide se reconcilian los id (eliminaciones).
+Las escrituras siguen yendo a MySQL; después de cada una la réplica se marca
+como desactualizada y la siguiente lectura la sincroniza primero.
+
+Uso para sincronizar manualmente:
+    python database/replica.py
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mysql.connector import Error
+from database.db_config import db, env_vars
+
+
+DEFAULT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'replica_local.sqlite3'
+)
+
+
+def format_hora(value):
+    """TIME de MySQL (timedelta) como 'HH:MM:SS' para que ordene como texto"""
+    if isinstance(value, timedelta):
+        seconds = int(value.total_seconds())
+        return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+    return str(value)
+
+
+class LocalReplica:
+    """Copia local en SQLite de los registros recientes para las lecturas del secretario"""
+    
+    # Al cambiar el esquema local se incrementa y la réplica se reconstruye
+    SCHEMA_VERSION = 3
+    
+    COLUMNS = (
+        'id', 'fecha', 'hora', 'vehiculo', 'vehiculo_nombre', 'placa', 'placa_normalizada', 'id_servicio',
+        'servicio_nombre', 'costo', 'porcentaje', 'comision_calculada', 'ganancia_neta',
+        'id_lavador', 'lavador_nombre', 'pago', 'usuario_nombre', 'actualizado_en'
+    )
+    
+    LOCAL_SCHEMA = """
+        CREATE TABLE registros (
+            id INTEGER PRIMARY KEY,
+            fecha TEXT NOT NULL,
+            hora TEXT NOT NULL,
+            vehiculo TEXT,
+            vehiculo_nombre TEXT,
+            placa TEXT,
+            placa_normalizada TEXT,
+            id_servicio INTEGER,
+            servicio_nombre TEXT,
+            costo REAL,
+            porcentaje REAL,
+            comision_calculada REAL,
+            ganancia_neta REAL,
+            id_lavador INTEGER,
+            lavador_nombre TEXT,
+            pago TEXT,
+            usuario_nombre TEXT,
+            actualizado_en TEXT
+        );
+        CREATE INDEX idx_registros_fecha_hora ON registros (fecha, hora);
+        CREATE INDEX idx_registros_placa_fecha ON registros (placa_normalizada, fecha, hora);
+        CREATE TABLE meta (clave TEXT PRIMARY KEY, valor TEXT);
+        CREATE VIEW vista_registros_completos AS
+        SELECT
+            id, fecha, hora, vehiculo_nombre, placa, placa_normalizada, servicio_nombre, costo, porcentaje,
+            comision_calculada, ganancia_neta, id_lavador, lavador_nombre as lavador,
+            pago, usuario_nombre
+        FROM registros;
+    """
+    
+    COUNT_QUERY = "SELECT COUNT(*) as registros FROM registros WHERE fecha >= %s"
+    
+    REGISTROS_COLUMNS = f"SELECT {', '.join(COLUMNS)} FROM registros"
+    
+    # Usa idx_registros_actualizado; fecha descarta lo que cae fuera del período
+    CHANGES_QUERY = REGISTROS_COLUMNS + " WHERE actualizado_en >= %s AND fecha >= %s"
+    
+    # Margen para no perder filas confirmadas tarde con una marca ya leída
+    OVERLAP = timedelta(seconds=60)
+    
+    def __init__(self, db_connection, path=DEFAULT_PATH, days=30, max_age=10):
+        self.db = db_connection
+        self.path = path
+        self.days = days
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._conn = None
+        self._synced_at = None
+        self._failed_at = None
+        self._stale = True
+    
+    def _connection(self):
+        """Abrir la réplica, reconstruyéndola si su esquema es de otra versión"""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Se puede reconstruir desde MySQL: no hace falta fsync en cada commit
+            conn.execute("PRAGMA synchronous=NORMAL")
+            
+            if conn.execute("PRAGMA user_version").fetchone()[0] != self.SCHEMA_VERSION:
+                # servicios y lavadores: tablas de la versión 1
+                for table in ('registros', 'servicios', 'lavadores', 'meta'):
+                    conn.execute(f"DROP TABLE IF EXISTS {table}")
+                conn.execute("DROP VIEW IF EXISTS vista_registros_completos")
+                conn.executescript(self.LOCAL_SCHEMA)
+                conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+                conn.commit()
+            self._conn = conn
+        return self._conn
+    
+    def cutoff(self):
+        """Primer día que guarda la réplica"""
+        return date.today() - timedelta(days=self.days)
+    
+    def covers(self, fecha=None):
+        """Sincronizar si hace falta e indicar si la réplica puede responder por
+        esa fecha (o por lo más reciente, sin fecha)"""
+        self.sync()
+        if self._synced_at is None:
+            return False
+        if fecha is None:
+            return True
+        try:
+            return date.fromisoformat(str(fecha)) >= self.cutoff()
+        except ValueError:
+            return False
+    
+    def mark_stale(self):
+        """Forzar sincronización antes de la próxima lectura (tras una escritura)"""
+        self._stale = True
+    
+    def execute_query(self, query, params=None):
+        """Consultar la réplica con la misma interfaz que DatabaseConfig
+        
+        Acepta marcadores %s y devuelve fechas y horas con los tipos del conector
+        de MySQL. Devuelve None si la réplica nunca pudo sincronizarse.
+        """
+        if self._synced_at is None:
+            return None
+        
+        with self._lock:
+            rows = self._connection().execute(query.replace('%s', '?'), tuple(params or ())).fetchall()
+        return [self._convert(row) for row in rows]
+    
+    def sync(self, force=False):
+        """Traer de MySQL los cambios desde la última sincronización
+        
+        Sin conexión se sigue sirviendo lo último sincronizado; devuelve False.
+        """
+        with self._sync_lock:
+            now = time.monotonic()
+            if not force:
+                if not self._stale and self._synced_at is not None and now - self._synced_at < self.max_age:
+                    return True
+                # Sin conexión no se reintenta en cada lectura
+                if self._failed_at is not None and now - self._failed_at < self.max_age:
+                    return False
+            
+            try:
+                self._stale = False
+                self._sync()
+                self._synced_at = time.monotonic()
+                self._failed_at = None
+                return True
+            except (Error, sqlite3.Error) as e:
+                self._stale = True
+                self._failed_at = time.monotonic()
+                print(f"🔌 No se pudo sincronizar la réplica local: {e}")
+                if self._synced_at is None and self._has_data():
+                    # Réplica de una sesión anterior: mejor datos viejos que ninguno
+                    self._synced_at = time.monotonic()
+                return False
+    
+    def _sync(self):
+        """Sincronización incremental dentro de una transacción de MySQL"""
+        cutoff = self.cutoff()
+        meta = self._meta()
+        
+        # REPEATABLE READ: conteo y cambios salen de la misma foto de la base
+        with self.db.transaction() as cursor:
+            cursor.execute(self.COUNT_QUERY, (cutoff,))
+            remote_count = cursor.fetchone()['registros']
+            
+            watermark = meta.get('actualizado_en')
+            # Si el período solo avanzó basta con podar; si se amplió hay que recargarlo
+            if watermark and meta.get('desde', '9999') <= cutoff.isoformat():
+                since = datetime.fromisoformat(watermark) - self.OVERLAP
+                cursor.execute(self.CHANGES_QUERY, (since, cutoff))
+            else:
+                # Primera vez o período distinto: cargar todo el período
+                cursor.execute(self.REGISTROS_COLUMNS + " WHERE fecha >= %s", (cutoff,))
+            changes = cursor.fetchall()
+            
+            with self._lock:
+                conn = self._connection()
+                with conn:
+                    conn.execute("DELETE FROM registros WHERE fecha < ?", (cutoff.isoformat(),))
+                    self._upsert(conn, changes)
+                    local_count = conn.execute("SELECT COUNT(*) FROM registros").fetchone()[0]
+            
+            # Eliminaciones o filas que escaparon a la marca: reconciliar por id
+            if local_count != remote_count:
+                cursor.execute("SELECT id FROM registros WHERE fecha >= %s", (cutoff,))
+                self._reconcile(cursor, {row['id'] for row in cursor.fetchall()})
+        
+        latest = max((row['actualizado_en'] for row in changes if row['actualizado_en']), default=None)
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                values = {'desde': cutoff.isoformat()}
+                if latest and (not watermark or latest.isoformat(sep=' ') > watermark):
+                    values['actualizado_en'] = latest.isoformat(sep=' ')
+                conn.executemany(
+                    "INSERT OR REPLACE INTO meta (clave, valor) VALUES (?, ?)", values.items()
+                )
+    
+    def _reconcile(self, cursor, remote_ids):
+        """Quitar lo eliminado en MySQL y traer lo que falte localmente"""
+        with self._lock:
+            local_ids = {row[0] for row in self._connection().execute("SELECT id FROM registros")}
+        
+        missing = sorted(remote_ids - local_ids)
+        rows = []
+        for start in range(0, len(missing), 500):
+            chunk = missing[start:start + 500]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(self.REGISTROS_COLUMNS + f" WHERE id IN ({placeholders})", tuple(chunk))
+            rows.extend(cursor.fetchall())
+        
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany(
+                    "DELETE FROM registros WHERE id = ?", [(id_,) for id_ in local_ids - remote_ids]
+                )
+                self._upsert(conn, rows)
+    
+    def _upsert(self, conn, rows):
+        placeholders = ', '.join(['?'] * len(self.COLUMNS))
+        conn.executemany(
+            f"INSERT OR REPLACE INTO registros ({', '.join(self.COLUMNS)}) VALUES ({placeholders})",
+            [tuple(self._local_value(column, row[column]) for column in self.COLUMNS) for row in rows]
+        )
+    
+    def _local_value(self, column, value):
+        """Valor de MySQL en un tipo que SQLite guarda y ordena igual"""
+        if value is None:
+            return None
+        if column == 'hora':
+            return format_hora(value)
+        if isinstance(value, Decimal):
+            return float(value)
+        if isinstance(value, datetime):
+            return value.isoformat(sep=' ')
+        if isinstance(value, date):
+            return value.isoformat()
+        return value
+    
+    def _meta(self):
+        with self._lock:
+            rows = self._connection().execute("SELECT clave, valor FROM meta").fetchall()
+        return {row['clave']: row['valor'] for row in rows}
+    
+    def _has_data(self):
+        try:
+            return bool(self._meta().get('desde'))
+        except sqlite3.Error:
+            return False
+    
+    def _convert(self, row):
+        """Fecha y hora con los tipos que entrega mysql.connector (date y timedelta)"""
+        result = dict(row)
+        if isinstance(result.get('fecha'), str):
+            result['fecha'] = date.fromisoformat(result['fecha'])
+        if isinstance(result.get('hora'), str):
+            hours, minutes, seconds = (int(part) for part in result['hora'].split(':'))
+            result['hora'] = timedelta(hours=hours, minutes=minutes, seconds=seconds)
+        return result
+
+
+# Instancia global de la réplica
+replica = LocalReplica(
+    db,
+    env_vars.get('REPLICA_PATH', DEFAULT_PATH),
+    days=int(env_vars.get('REPLICA_DAYS', 30)),
+    max_age=float(env_vars.get('REPLICA_MAX_AGE', 10))
+)
+
+
+if __name__ == "__main__":
+    if db.connect():
+        start = time.perf_counter()
+        if replica.sync(force=True):
+            elapsed = (time.perf_counter() - start) * 1000
+            count = replica.execute_query("SELECT COUNT(*) as total FROM registros")[0]['total']
+            print(f"✅ Réplica sincronizada: {count} registros desde {replica.cutoff()} ({elapsed:.0f} ms)")
+        db.disconnect()
@@ -0,0 +1,5 @@
+-- El esquema de lavadero_db no se mantiene en este archivo: lo crean y lo
+-- actualizan las migraciones versionadas de database/migrations.py, que la
+-- aplicación aplica al iniciar. Para aplicarlas a mano:
+--
+--     python database/migrations.py
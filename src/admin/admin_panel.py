@@ -2,35 +2,41 @@
 Panel Principal de Administrador - Controlador Modular con Scroll
 """
 
+import importlib
 import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime
 from database.db_config import db
-
-# Importar módulos específicos
-from .dashboard import DashboardModule
-from .usuarios import UsuariosModule
-from .servicios import ServiciosModule
-from .historial import HistorialModule
+from src.utils.module_cache import ModuleCache
 
 class AdminPanel:
     """Panel principal de administrador con arquitectura modular"""
     
+    # Módulos que muestran datos que otro edita: se refrescan al volver a ellos
+    DEPENDENT_MODULES = {
+        'servicios': ('dashboard', 'historial'),
+        'lavadores': ('dashboard', 'historial')
+    }
+    
     def __init__(self, parent, user_data, on_logout_callback):
         self.parent = parent
         self.user_data = user_data
         self.on_logout = on_logout_callback
         self.current_module = None
         self.active_module_instance = None
+        self.placeholder_frame = None
         
         self.setup_ui()
         
-        # Inicializar módulos
+        # Los últimos módulos usados quedan vivos y ocultos para volver al instante
+        self.module_cache = ModuleCache(self.content_area, self.create_module, max_alive=3)
+        
+        # Módulos disponibles (submódulo, clase): se importan al abrirlos
         self.modules = {
-            'dashboard': DashboardModule,
-            'usuarios': UsuariosModule,
-            'servicios': ServiciosModule,
-            'historial': HistorialModule
+            'dashboard': ('dashboard', 'DashboardModule'),
+            'usuarios': ('usuarios', 'UsuariosModule'),
+            'servicios': ('servicios', 'ServiciosModule'),
+            'historial': ('historial', 'HistorialModule')
         }
         
         # Cargar dashboard por defecto
@@ -87,7 +93,7 @@ class AdminPanel:
             padx=15,
             pady=5,
             cursor='hand2',
-            command=self.on_logout
+            command=self.logout
         )
         logout_btn.pack(side='right')
         
@@ -273,32 +279,26 @@ class AdminPanel:
                 else:
                     button.config(bg='#f8fafc', fg='#374151')
             
-            # Limpiar módulo anterior si existe
-            if self.active_module_instance:
-                self.active_module_instance.cleanup()
-            
-            # Limpiar área de contenido
-            for widget in self.content_area.winfo_children():
-                widget.destroy()
+            # Quitar el placeholder de un módulo no implementado o con error
+            if self.placeholder_frame:
+                self.placeholder_frame.destroy()
+                self.placeholder_frame = None
             
             # Resetear scroll del contenido al inicio
             self.content_canvas.yview_moveto(0)
             
-            # Cargar nuevo módulo
+            # Mostrar el módulo: el anterior solo se oculta y sigue vivo en la caché
             if module_id in self.modules:
-                module_class = self.modules[module_id]
-                self.active_module_instance = module_class(
-                    self.content_area,
-                    self.user_data,
-                    db
-                )
+                self.active_module_instance = self.module_cache.show(module_id)
                 self.current_module = module_id
-                print(f"✅ Módulo {module_id} cargado exitosamente")
+                print(f"✅ Módulo {module_id} mostrado")
                 
                 # Actualizar scroll region después de cargar el módulo
                 self.parent.after(100, self._update_scroll_region)
             else:
                 # Módulo no implementado
+                self.module_cache.hide_current()
+                self.active_module_instance = None
                 self.show_placeholder(module_id)
             
         except Exception as e:
@@ -306,6 +306,20 @@ class AdminPanel:
             messagebox.showerror("Error", f"Error al cargar el módulo {module_id}")
             self.show_error_placeholder(module_id, str(e))
     
+    def create_module(self, module_id, frame):
+        """Construir un módulo dentro del frame que le asigna la caché"""
+        submodule, class_name = self.modules[module_id]
+        module_class = getattr(importlib.import_module(f'.{submodule}', __package__), class_name)
+        module = module_class(frame, self.user_data, db)
+        module.on_data_changed = lambda: self.on_module_data_changed(module_id)
+        print(f"✅ Módulo {module_id} cargado exitosamente")
+        return module
+    
+    def logout(self):
+        """Cancelar y liberar los módulos vivos antes de cerrar sesión"""
+        self.module_cache.clear()
+        self.on_logout()
+    
     def _update_scroll_region(self):
         """Actualizar región de scroll después de cargar contenido"""
         self.content_canvas.configure(scrollregion=self.content_canvas.bbox("all"))
@@ -314,6 +328,7 @@ class AdminPanel:
         """Mostrar placeholder para módulos no implementados"""
         placeholder_frame = tk.Frame(self.content_area, bg='#f8fafc')
         placeholder_frame.pack(fill='both', expand=True, pady=50)
+        self.placeholder_frame = placeholder_frame
         
         tk.Label(
             placeholder_frame,
@@ -336,8 +351,11 @@ class AdminPanel:
     
     def show_error_placeholder(self, module_id, error_msg):
         """Mostrar placeholder de error"""
+        self.module_cache.hide_current()
+        self.active_module_instance = None
         error_frame = tk.Frame(self.content_area, bg='#f8fafc')
         error_frame.pack(fill='both', expand=True, pady=50)
+        self.placeholder_frame = error_frame
         
         tk.Label(
             error_frame,
@@ -365,4 +383,13 @@ class AdminPanel:
     def refresh_current_module(self):
         """Refrescar módulo actual"""
         if self.current_module:
-            self.switch_module(self.current_module)
\ No newline at end of file
+            self.module_cache.refresh(self.current_module)
+    
+    def invalidate_modules(self, module_id=None):
+        """Marcar módulos vivos para refrescarlos la próxima vez que se muestren"""
+        self.module_cache.invalidate(module_id)
+    
+    def on_module_data_changed(self, module_id):
+        """Un módulo guardó cambios: invalidar los que muestran esos datos"""
+        for dependent in self.DEPENDENT_MODULES.get(module_id, ()):
+            self.invalidate_modules(dependent)
\ No newline at end of file
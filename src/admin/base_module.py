@@ -2,13 +2,21 @@
 Clase base para todos los módulos del panel de administración
 """
 
+from src.utils.background import background
+
 class BaseModule:
     """Clase base para todos los módulos del admin"""
     
+    # Segundos que un módulo oculto conserva sus datos; al volver a mostrarlo
+    # después de ese tiempo el panel llama a refresh() (None = no vencen)
+    STALE_AFTER = 60
+    
     def __init__(self, parent, user_data, db_connection):
         self.parent = parent
         self.user_data = user_data
         self.db = db_connection
+        # Lo asigna el panel: refresca los módulos que muestran lo que este guarda
+        self.on_data_changed = None
         self.setup_module()
     
     def setup_module(self):
@@ -22,3 +30,19 @@ class BaseModule:
     def refresh(self):
         """Refrescar datos del módulo - opcional"""
         pass
+    
+    def notify_data_changed(self):
+        """Avisar al panel que se guardaron cambios que otros módulos muestran"""
+        if self.on_data_changed:
+            self.on_data_changed()
+    
+    def run_async(self, func, *args, callback=None, error_callback=None, **kwargs):
+        """Ejecutar func en segundo plano y entregar el resultado en el hilo de Tk"""
+        return background.submit(
+            func, *args,
+            callback=callback, error_callback=error_callback, owner=self, **kwargs
+        )
+    
+    def cancel_pending(self):
+        """Cancelar las tareas en segundo plano pendientes del módulo"""
+        background.cancel(self)
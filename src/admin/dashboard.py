@@ -7,6 +7,8 @@ from tkinter import ttk
 from datetime import datetime, timedelta
 import calendar
 from .base_module import BaseModule
+from .dashboard_data import DashboardDataProvider
+from src.ui.components import CanvasChart, TreeviewFiller
 
 class DashboardModule(BaseModule):
     """Dashboard principal con métricas del negocio"""
@@ -17,6 +19,8 @@ class DashboardModule(BaseModule):
         self.today = datetime.now()
         self.current_month = self.today.month
         self.current_year = self.today.year
+        self.load_task = None
+        self.data_provider = DashboardDataProvider(self.db)
         
         # Crear interfaz
         self.create_header()
@@ -203,9 +207,9 @@ class DashboardModule(BaseModule):
             bg='#f8fafc'
         ).pack(pady=15)
         
-        # Área del gráfico (simulado con barras texto)
-        self.daily_chart_area = tk.Frame(chart_frame, bg='white')
-        self.daily_chart_area.pack(fill='both', expand=True, padx=20, pady=20)
+        # Área del gráfico: un solo canvas que se actualiza en cada carga
+        self.daily_chart = CanvasChart(chart_frame, label_width=50)
+        self.daily_chart.pack(fill='both', expand=True, padx=20, pady=20)
     
     def create_services_chart(self, parent):
         """Crear gráfico de servicios por tipo"""
@@ -225,8 +229,12 @@ class DashboardModule(BaseModule):
         ).pack(pady=15)
         
         # Área del gráfico
-        self.services_chart_area = tk.Frame(chart_frame, bg='white')
-        self.services_chart_area.pack(fill='both', expand=True, padx=20, pady=20)
+        self.services_chart = CanvasChart(
+            chart_frame, row_height=36, show_bars=False,
+            label_font=('Segoe UI', 11, 'bold'), value_font=('Segoe UI', 10),
+            marker_font=('Segoe UI', 16), value_color='#6b7280'
+        )
+        self.services_chart.pack(fill='both', expand=True, padx=20, pady=20)
     
     def create_tables_section(self, parent):
         """Crear sección de tablas resumen"""
@@ -275,6 +283,7 @@ class DashboardModule(BaseModule):
         columns = ('Lavador', 'Servicios', 'Ingresos', 'Comisión')
         
         self.workers_tree = ttk.Treeview(table_frame, columns=columns, show='headings', height=8)
+        self.workers_filler = TreeviewFiller(self.workers_tree)
         
         # Configurar columnas
         self.workers_tree.heading('Lavador', text='Lavador')
@@ -317,6 +326,7 @@ class DashboardModule(BaseModule):
         columns = ('Fecha', 'Vehículo', 'Servicio', 'Costo')
         
         self.recent_tree = ttk.Treeview(table_frame, columns=columns, show='headings', height=8)
+        self.recent_filler = TreeviewFiller(self.recent_tree)
         
         # Configurar columnas
         self.recent_tree.heading('Fecha', text='Fecha')
@@ -354,63 +364,54 @@ class DashboardModule(BaseModule):
         self.load_dashboard_data()
     
     def load_dashboard_data(self):
-        """Cargar todos los datos del dashboard"""
-        try:
-            # Calcular fechas del período
-            start_date = f"{self.current_year}-{self.current_month:02d}-01"
-            
-            # Último día del mes
-            last_day = calendar.monthrange(self.current_year, self.current_month)[1]
-            end_date = f"{self.current_year}-{self.current_month:02d}-{last_day}"
-            
-            # Cargar KPIs
-            self.load_kpis(start_date, end_date)
-            
-            # Cargar gráficos
-            self.load_daily_chart(start_date, end_date)
-            self.load_services_chart(start_date, end_date)
-            
-            # Cargar tablas
-            self.load_workers_table(start_date, end_date)
-            self.load_recent_services()
-            
-        except Exception as e:
-            print(f"Error cargando datos del dashboard: {e}")
-            # Mostrar datos por defecto en caso de error
-            self.load_default_data()
+        """Cargar todos los datos del dashboard en segundo plano"""
+        # Calcular fechas del período
+        start_date = f"{self.current_year}-{self.current_month:02d}-01"
+        
+        # Último día del mes
+        last_day = calendar.monthrange(self.current_year, self.current_month)[1]
+        end_date = f"{self.current_year}-{self.current_month:02d}-{last_day}"
+        
+        # Descartar una carga anterior que aún no haya terminado
+        if self.load_task:
+            self.load_task.cancel()
+        
+        self.load_task = self.run_async(
+            self.fetch_dashboard_data, start_date, end_date,
+            callback=self.render_dashboard_data,
+            error_callback=self.on_load_error
+        )
     
-    def load_kpis(self, start_date, end_date):
+    def fetch_dashboard_data(self, start_date, end_date):
+        """Ejecutar la consulta agregada del dashboard (corre fuera del hilo de Tk)"""
+        return self.data_provider.fetch(start_date, end_date)
+    
+    def render_dashboard_data(self, data):
+        """Pintar los resultados del dashboard en los widgets"""
+        self.load_task = None
+        
+        # Cargar KPIs
+        self.load_kpis(data['kpis'], data['servicios_hoy'])
+        
+        # Cargar gráficos
+        self.load_daily_chart(data['daily'])
+        self.load_services_chart(data['services'])
+        
+        # Cargar tablas
+        self.load_workers_table(data['workers'])
+        self.load_recent_services(data['recent'])
+    
+    def on_load_error(self, error):
+        """Manejar error en la carga en segundo plano"""
+        self.load_task = None
+        print(f"Error cargando datos del dashboard: {error}")
+        # Mostrar datos por defecto en caso de error
+        self.load_default_data()
+    
+    def load_kpis(self, data, servicios_hoy):
         """Cargar KPIs principales"""
         try:
-            # Query para KPIs del período
-            kpi_query = """
-                SELECT 
-                    COALESCE(SUM(costo), 0) as total_ingresos,
-                    COUNT(*) as total_servicios,
-                    COALESCE(AVG(costo), 0) as promedio_servicio,
-                    COALESCE(SUM(comision_calculada), 0) as total_comisiones,
-                    COALESCE(SUM(ganancia_neta), 0) as ganancia_neta
-                FROM vista_registros_completos 
-                WHERE fecha BETWEEN %s AND %s
-                AND pago = 'Pagado'
-            """
-            
-            kpi_result = self.db.execute_query(kpi_query, (start_date, end_date))
-            
-            # Query para servicios de hoy
-            today_query = """
-                SELECT COUNT(*) as servicios_hoy
-                FROM vista_registros_completos 
-                WHERE fecha = CURDATE()
-                AND pago = 'Pagado'
-            """
-            
-            today_result = self.db.execute_query(today_query)
-            
-            if kpi_result:
-                data = kpi_result[0]
-                servicios_hoy = today_result[0]['servicios_hoy'] if today_result else 0
-                
+            if data:
                 # Actualizar KPIs
                 self.kpi_cards['total_ingresos'].config(text=f"${data['total_ingresos']:,.0f}")
                 self.kpi_cards['total_servicios'].config(text=f"{data['total_servicios']:,}")
@@ -425,218 +426,83 @@ class DashboardModule(BaseModule):
             for key in self.kpi_cards:
                 self.kpi_cards[key].config(text="N/A")
     
-    def load_daily_chart(self, start_date, end_date):
+    def load_daily_chart(self, daily_result):
         """Cargar gráfico de ingresos diarios"""
         try:
-            # Limpiar área del gráfico
-            for widget in self.daily_chart_area.winfo_children():
-                widget.destroy()
-            
-            # Query para ingresos diarios
-            daily_query = """
-                SELECT 
-                    DATE(fecha) as dia,
-                    COALESCE(SUM(costo), 0) as ingresos_dia
-                FROM vista_registros_completos 
-                WHERE fecha BETWEEN %s AND %s
-                AND pago = 'Pagado'
-                GROUP BY DATE(fecha)
-                ORDER BY dia DESC
-                LIMIT 15
-            """
-            
-            daily_result = self.db.execute_query(daily_query, (start_date, end_date))
-            
+            rows = []
             if daily_result:
-                # Crear gráfico de barras simple
-                max_ingreso = max([row['ingresos_dia'] for row in daily_result]) if daily_result else 1
+                max_ingreso = max(row['ingresos_dia'] for row in daily_result)
                 
-                for i, row in enumerate(daily_result[:10]):  # Mostrar últimos 10 días
-                    # Frame para cada barra
-                    bar_frame = tk.Frame(self.daily_chart_area, bg='white')
-                    bar_frame.pack(fill='x', pady=2)
-                    
-                    # Fecha
+                for row in daily_result[:10]:  # Mostrar últimos 10 días
                     date_str = row['dia'].strftime('%d/%m') if hasattr(row['dia'], 'strftime') else str(row['dia'])
-                    tk.Label(
-                        bar_frame,
-                        text=date_str,
-                        font=('Segoe UI', 9),
-                        bg='white',
-                        width=8
-                    ).pack(side='left')
-                    
-                    # Barra visual
-                    bar_width = int((row['ingresos_dia'] / max_ingreso) * 200) if max_ingreso > 0 else 0
-                    bar_color = '#059669' if row['ingresos_dia'] > 0 else '#e5e7eb'
-                    
-                    bar_canvas = tk.Canvas(bar_frame, height=20, bg='white', highlightthickness=0)
-                    bar_canvas.pack(side='left', fill='x', expand=True, padx=(10, 0))
-                    
-                    if bar_width > 0:
-                        bar_canvas.create_rectangle(0, 5, bar_width, 15, fill=bar_color, outline=bar_color)
-                    
-                    # Valor
-                    tk.Label(
-                        bar_frame,
-                        text=f"${row['ingresos_dia']:,.0f}",
-                        font=('Segoe UI', 9, 'bold'),
-                        bg='white',
-                        fg='#374151'
-                    ).pack(side='right', padx=(10, 0))
-            else:
-                tk.Label(
-                    self.daily_chart_area,
-                    text="No hay datos para mostrar",
-                    font=('Segoe UI', 12),
-                    fg='#6b7280',
-                    bg='white'
-                ).pack(expand=True)
+                    rows.append({
+                        'label': date_str,
+                        'value': f"${row['ingresos_dia']:,.0f}",
+                        'fraction': row['ingresos_dia'] / max_ingreso if max_ingreso > 0 else 0,
+                        'color': '#059669'
+                    })
+            
+            # Mismos ítems del canvas: solo cambian textos y coordenadas
+            self.daily_chart.update_rows(rows)
                 
         except Exception as e:
             print(f"Error cargando gráfico diario: {e}")
     
-    def load_services_chart(self, start_date, end_date):
+    def load_services_chart(self, services_result):
         """Cargar gráfico de servicios por tipo"""
         try:
-            # Limpiar área del gráfico
-            for widget in self.services_chart_area.winfo_children():
-                widget.destroy()
-            
-            # Query para servicios por tipo de vehículo
-            services_query = """
-                SELECT 
-                    vehiculo_nombre,
-                    COUNT(*) as cantidad,
-                    COALESCE(SUM(costo), 0) as ingresos_tipo
-                FROM vista_registros_completos 
-                WHERE fecha BETWEEN %s AND %s
-                AND pago = 'Pagado'
-                GROUP BY vehiculo_nombre
-                ORDER BY cantidad DESC
-            """
-            
-            services_result = self.db.execute_query(services_query, (start_date, end_date))
-            
+            rows = []
             if services_result:
                 total_servicios = sum([row['cantidad'] for row in services_result])
                 colors = ['#2563eb', '#059669', '#d97706', '#dc2626', '#7c3aed']
                 
                 for i, row in enumerate(services_result):
-                    # Frame para cada tipo
-                    item_frame = tk.Frame(self.services_chart_area, bg='white')
-                    item_frame.pack(fill='x', pady=5)
-                    
-                    # Color indicator
-                    color = colors[i % len(colors)]
-                    color_label = tk.Label(
-                        item_frame,
-                        text="●",
-                        font=('Segoe UI', 16),
-                        fg=color,
-                        bg='white'
-                    )
-                    color_label.pack(side='left', padx=(0, 10))
-                    
-                    # Nombre del vehículo
-                    tk.Label(
-                        item_frame,
-                        text=row['vehiculo_nombre'],
-                        font=('Segoe UI', 11, 'bold'),
-                        bg='white',
-                        fg='#374151'
-                    ).pack(side='left')
-                    
                     # Porcentaje y cantidad
                     percentage = (row['cantidad'] / total_servicios) * 100 if total_servicios > 0 else 0
-                    info_text = f"{percentage:.1f}% ({row['cantidad']} servicios)"
-                    
-                    tk.Label(
-                        item_frame,
-                        text=info_text,
-                        font=('Segoe UI', 10),
-                        bg='white',
-                        fg='#6b7280'
-                    ).pack(side='right')
-            else:
-                tk.Label(
-                    self.services_chart_area,
-                    text="No hay datos para mostrar",
-                    font=('Segoe UI', 12),
-                    fg='#6b7280',
-                    bg='white'
-                ).pack(expand=True)
+                    rows.append({
+                        'marker': "●",
+                        'marker_color': colors[i % len(colors)],
+                        'label': row['vehiculo_nombre'],
+                        'value': f"{percentage:.1f}% ({row['cantidad']} servicios)"
+                    })
+            
+            self.services_chart.update_rows(rows)
                 
         except Exception as e:
             print(f"Error cargando gráfico de servicios: {e}")
     
-    def load_workers_table(self, start_date, end_date):
+    def load_workers_table(self, workers_result):
         """Cargar tabla de rendimiento de lavadores"""
         try:
-            # Limpiar tabla
-            for item in self.workers_tree.get_children():
-                self.workers_tree.delete(item)
-            
-            # Query para rendimiento de lavadores
-            workers_query = """
-                SELECT 
-                    lavador,
-                    COUNT(*) as total_servicios,
-                    COALESCE(SUM(costo), 0) as total_ingresos,
-                    COALESCE(SUM(comision_calculada), 0) as total_comision
-                FROM vista_registros_completos 
-                WHERE fecha BETWEEN %s AND %s
-                AND pago = 'Pagado'
-                GROUP BY lavador
-                ORDER BY total_ingresos DESC
-            """
-            
-            workers_result = self.db.execute_query(workers_query, (start_date, end_date))
-            
-            if workers_result:
-                for row in workers_result:
-                    self.workers_tree.insert('', 'end', values=(
-                        row['lavador'],
-                        f"{row['total_servicios']}",
-                        f"${row['total_ingresos']:,.0f}",
-                        f"${row['total_comision']:,.0f}"
-                    ))
+            self.workers_filler.replace(
+                ((
+                    row['lavador'],
+                    f"{row['total_servicios']}",
+                    f"${row['total_ingresos']:,.0f}",
+                    f"${row['total_comision']:,.0f}"
+                ), ())
+                for row in workers_result or []
+            )
                     
         except Exception as e:
             print(f"Error cargando tabla de lavadores: {e}")
     
-    def load_recent_services(self):
+    def load_recent_services(self, recent_result):
         """Cargar servicios recientes"""
         try:
-            # Limpiar tabla
-            for item in self.recent_tree.get_children():
-                self.recent_tree.delete(item)
-            
-            # Query para servicios recientes
-            recent_query = """
-                SELECT 
-                    fecha,
-                    vehiculo_nombre,
-                    servicio_nombre,
-                    costo
-                FROM vista_registros_completos 
-                WHERE pago = 'Pagado'
-                ORDER BY fecha DESC, hora DESC
-                LIMIT 15
-            """
-            
-            recent_result = self.db.execute_query(recent_query)
+            rows = []
+            for row in recent_result or []:
+                fecha_str = row['fecha'].strftime('%d/%m') if hasattr(row['fecha'], 'strftime') else str(row['fecha'])
+                
+                rows.append((row['id'], (
+                    fecha_str,
+                    row['vehiculo_nombre'],
+                    row['servicio_nombre'][:15] + "..." if len(row['servicio_nombre']) > 15 else row['servicio_nombre'],
+                    f"${row['costo']:,.0f}"
+                ), ()))
             
-            if recent_result:
-                for row in recent_result:
-                    fecha_str = row['fecha'].strftime('%d/%m') if hasattr(row['fecha'], 'strftime') else str(row['fecha'])
-                    
-                    self.recent_tree.insert('', 'end', values=(
-                        fecha_str,
-                        row['vehiculo_nombre'],
-                        row['servicio_nombre'][:15] + "..." if len(row['servicio_nombre']) > 15 else row['servicio_nombre'],
-                        f"${row['costo']:,.0f}"
-                    ))
+            # Por id: un servicio nuevo solo inserta su fila y descarta la más antigua
+            self.recent_filler.sync(rows)
                     
         except Exception as e:
             print(f"Error cargando servicios recientes: {e}")
@@ -653,4 +519,4 @@ class DashboardModule(BaseModule):
     
     def cleanup(self):
         """Limpiar recursos del dashboard"""
-        pass
\ No newline at end of file
+        self.cancel_pending()
\ No newline at end of file
@@ -0,0 +1,148 @@
+"""
+Proveedor de datos del Dashboard - Agregación en una sola pasada
+"""
+
+from datetime import date, datetime
+
+
+class DashboardDataProvider:
+    """Obtiene los datos del dashboard con una única consulta agrupada del período"""
+    
+    # Una fila por día × tipo de vehículo × lavador con pagos confirmados,
+    # leída de resumen_diario en lugar de recorrer registros
+    ROWS_QUERY = """
+        SELECT
+            rd.fecha as dia,
+            CASE
+                WHEN rd.vehiculo = 'motorcycle' THEN 'Motocicleta'
+                WHEN rd.vehiculo = 'car' THEN 'Automóvil'
+                WHEN rd.vehiculo = 'pickup' THEN 'Camioneta'
+                WHEN rd.vehiculo = 'suv' THEN 'SUV'
+                WHEN rd.vehiculo = 'truck' THEN 'Camión'
+            END as vehiculo_nombre,
+            rd.id_lavador,
+            TRIM(CONCAT(l.nombre, ' ', l.apellido)) as lavador,
+            CAST(SUM(rd.cantidad) AS SIGNED) as cantidad,
+            SUM(rd.total_costo) as ingresos,
+            SUM(rd.total_comision) as comisiones,
+            SUM(rd.total_ganancia) as ganancia
+        FROM resumen_diario rd
+        LEFT JOIN lavadores l ON rd.id_lavador = l.id
+        WHERE rd.pago = 'Pagado'
+        AND {fecha}
+        GROUP BY rd.fecha, rd.vehiculo, rd.id_lavador, l.nombre, l.apellido
+    """
+    
+    # Rango del período sobre la llave primaria (fecha, ...)
+    PERIOD_QUERY = ROWS_QUERY.format(fecha="rd.fecha BETWEEN %s AND %s")
+    
+    # Servicios de hoy cuando hoy queda fuera del período: búsqueda puntual
+    TODAY_QUERY = ROWS_QUERY.format(fecha="rd.fecha = %s")
+    
+    # Los servicios recientes no dependen del período seleccionado
+    RECENT_QUERY = """
+        SELECT
+            id,
+            fecha,
+            vehiculo_nombre,
+            servicio_nombre,
+            costo
+        FROM vista_registros_completos
+        WHERE pago = 'Pagado'
+        ORDER BY fecha DESC, hora DESC
+        LIMIT 15
+    """
+    
+    DAILY_LIMIT = 15
+    
+    def __init__(self, db_connection):
+        self.db = db_connection
+    
+    def fetch(self, start_date, end_date, today=None):
+        """Consultar y derivar todos los widgets del dashboard"""
+        today = today or date.today()
+        
+        start_date, end_date = self._to_date(start_date), self._to_date(end_date)
+        
+        rows = self.db.execute_query(self.PERIOD_QUERY, (start_date, end_date))
+        if rows is not None and not start_date <= today <= end_date:
+            today_rows = self.db.execute_query(self.TODAY_QUERY, (today,))
+            rows = None if today_rows is None else rows + today_rows
+        if rows is None:
+            raise RuntimeError("No se pudieron consultar los datos del período")
+        
+        data = self.aggregate(rows, start_date, end_date, today)
+        data['recent'] = self.db.execute_query(self.RECENT_QUERY) or []
+        return data
+    
+    def aggregate(self, rows, start_date, end_date, today):
+        """Derivar KPIs, gráficos y tablas a partir de las filas agrupadas"""
+        total_servicios = 0
+        total_ingresos = 0
+        total_comisiones = 0
+        ganancia_neta = 0
+        servicios_hoy = 0
+        daily = {}
+        vehicles = {}
+        workers = {}
+        
+        for row in rows:
+            dia = self._to_date(row['dia'])
+            
+            if dia == today:
+                servicios_hoy += row['cantidad']
+            
+            # La fila de hoy puede estar fuera del período seleccionado
+            if not (start_date <= dia <= end_date):
+                continue
+            
+            total_servicios += row['cantidad']
+            total_ingresos += row['ingresos']
+            total_comisiones += row['comisiones']
+            ganancia_neta += row['ganancia']
+            
+            daily[dia] = daily.get(dia, 0) + row['ingresos']
+            
+            vehicle = vehicles.setdefault(
+                row['vehiculo_nombre'],
+                {'vehiculo_nombre': row['vehiculo_nombre'], 'cantidad': 0, 'ingresos_tipo': 0}
+            )
+            vehicle['cantidad'] += row['cantidad']
+            vehicle['ingresos_tipo'] += row['ingresos']
+            
+            worker = workers.setdefault(
+                row['id_lavador'],
+                {'lavador': row['lavador'], 'total_servicios': 0, 'total_ingresos': 0, 'total_comision': 0}
+            )
+            worker['total_servicios'] += row['cantidad']
+            worker['total_ingresos'] += row['ingresos']
+            worker['total_comision'] += row['comisiones']
+        
+        kpis = {
+            'total_ingresos': total_ingresos,
+            'total_servicios': total_servicios,
+            'promedio_servicio': total_ingresos / total_servicios if total_servicios else 0,
+            'total_comisiones': total_comisiones,
+            'ganancia_neta': ganancia_neta
+        }
+        
+        daily_rows = [
+            {'dia': dia, 'ingresos_dia': ingresos}
+            for dia, ingresos in sorted(daily.items(), reverse=True)[:self.DAILY_LIMIT]
+        ]
+        
+        return {
+            'kpis': kpis,
+            'servicios_hoy': servicios_hoy,
+            'daily': daily_rows,
+            'services': sorted(vehicles.values(), key=lambda v: v['cantidad'], reverse=True),
+            'workers': sorted(workers.values(), key=lambda w: w['total_ingresos'], reverse=True)
+        }
+    
+    def _to_date(self, value):
+        """Normalizar fechas recibidas como texto o datetime"""
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        return datetime.strptime(str(value), '%Y-%m-%d').date()
@@ -5,20 +5,41 @@ Módulo de Historial Completo - Visualización y Análisis de Registros
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from datetime import datetime, timedelta
+from collections import deque
 import calendar
+import importlib.util
 from .base_module import BaseModule
+from .historial_data import HistorialQuery
+from src.utils.export import TableExporter, ExportJob, ExportCancelled
+from src.utils.debounce import Debouncer
 
-# Para exportar a Excel
-try:
-    import openpyxl
-    from openpyxl.styles import Font, PatternFill, Alignment
-    EXCEL_AVAILABLE = True
-except ImportError:
-    EXCEL_AVAILABLE = False
+# Para exportar a Excel (el CSV no requiere dependencias). Solo se comprueba
+# que esté instalado: openpyxl se importa al exportar
+EXCEL_AVAILABLE = importlib.util.find_spec('openpyxl') is not None
 
 class HistorialModule(BaseModule):
     """Módulo completo de historial con filtros avanzados y exportación"""
     
+    # Filas por página y páginas que se mantienen materializadas en la tabla
+    PAGE_SIZE = 200
+    MAX_PAGES = 5
+    # Fracción del scroll cerca de un extremo que dispara la carga de otra página
+    SCROLL_MARGIN = 0.1
+    
+    # (encabezado, columna, tipo de celda, ancho) del archivo exportado
+    EXPORT_COLUMNS = [
+        ('ID', 'id', 'int', 8),
+        ('Fecha', 'fecha', 'date', 12),
+        ('Hora', 'hora', 'time', 10),
+        ('Tipo Vehículo', 'vehiculo_nombre', 'text', 15),
+        ('Placa', 'placa', 'text', 10),
+        ('Servicio', 'servicio_nombre', 'text', 30),
+        ('Lavador', 'lavador', 'text', 25),
+        ('Costo', 'costo', 'money', 12),
+        ('Comisión', 'comision_calculada', 'money', 12),
+        ('Estado', 'pago', 'text', 10)
+    ]
+    
     def setup_module(self):
         """Configurar módulo de historial"""
         # Estado inicial de filtros
@@ -26,10 +47,27 @@ class HistorialModule(BaseModule):
             'fecha_inicio': None,
             'fecha_fin': None,
             'lavador': 'Todos',
+            'id_lavador': None,
             'vehiculo': 'Todos',
             'servicio': 'Todos',
             'estado_pago': 'Todos'
         }
+        # Nombre mostrado en el combo -> id del lavador
+        self.lavador_ids = {}
+        self.load_task = None
+        self.page_task = None
+        self.stats_task = None
+        self.export_job = None
+        self.export_window = None
+        self.pages = deque()
+        self.has_more_before = False
+        self.has_more_after = False
+        self.active_query = HistorialQuery(self.current_filters)
+        
+        # Las teclas en las fechas reprograman una sola recarga
+        self.filter_debouncer = Debouncer(
+            self.parent, self.apply_filters, delay=600, on_trigger=self.cancel_loads
+        )
         
         # Configurar interfaz
         self.create_header()
@@ -50,18 +88,17 @@ class HistorialModule(BaseModule):
         actions_frame = tk.Frame(header_frame, bg='#f8fafc')
         actions_frame.pack(side='left')
         
-        # Botón Exportar Excel
+        # Botón Exportar (CSV siempre disponible; Excel requiere openpyxl)
         export_btn = tk.Button(
             actions_frame,
-            text="📊 Exportar Excel" if EXCEL_AVAILABLE else "📊 Excel N/D",
+            text="📊 Exportar Excel" if EXCEL_AVAILABLE else "📄 Exportar CSV",
             font=('Segoe UI', 12, 'bold'),
-            bg='#059669' if EXCEL_AVAILABLE else '#9ca3af',
+            bg='#059669',
             fg='white',
             relief='flat',
             padx=20,
             pady=10,
-            cursor='hand2' if EXCEL_AVAILABLE else 'not-allowed',
-            state='normal' if EXCEL_AVAILABLE else 'disabled',
+            cursor='hand2',
             command=self.export_to_excel
         )
         export_btn.pack(side='right', padx=(10, 0))
@@ -264,16 +301,16 @@ class HistorialModule(BaseModule):
             padx=30,
             pady=12,
             cursor='hand2',
-            command=self.apply_filters
+            command=self.filter_debouncer.run_now
         )
         apply_btn.pack()
         
         # Bind eventos para aplicar filtros automáticamente
         for combo in [self.lavador_combo, self.vehiculo_combo, self.servicio_combo, self.estado_combo]:
-            combo.bind('<<ComboboxSelected>>', lambda e: self.apply_filters())
+            combo.bind('<<ComboboxSelected>>', lambda e: self.filter_debouncer.run_now())
         
         for entry in [fecha_inicio_entry, fecha_fin_entry]:
-            entry.bind('<KeyRelease>', lambda e: self.parent.after(1000, self.apply_filters))
+            entry.bind('<KeyRelease>', lambda e: self.filter_debouncer.trigger())
     
     def create_results_section(self):
         """Crear sección de resultados"""
@@ -320,15 +357,15 @@ class HistorialModule(BaseModule):
             self.results_tree.heading(col, text=col)
             self.results_tree.column(col, width=width, anchor=anchor)
         
-        # Scrollbars
-        v_scrollbar = ttk.Scrollbar(table_container, orient='vertical', command=self.results_tree.yview)
+        # Scrollbars (el vertical también pide páginas al acercarse a un extremo)
+        self.results_scrollbar = ttk.Scrollbar(table_container, orient='vertical', command=self.results_tree.yview)
         h_scrollbar = ttk.Scrollbar(table_container, orient='horizontal', command=self.results_tree.xview)
         
-        self.results_tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+        self.results_tree.configure(yscrollcommand=self.on_results_scroll, xscrollcommand=h_scrollbar.set)
         
         # Pack elementos
         self.results_tree.grid(row=0, column=0, sticky='nsew')
-        v_scrollbar.grid(row=0, column=1, sticky='ns')
+        self.results_scrollbar.grid(row=0, column=1, sticky='ns')
         h_scrollbar.grid(row=1, column=0, sticky='ew')
         
         table_container.grid_rowconfigure(0, weight=1)
@@ -355,6 +392,20 @@ class HistorialModule(BaseModule):
             bg='#f8fafc'
         ).pack(side='left', padx=20, pady=15)
         
+        # Recalcular estadísticas sin volver a consultar las filas
+        tk.Button(
+            stats_header,
+            text="🔄 Actualizar",
+            font=('Segoe UI', 10, 'bold'),
+            bg='#6b7280',
+            fg='white',
+            relief='flat',
+            padx=12,
+            pady=4,
+            cursor='hand2',
+            command=self.load_statistics
+        ).pack(side='right', padx=20)
+        
         # Container de estadísticas
         stats_container = tk.Frame(stats_frame, bg='white')
         stats_container.pack(fill='x', padx=20, pady=20)
@@ -443,28 +494,49 @@ class HistorialModule(BaseModule):
         """Establecer fechas rápidas"""
         self.fecha_inicio_var.set(fecha_inicio.strftime('%Y-%m-%d'))
         self.fecha_fin_var.set(fecha_fin.strftime('%Y-%m-%d'))
-        self.apply_filters()
+        self.filter_debouncer.run_now()
     
     def load_filter_options(self):
-        """Cargar opciones para los filtros"""
+        """Cargar opciones para los filtros en segundo plano"""
+        self.run_async(
+            self.fetch_filter_options,
+            callback=self.render_filter_options,
+            error_callback=lambda e: print(f"Error cargando opciones de filtros: {e}")
+        )
+    
+    def fetch_filter_options(self):
+        """Consultar lavadores y servicios disponibles (fuera del hilo de Tk)"""
+        # Solo lavadores con historial; EXISTS usa el índice de registros.id_lavador
+        lavadores_query = """
+            SELECT l.id, TRIM(CONCAT(l.nombre, ' ', l.apellido)) as lavador
+            FROM lavadores l
+            WHERE EXISTS (SELECT 1 FROM registros r WHERE r.id_lavador = l.id)
+            ORDER BY lavador
+        """
+        servicios_query = "SELECT DISTINCT servicio_nombre FROM vista_registros_completos ORDER BY servicio_nombre"
+        return {
+            'lavadores': self.db.execute_query(lavadores_query),
+            'servicios': self.db.execute_query(servicios_query)
+        }
+    
+    def render_filter_options(self, options):
+        """Llenar los combos de filtros"""
         try:
             # Cargar lavadores
-            lavadores_query = "SELECT DISTINCT lavador FROM vista_registros_completos ORDER BY lavador"
-            lavadores_result = self.db.execute_query(lavadores_query)
-            
-            lavadores = ['Todos']
-            if lavadores_result:
-                lavadores.extend([row['lavador'] for row in lavadores_result])
+            self.lavador_ids = {}
+            for row in options['lavadores'] or []:
+                name = row['lavador']
+                # Distinguir lavadores con el mismo nombre
+                if name in self.lavador_ids:
+                    name = f"{name} (#{row['id']})"
+                self.lavador_ids[name] = row['id']
             
-            self.lavador_combo['values'] = lavadores
+            self.lavador_combo['values'] = ['Todos'] + list(self.lavador_ids)
             
             # Cargar servicios
-            servicios_query = "SELECT DISTINCT servicio_nombre FROM vista_registros_completos ORDER BY servicio_nombre"
-            servicios_result = self.db.execute_query(servicios_query)
-            
             servicios = ['Todos']
-            if servicios_result:
-                servicios.extend([row['servicio_nombre'] for row in servicios_result])
+            if options['servicios']:
+                servicios.extend([row['servicio_nombre'] for row in options['servicios']])
             
             self.servicio_combo['values'] = servicios
             
@@ -484,11 +556,13 @@ class HistorialModule(BaseModule):
             'fecha_inicio': None,
             'fecha_fin': None,
             'lavador': 'Todos',
+            'id_lavador': None,
             'vehiculo': 'Todos',
             'servicio': 'Todos',
             'estado_pago': 'Todos'
         }
         
+        self.filter_debouncer.cancel()
         self.load_historial_data()
     
     def apply_filters(self):
@@ -497,6 +571,7 @@ class HistorialModule(BaseModule):
         self.current_filters['fecha_inicio'] = self.fecha_inicio_var.get().strip() or None
         self.current_filters['fecha_fin'] = self.fecha_fin_var.get().strip() or None
         self.current_filters['lavador'] = self.lavador_var.get()
+        self.current_filters['id_lavador'] = self.lavador_ids.get(self.lavador_var.get())
         self.current_filters['vehiculo'] = self.vehiculo_var.get()
         self.current_filters['servicio'] = self.servicio_var.get()
         self.current_filters['estado_pago'] = self.estado_var.get()
@@ -504,221 +579,355 @@ class HistorialModule(BaseModule):
         # Cargar datos filtrados
         self.load_historial_data()
     
+    def cancel_loads(self):
+        """Cancelar consultas en curso cuyo resultado ya no corresponde a los filtros"""
+        for task in (self.load_task, self.page_task, self.stats_task):
+            if task:
+                task.cancel()
+        self.load_task = None
+        self.page_task = None
+        self.stats_task = None
+    
     def load_historial_data(self):
-        """Cargar datos del historial con filtros aplicados"""
+        """Cargar la primera página del historial y sus estadísticas"""
         try:
-            # Limpiar tabla
-            for item in self.results_tree.get_children():
-                self.results_tree.delete(item)
-            
-            # Construir query base
-            base_query = """
-                SELECT 
-                    id, fecha, hora, vehiculo_nombre, placa, servicio_nombre,
-                    lavador, costo, comision_calculada, pago
-                FROM vista_registros_completos
-                WHERE 1=1
-            """
-            
-            params = []
+            self.active_query = HistorialQuery(self.current_filters)
             
-            # Aplicar filtros
-            if self.current_filters['fecha_inicio']:
-                base_query += " AND fecha >= %s"
-                params.append(self.current_filters['fecha_inicio'])
+            # Descartar consultas anteriores cuyo resultado ya no aplica
+            self.cancel_loads()
             
-            if self.current_filters['fecha_fin']:
-                base_query += " AND fecha <= %s"
-                params.append(self.current_filters['fecha_fin'])
+            self.results_title.config(text="📊 Resultados del Historial (Cargando...)")
             
-            if self.current_filters['lavador'] != 'Todos':
-                base_query += " AND lavador = %s"
-                params.append(self.current_filters['lavador'])
-            
-            if self.current_filters['vehiculo'] != 'Todos':
-                # Mapear nombres a valores de BD
-                vehiculo_map = {
-                    'Motocicleta': 'motorcycle',
-                    'Automóvil': 'car',
-                    'Camioneta': 'pickup',
-                    'SUV': 'suv',
-                    'Camión': 'truck'
-                }
-                if self.current_filters['vehiculo'] in vehiculo_map:
-                    base_query += " AND vehiculo = %s"
-                    params.append(vehiculo_map[self.current_filters['vehiculo']])
-            
-            if self.current_filters['servicio'] != 'Todos':
-                base_query += " AND servicio_nombre = %s"
-                params.append(self.current_filters['servicio'])
-            
-            if self.current_filters['estado_pago'] != 'Todos':
-                base_query += " AND pago = %s"
-                params.append(self.current_filters['estado_pago'])
-            
-            base_query += " ORDER BY fecha DESC, hora DESC"
+            # Ejecutar query en segundo plano
+            self.load_task = self.run_async(
+                self.db.execute_query, *self.active_query.rows_query(limit=self.PAGE_SIZE),
+                callback=self.render_historial_data,
+                error_callback=self.on_load_error
+            )
             
-            # Ejecutar query
-            results = self.db.execute_query(base_query, params if params else None)
+            self.load_statistics()
             
-            if results:
-                for row in results:
-                    # Determinar tag por estado
-                    tag = 'pagado' if row['pago'] == 'Pagado' else 'pendiente'
-                    
-                    self.results_tree.insert('', 'end', values=(
-                        row['id'],
-                        row['fecha'].strftime('%d/%m/%Y') if hasattr(row['fecha'], 'strftime') else str(row['fecha']),
-                        str(row['hora']),
-                        row['vehiculo_nombre'],
-                        row['placa'],
-                        row['servicio_nombre'],
-                        row['lavador'],
-                        f"${row['costo']:,.0f}",
-                        f"${row['comision_calculada']:,.0f}",
-                        row['pago']
-                    ), tags=(tag,))
+        except Exception as e:
+            self.on_load_error(e)
+    
+    def render_historial_data(self, rows):
+        """Reiniciar la ventana de resultados con la primera página"""
+        self.load_task = None
+        if rows is None:
+            self.on_load_error(RuntimeError("No se pudo consultar el historial"))
+            return
+        
+        try:
+            # Limpiar tabla
+            children = self.results_tree.get_children()
+            if children:
+                self.results_tree.delete(*children)
             
-            # Actualizar título con contador
-            total_records = len(results) if results else 0
-            self.results_title.config(text=f"📊 Resultados del Historial ({total_records:,} registros)")
+            self.pages.clear()
+            self.has_more_before = False
+            self.has_more_after = len(rows) == self.PAGE_SIZE
             
-            # Actualizar estadísticas
-            self.update_statistics(results)
+            if rows:
+                self.add_page(rows, at_end=True)
+            self.results_tree.yview_moveto(0)
             
         except Exception as e:
-            print(f"Error cargando historial: {e}")
-            self.results_title.config(text="📊 Error al cargar historial")
-            messagebox.showerror("Error", "Error al cargar el historial de servicios")
+            self.on_load_error(e)
     
-    def update_statistics(self, data):
-        """Actualizar estadísticas basadas en los datos filtrados"""
-        if not data:
+    def on_results_scroll(self, first, last):
+        """Actualizar el scrollbar y pedir otra página al acercarse a un extremo"""
+        self.results_scrollbar.set(first, last)
+        
+        if self.load_task or self.page_task or not self.pages:
+            return
+        
+        if float(last) >= 1 - self.SCROLL_MARGIN and self.has_more_after:
+            self.load_page('after')
+        elif float(first) <= self.SCROLL_MARGIN and self.has_more_before:
+            self.load_page('before')
+    
+    def load_page(self, direction):
+        """Consultar la página siguiente ('after') o anterior ('before') a la ventana"""
+        if direction == 'after':
+            edge = {'after': self.pages[-1]['rows'][-1]}
+        else:
+            edge = {'before': self.pages[0]['rows'][0]}
+        
+        query, params = self.active_query.rows_query(limit=self.PAGE_SIZE, **edge)
+        
+        self.page_task = self.run_async(
+            self.db.execute_query, query, params,
+            callback=lambda rows: self.render_page(direction, rows),
+            error_callback=self.on_load_error
+        )
+    
+    def render_page(self, direction, rows):
+        """Agregar una página a la ventana y descartar la del extremo opuesto"""
+        self.page_task = None
+        if rows is None:
+            self.on_load_error(RuntimeError("No se pudo consultar la página"))
+            return
+        
+        # Fila visible arriba, para conservar la posición al insertar o descartar
+        children = self.results_tree.get_children()
+        anchor = children[min(int(float(self.results_tree.yview()[0]) * len(children)), len(children) - 1)]
+        
+        if direction == 'after':
+            self.has_more_after = len(rows) == self.PAGE_SIZE
+            if rows:
+                self.add_page(rows, at_end=True)
+            if len(self.pages) > self.MAX_PAGES:
+                self.results_tree.delete(*self.pages.popleft()['iids'])
+                self.has_more_before = True
+        else:
+            rows.reverse()
+            self.has_more_before = len(rows) == self.PAGE_SIZE
+            if rows:
+                self.add_page(rows, at_end=False)
+            if len(self.pages) > self.MAX_PAGES:
+                self.results_tree.delete(*self.pages.pop()['iids'])
+                self.has_more_after = True
+        
+        if self.results_tree.exists(anchor):
+            total = len(self.results_tree.get_children())
+            self.results_tree.yview_moveto(self.results_tree.index(anchor) / total)
+    
+    def add_page(self, rows, at_end):
+        """Materializar una página de filas al final o al inicio de la tabla"""
+        iids = []
+        for offset, row in enumerate(rows):
+            # Determinar tag por estado
+            tag = 'pagado' if row['pago'] == 'Pagado' else 'pendiente'
+            iids.append(self.results_tree.insert(
+                '', 'end' if at_end else offset,
+                values=self.format_row(row), tags=(tag,)
+            ))
+        
+        page = {'rows': rows, 'iids': iids}
+        if at_end:
+            self.pages.append(page)
+        else:
+            self.pages.appendleft(page)
+    
+    def format_row(self, row):
+        """Valores de una fila tal como se muestran en la tabla"""
+        return (
+            row['id'],
+            row['fecha'].strftime('%d/%m/%Y') if hasattr(row['fecha'], 'strftime') else str(row['fecha']),
+            str(row['hora']),
+            row['vehiculo_nombre'],
+            row['placa'],
+            row['servicio_nombre'],
+            row['lavador'],
+            f"${row['costo']:,.0f}",
+            f"${row['comision_calculada']:,.0f}",
+            row['pago']
+        )
+    
+    def on_load_error(self, error):
+        """Manejar error al cargar el historial"""
+        self.load_task = None
+        self.page_task = None
+        print(f"Error cargando historial: {error}")
+        self.results_title.config(text="📊 Error al cargar historial")
+        messagebox.showerror("Error", "Error al cargar el historial de servicios")
+    
+    def load_statistics(self):
+        """Consultar en el servidor las estadísticas del filtro activo"""
+        if self.stats_task:
+            self.stats_task.cancel()
+        
+        self.stats_task = self.run_async(
+            self.db.execute_query, *self.active_query.stats_query(),
+            callback=self.render_statistics,
+            error_callback=self.on_stats_error
+        )
+    
+    def render_statistics(self, result):
+        """Pintar el contador de resultados y el panel de estadísticas"""
+        self.stats_task = None
+        if not result:
+            self.on_stats_error(RuntimeError("Consulta de estadísticas sin resultado"))
+            return
+        
+        stats = result[0]
+        self.results_title.config(text=f"📊 Resultados del Historial ({stats['total_registros']:,} registros)")
+        self.update_statistics(stats)
+    
+    def on_stats_error(self, error):
+        """Manejar error al calcular las estadísticas"""
+        self.stats_task = None
+        print(f"Error cargando estadísticas del historial: {error}")
+        for key in self.stats_labels:
+            self.stats_labels[key].config(text="-")
+    
+    def update_statistics(self, stats):
+        """Actualizar labels con el agregado calculado por el servidor"""
+        if not stats['total_registros']:
             # Resetear estadísticas si no hay datos
             for key in self.stats_labels:
                 self.stats_labels[key].config(text="0")
             return
         
-        # Calcular estadísticas
-        total_registros = len(data)
-        total_ingresos = sum(row['costo'] for row in data)
-        total_comisiones = sum(row['comision_calculada'] for row in data)
-        ganancia_neta = total_ingresos - total_comisiones
-        promedio_servicio = total_ingresos / total_registros if total_registros > 0 else 0
-        servicios_pendientes = sum(1 for row in data if row['pago'] == 'Pendiente')
-        
         # Actualizar labels
-        self.stats_labels['total_registros'].config(text=f"{total_registros:,}")
-        self.stats_labels['total_ingresos'].config(text=f"${total_ingresos:,.0f}")
-        self.stats_labels['total_comisiones'].config(text=f"${total_comisiones:,.0f}")
-        self.stats_labels['ganancia_neta'].config(text=f"${ganancia_neta:,.0f}")
-        self.stats_labels['promedio_servicio'].config(text=f"${promedio_servicio:,.0f}")
-        self.stats_labels['servicios_pendientes'].config(text=f"{servicios_pendientes}")
+        self.stats_labels['total_registros'].config(text=f"{stats['total_registros']:,}")
+        self.stats_labels['total_ingresos'].config(text=f"${stats['total_ingresos']:,.0f}")
+        self.stats_labels['total_comisiones'].config(text=f"${stats['total_comisiones']:,.0f}")
+        self.stats_labels['ganancia_neta'].config(text=f"${stats['ganancia_neta']:,.0f}")
+        self.stats_labels['promedio_servicio'].config(text=f"${stats['promedio_servicio']:,.0f}")
+        self.stats_labels['servicios_pendientes'].config(text=f"{stats['servicios_pendientes']}")
     
     def export_to_excel(self):
-        """Exportar datos filtrados a Excel"""
-        if not EXCEL_AVAILABLE:
-            messagebox.showerror("Error", "La librería openpyxl no está instalada.\nInstale con: pip install openpyxl")
+        """Exportar todo el filtro activo a Excel o CSV en segundo plano"""
+        if self.export_job:
+            messagebox.showinfo("Exportación", "Ya hay una exportación en curso")
             return
         
-        try:
-            # Solicitar ubicación del archivo
-            filename = filedialog.asksaveasfilename(
-                defaultextension=".xlsx",
-                filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")],
-                title="Guardar historial como Excel"
-            )
-            
-            if not filename:
-                return
-            
-            # Obtener datos actuales de la tabla
-            items = self.results_tree.get_children()
-            if not items:
-                messagebox.showwarning("Advertencia", "No hay datos para exportar")
+        filetypes = [("Excel files", "*.xlsx")] if EXCEL_AVAILABLE else []
+        filetypes += [("CSV files", "*.csv"), ("All files", "*.*")]
+        
+        # Solicitar ubicación del archivo
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".xlsx" if EXCEL_AVAILABLE else ".csv",
+            filetypes=filetypes,
+            title="Guardar historial"
+        )
+        
+        if not filename:
+            return
+        
+        job = ExportJob(filename)
+        if job.format == 'xlsx' and not EXCEL_AVAILABLE:
+            messagebox.showerror("Error", "La librería openpyxl no está instalada.\nInstale con: pip install openpyxl\no guarde como .csv")
+            return
+        
+        self.export_job = job
+        self.show_export_progress(job)
+        
+        self.run_async(
+            self.run_export, job, self.active_query,
+            callback=self.on_export_done,
+            error_callback=self.on_export_error
+        )
+    
+    def run_export(self, job, query):
+        """Escribir el archivo leyendo el filtro con un cursor del servidor (fuera del hilo de Tk)"""
+        stats = self.db.execute_query(*query.stats_query())
+        if not stats:
+            raise RuntimeError("No se pudieron consultar las estadísticas del historial")
+        
+        stats = stats[0]
+        job.total = stats['total_registros']
+        
+        exporter = TableExporter(
+            self.EXPORT_COLUMNS,
+            "Historial de Servicios",
+            extra_sheets=[("Estadísticas", self.build_export_summary(query, stats))]
+        )
+        return exporter.export(job, self.db.stream_query(*query.rows_query()))
+    
+    def build_export_summary(self, query, stats):
+        """Filas (etiqueta, valor) de la hoja de estadísticas y filtros"""
+        filters = query.filters
+        return [
+            ("Estadísticas del Historial Filtrado", ""),
+            ("", ""),
+            ("Total de Registros", stats['total_registros']),
+            ("Total Ingresos", stats['total_ingresos']),
+            ("Total Comisiones", stats['total_comisiones']),
+            ("Ganancia Neta", stats['ganancia_neta']),
+            ("Promedio por Servicio", stats['promedio_servicio']),
+            ("Servicios Pendientes", stats['servicios_pendientes']),
+            ("", ""),
+            ("Filtros Aplicados:", ""),
+            ("Fecha Inicio", filters['fecha_inicio'] or "No aplicado"),
+            ("Fecha Fin", filters['fecha_fin'] or "No aplicado"),
+            ("Lavador", filters['lavador']),
+            ("Tipo de Vehículo", filters['vehiculo']),
+            ("Servicio", filters['servicio']),
+            ("Estado de Pago", filters['estado_pago']),
+            ("", ""),
+            ("Fecha de Exportación", datetime.now().strftime('%d/%m/%Y %H:%M:%S'))
+        ]
+    
+    def show_export_progress(self, job):
+        """Ventana con barra de progreso y botón para cancelar la exportación"""
+        self.export_window = tk.Toplevel(self.parent)
+        self.export_window.title("Exportando historial")
+        self.export_window.geometry("400x160")
+        self.export_window.configure(bg='white')
+        self.export_window.resizable(False, False)
+        self.export_window.transient(self.parent)
+        self.export_window.protocol("WM_DELETE_WINDOW", job.cancel)
+        
+        status_label = tk.Label(
+            self.export_window,
+            text="Preparando exportación...",
+            font=('Segoe UI', 11),
+            bg='white',
+            fg='#374151'
+        )
+        status_label.pack(pady=(20, 10))
+        
+        progress = ttk.Progressbar(self.export_window, mode='determinate', maximum=100, length=340)
+        progress.pack(padx=30)
+        
+        tk.Button(
+            self.export_window,
+            text="Cancelar",
+            font=('Segoe UI', 10),
+            bg='#6b7280',
+            fg='white',
+            relief='flat',
+            padx=20,
+            pady=6,
+            cursor='hand2',
+            command=job.cancel
+        ).pack(pady=15)
+        
+        def update_progress():
+            # Se detiene cuando la exportación termina o la ventana se cierra
+            if self.export_job is not job or not self.export_window:
                 return
-            
-            # Crear libro de Excel
-            wb = openpyxl.Workbook()
-            ws = wb.active
-            ws.title = "Historial de Servicios"
-            
-            # Configurar estilos
-            header_font = Font(bold=True, color="FFFFFF")
-            header_fill = PatternFill(start_color="2563EB", end_color="2563EB", fill_type="solid")
-            header_alignment = Alignment(horizontal="center", vertical="center")
-            
-            # Headers
-            headers = ['ID', 'Fecha', 'Hora', 'Tipo Vehículo', 'Placa', 'Servicio', 'Lavador', 'Costo', 'Comisión', 'Estado']
-            
-            for col, header in enumerate(headers, 1):
-                cell = ws.cell(row=1, column=col, value=header)
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = header_alignment
-            
-            # Datos
-            for row_idx, item in enumerate(items, 2):
-                values = self.results_tree.item(item, 'values')
-                for col_idx, value in enumerate(values, 1):
-                    ws.cell(row=row_idx, column=col_idx, value=value)
-            
-            # Ajustar ancho de columnas
-            column_widths = [5, 12, 10, 15, 10, 30, 25, 12, 12, 10]
-            for col, width in enumerate(column_widths, 1):
-                ws.column_dimensions[openpyxl.utils.get_column_letter(col)].width = width
-            
-            # Agregar hoja de estadísticas
-            stats_ws = wb.create_sheet(title="Estadísticas")
-            
-            # Títulos de estadísticas
-            stats_data = [
-                ("Estadísticas del Historial Filtrado", ""),
-                ("", ""),
-                ("Total de Registros", f"{len(items):,}"),
-                ("Total Ingresos", self.stats_labels['total_ingresos'].cget('text')),
-                ("Total Comisiones", self.stats_labels['total_comisiones'].cget('text')),
-                ("Ganancia Neta", self.stats_labels['ganancia_neta'].cget('text')),
-                ("Promedio por Servicio", self.stats_labels['promedio_servicio'].cget('text')),
-                ("Servicios Pendientes", self.stats_labels['servicios_pendientes'].cget('text')),
-                ("", ""),
-                ("Filtros Aplicados:", ""),
-                ("Fecha Inicio", self.current_filters['fecha_inicio'] or "No aplicado"),
-                ("Fecha Fin", self.current_filters['fecha_fin'] or "No aplicado"),
-                ("Lavador", self.current_filters['lavador']),
-                ("Tipo de Vehículo", self.current_filters['vehiculo']),
-                ("Servicio", self.current_filters['servicio']),
-                ("Estado de Pago", self.current_filters['estado_pago']),
-                ("", ""),
-                ("Fecha de Exportación", datetime.now().strftime('%d/%m/%Y %H:%M:%S'))
-            ]
-            
-            for row_idx, (label, value) in enumerate(stats_data, 1):
-                stats_ws.cell(row=row_idx, column=1, value=label)
-                stats_ws.cell(row=row_idx, column=2, value=value)
-                
-                # Estilo para títulos
-                if label == "Estadísticas del Historial Filtrado":
-                    stats_ws.cell(row=row_idx, column=1).font = Font(bold=True, size=14)
-                elif label and not value:
-                    stats_ws.cell(row=row_idx, column=1).font = Font(bold=True)
-            
-            # Ajustar columnas de estadísticas
-            stats_ws.column_dimensions['A'].width = 25
-            stats_ws.column_dimensions['B'].width = 20
-            
-            # Guardar archivo
-            wb.save(filename)
-            
-            messagebox.showinfo(
-                "Exportación Exitosa",
-                f"Historial exportado exitosamente a:\n{filename}\n\n"
-                f"Se exportaron {len(items):,} registros con estadísticas incluidas."
-            )
-            
-        except Exception as e:
-            print(f"Error exportando a Excel: {e}")
-            messagebox.showerror("Error", f"Error al exportar a Excel:\n{str(e)}")
+            try:
+                if job.cancelled:
+                    status_label.config(text="Cancelando...")
+                elif job.total:
+                    progress['value'] = job.written * 100 / job.total
+                    status_label.config(text=f"Exportando {job.written:,} de {job.total:,} registros")
+                self.export_window.after(150, update_progress)
+            except tk.TclError:
+                pass
+        
+        update_progress()
+    
+    def close_export_progress(self):
+        """Cerrar la ventana de progreso y liberar la exportación"""
+        self.export_job = None
+        if self.export_window:
+            try:
+                self.export_window.destroy()
+            except tk.TclError:
+                pass
+            self.export_window = None
+    
+    def on_export_done(self, job):
+        """Notificar el fin de la exportación"""
+        self.close_export_progress()
+        messagebox.showinfo(
+            "Exportación Exitosa",
+            f"Historial exportado exitosamente a:\n{job.filename}\n\n"
+            f"Se exportaron {job.written:,} registros con estadísticas incluidas."
+        )
+    
+    def on_export_error(self, error):
+        """Notificar cancelación o error de la exportación"""
+        self.close_export_progress()
+        if isinstance(error, ExportCancelled):
+            messagebox.showinfo("Exportación", "Exportación cancelada")
+            return
+        print(f"Error exportando historial: {error}")
+        messagebox.showerror("Error", f"Error al exportar:\n{str(error)}")
     
     def refresh(self):
         """Refrescar datos del módulo"""
@@ -727,4 +936,8 @@ class HistorialModule(BaseModule):
     
     def cleanup(self):
         """Limpiar recursos del módulo"""
-        pass
\ No newline at end of file
+        # El hilo de exportación sigue vivo hasta revisar la cancelación
+        if self.export_job:
+            self.export_job.cancel()
+        self.filter_debouncer.cancel()
+        self.cancel_pending()
\ No newline at end of file
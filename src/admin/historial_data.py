@@ -0,0 +1,93 @@
+"""
+Consultas del Historial - Filtros compartidos por la tabla, estadísticas y exportación
+"""
+
+
+class HistorialQuery:
+    """Construye las consultas del historial a partir de un juego de filtros"""
+    
+    RESULT_COLUMNS = """
+        id, fecha, hora, vehiculo_nombre, placa, servicio_nombre,
+        lavador, costo, comision_calculada, pago
+    """
+    
+    def __init__(self, filters):
+        # Copia para que cambios posteriores en los combos no alteren la consulta
+        self.filters = dict(filters)
+        self.where, self.params = self.build_filter_clause()
+    
+    def build_filter_clause(self):
+        """Construir la condición WHERE y sus parámetros a partir de los filtros"""
+        where = "1=1"
+        params = []
+        
+        if self.filters['fecha_inicio']:
+            where += " AND fecha >= %s"
+            params.append(self.filters['fecha_inicio'])
+        
+        if self.filters['fecha_fin']:
+            where += " AND fecha <= %s"
+            params.append(self.filters['fecha_fin'])
+        
+        if self.filters.get('id_lavador'):
+            # El combo muestra el nombre; se filtra por la llave indexada
+            where += " AND id_lavador = %s"
+            params.append(self.filters['id_lavador'])
+        
+        if self.filters['vehiculo'] != 'Todos':
+            # La vista expone el nombre del vehículo, no el código de BD
+            where += " AND vehiculo_nombre = %s"
+            params.append(self.filters['vehiculo'])
+        
+        if self.filters['servicio'] != 'Todos':
+            where += " AND servicio_nombre = %s"
+            params.append(self.filters['servicio'])
+        
+        if self.filters['estado_pago'] != 'Todos':
+            where += " AND pago = %s"
+            params.append(self.filters['estado_pago'])
+        
+        return where, params
+    
+    def rows_query(self, after=None, before=None, limit=None):
+        """Consulta de filas con paginación por llave (fecha, hora, id)
+        
+        after/before son la fila del borde de la ventana actual; la página
+        anterior se consulta en orden ascendente y se invierte al pintarla.
+        """
+        query = f"SELECT {self.RESULT_COLUMNS} FROM vista_registros_completos WHERE {self.where}"
+        params = list(self.params)
+        edge = after or before
+        
+        if edge:
+            op = '<' if after else '>'
+            query += f"""
+                AND (fecha {op} %s
+                    OR (fecha = %s AND (hora {op} %s
+                        OR (hora = %s AND id {op} %s))))
+            """
+            params.extend([edge['fecha'], edge['fecha'], edge['hora'], edge['hora'], edge['id']])
+        
+        order = 'ASC' if before else 'DESC'
+        query += f" ORDER BY fecha {order}, hora {order}, id {order}"
+        
+        if limit:
+            query += " LIMIT %s"
+            params.append(limit)
+        
+        return query, params
+    
+    def stats_query(self):
+        """Consulta agregada con las estadísticas completas del filtro"""
+        query = f"""
+            SELECT
+                COUNT(*) as total_registros,
+                COALESCE(SUM(costo), 0) as total_ingresos,
+                COALESCE(SUM(comision_calculada), 0) as total_comisiones,
+                COALESCE(SUM(ganancia_neta), 0) as ganancia_neta,
+                COALESCE(AVG(costo), 0) as promedio_servicio,
+                CAST(COALESCE(SUM(pago = 'Pendiente'), 0) AS SIGNED) as servicios_pendientes
+            FROM vista_registros_completos
+            WHERE {self.where}
+        """
+        return query, list(self.params)
@@ -6,12 +6,19 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime
 from .base_module import BaseModule
+from src.utils.debounce import Debouncer
+from src.ui.components import TreeviewFiller
+from database.catalog import catalog
+from database.materialized import materialized
 
 class LavadoresModule(BaseModule):
     """Módulo para gestión completa de lavadores"""
     
     def setup_module(self):
         """Configurar módulo de lavadores"""
+        self.load_task = None
+        self.search_debouncer = Debouncer(self.parent, self.search_data, on_trigger=self.cancel_load)
+        
         # Título del módulo
         self.create_header()
         
@@ -116,12 +123,12 @@ class LavadoresModule(BaseModule):
             padx=15,
             pady=5,
             cursor='hand2',
-            command=self.search_data
+            command=self.search_debouncer.run_now
         )
         search_btn.pack(side='left')
         
-        # Bind para búsqueda en tiempo real
-        search_entry.bind('<KeyRelease>', lambda e: self.search_data())
+        # Bind para búsqueda en tiempo real (una sola consulta al dejar de escribir)
+        search_entry.bind('<KeyRelease>', lambda e: self.search_debouncer.trigger())
     
     def create_table(self):
         """Crear tabla de lavadores"""
@@ -144,6 +151,7 @@ class LavadoresModule(BaseModule):
         columns = ('ID', 'Nombre', 'Apellido', 'Nombre Completo', 'Estado', 'Fecha Registro', 'Acciones')
         
         self.tree = ttk.Treeview(table_frame, columns=columns, show='headings', height=15)
+        self.filler = TreeviewFiller(self.tree)
         
         # Configurar columnas
         self.tree.heading('ID', text='ID')
@@ -182,57 +190,78 @@ class LavadoresModule(BaseModule):
         table_scrollbar.pack(side='right', fill='y', pady=(0, 20), padx=(0, 20))
     
     def load_data(self, search_term=""):
-        """Cargar datos de lavadores"""
+        """Cargar datos de lavadores en segundo plano"""
+        self.cancel_load()
+        self.load_task = self.run_async(
+            self.fetch_data, search_term,
+            callback=self.render_data,
+            error_callback=self.on_load_error
+        )
+    
+    def cancel_load(self):
+        """Descartar una consulta en curso que ya quedó obsoleta"""
+        if self.load_task:
+            self.load_task.cancel()
+            self.load_task = None
+    
+    def fetch_data(self, search_term):
+        """Consultar lavadores (fuera del hilo de Tk)"""
+        # Query base
+        base_query = """
+            SELECT id, nombre, apellido, 
+                   CONCAT(nombre, ' ', apellido) as nombre_completo,
+                   CASE WHEN activo = 1 THEN 'Activo' ELSE 'Inactivo' END as estado,
+                   DATE_FORMAT(creado_en, '%d/%m/%Y') as fecha_registro,
+                   activo
+            FROM lavadores
+            WHERE 1=1
+        """
+        
+        params = []
+        
+        # Filtro de búsqueda
+        if search_term:
+            base_query += " AND (nombre LIKE %s OR apellido LIKE %s OR CONCAT(nombre, ' ', apellido) LIKE %s)"
+            search_pattern = f"%{search_term}%"
+            params.extend([search_pattern, search_pattern, search_pattern])
+        
+        base_query += " ORDER BY nombre, apellido"
+        
+        results = self.db.execute_query(base_query, params if params else None)
+        if results is None:
+            raise RuntimeError("No se pudo consultar la lista de lavadores")
+        return results
+    
+    def render_data(self, results):
+        """Pintar lavadores en la tabla"""
+        self.load_task = None
         try:
-            # Limpiar tabla
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-            
-            # Query base
-            base_query = """
-                SELECT id, nombre, apellido, 
-                       CONCAT(nombre, ' ', apellido) as nombre_completo,
-                       CASE WHEN activo = 1 THEN 'Activo' ELSE 'Inactivo' END as estado,
-                       DATE_FORMAT(creado_en, '%d/%m/%Y') as fecha_registro,
-                       activo
-                FROM lavadores
-                WHERE 1=1
-            """
-            
-            params = []
-            
-            # Filtro de búsqueda
-            if search_term:
-                base_query += " AND (nombre LIKE %s OR apellido LIKE %s OR CONCAT(nombre, ' ', apellido) LIKE %s)"
-                search_pattern = f"%{search_term}%"
-                params.extend([search_pattern, search_pattern, search_pattern])
-            
-            base_query += " ORDER BY nombre, apellido"
-            
-            results = self.db.execute_query(base_query, params if params else None)
-            
-            if results:
-                for row in results:
-                    # Colorear filas según el estado
-                    tags = ('active',) if row['activo'] else ('inactive',)
-                    
-                    self.tree.insert('', 'end', values=(
-                        row['id'],
-                        row['nombre'],
-                        row['apellido'],
-                        row['nombre_completo'],
-                        row['estado'],
-                        row['fecha_registro'],
-                        '🔧 Acciones'
-                    ), tags=tags)
+            # Solo se tocan las filas que cambiaron; la selección se conserva
+            self.filler.sync(
+                (row['id'], (
+                    row['id'],
+                    row['nombre'],
+                    row['apellido'],
+                    row['nombre_completo'],
+                    row['estado'],
+                    row['fecha_registro'],
+                    '🔧 Acciones'
+                ), ('active',) if row['activo'] else ('inactive',))  # Colorear filas según el estado
+                for row in results
+            )
             
             # Configurar tags de colores
             self.tree.tag_configure('active', background='#f0fdf4')  # Verde claro
             self.tree.tag_configure('inactive', background='#fef2f2')  # Rojo claro
             
         except Exception as e:
-            print(f"Error cargando lavadores: {e}")
-            messagebox.showerror("Error", "Error al cargar la lista de lavadores")
+            self.on_load_error(e)
+    
+    def on_load_error(self, error):
+        """Manejar error al cargar lavadores"""
+        self.load_task = None
+        print(f"Error cargando lavadores: {error}")
+        messagebox.showerror("Error", "Error al cargar la lista de lavadores")
     
     def search_data(self):
         """Buscar lavadores"""
@@ -413,6 +442,11 @@ class LavadoresModule(BaseModule):
                 result = self.db.execute_insert(query, params) if mode == "add" else self.db.execute_update(query, params)
                 
                 if result is not None:
+                    catalog.invalidate()
+                    self.notify_data_changed()
+                    if mode != "add":
+                        # Nombre materializado en los registros del lavador
+                        materialized.refresh("r.id_lavador = %s", (lavador_id,))
                     messagebox.showinfo("Éxito", success_msg)
                     form_window.destroy()
                     self.load_data()  # Recargar datos
@@ -458,10 +492,10 @@ class LavadoresModule(BaseModule):
         
         # Verificar si el lavador tiene registros asociados
         try:
-            check_query = "SELECT COUNT(*) as count FROM registros WHERE lavador LIKE %s"
-            check_result = self.db.execute_query(check_query, (f"%{nombre_completo}%",))
+            check_query = "SELECT EXISTS(SELECT 1 FROM registros WHERE id_lavador = %s) as tiene_registros"
+            check_result = self.db.execute_query(check_query, (lavador_id,))
             
-            if check_result and check_result[0]['count'] > 0:
+            if check_result and check_result[0]['tiene_registros']:
                 # Confirmar si quiere desactivar en lugar de eliminar
                 confirm = messagebox.askyesno(
                     "Lavador con registros",
@@ -475,6 +509,8 @@ class LavadoresModule(BaseModule):
                     # Desactivar en lugar de eliminar
                     update_query = "UPDATE lavadores SET activo = 0 WHERE id = %s"
                     result = self.db.execute_update(update_query, (lavador_id,))
+                    catalog.invalidate()
+                    self.notify_data_changed()
                     
                     if result:
                         messagebox.showinfo("Éxito", f"Lavador '{nombre_completo}' desactivado correctamente")
@@ -492,6 +528,8 @@ class LavadoresModule(BaseModule):
                 if confirm:
                     delete_query = "DELETE FROM lavadores WHERE id = %s"
                     result = self.db.execute_update(delete_query, (lavador_id,))
+                    catalog.invalidate()
+                    self.notify_data_changed()
                     
                     if result:
                         messagebox.showinfo("Éxito", f"Lavador '{nombre_completo}' eliminado correctamente")
@@ -512,6 +550,7 @@ class LavadoresModule(BaseModule):
         
         item = selected[0]
         values = self.tree.item(item, 'values')
+        lavador_id = values[0]
         nombre_completo = values[3]
         
         # Crear ventana de estadísticas
@@ -532,16 +571,16 @@ class LavadoresModule(BaseModule):
             # Query para estadísticas
             stats_query = """
                 SELECT 
-                    COUNT(*) as total_servicios,
-                    COALESCE(SUM(costo), 0) as total_ingresos,
-                    COALESCE(SUM(comision_calculada), 0) as total_comisiones,
+                    CAST(COALESCE(SUM(cantidad), 0) AS SIGNED) as total_servicios,
+                    COALESCE(SUM(total_costo), 0) as total_ingresos,
+                    COALESCE(SUM(total_comision), 0) as total_comisiones,
                     MIN(fecha) as primera_fecha,
                     MAX(fecha) as ultima_fecha
-                FROM vista_registros_completos
-                WHERE lavador = %s
+                FROM resumen_diario
+                WHERE id_lavador = %s
             """
             
-            stats_data = self.db.execute_query(stats_query, (nombre_completo,))
+            stats_data = self.db.execute_query(stats_query, (lavador_id,))
             
             # Título
             title_label = tk.Label(
@@ -627,5 +666,6 @@ class LavadoresModule(BaseModule):
     
     def cleanup(self):
         """Limpiar recursos del módulo"""
-        # Cerrar cualquier ventana modal abierta si es necesario
-        pass
\ No newline at end of file
+        # También se usa embebido en UsuariosModule: cancelar sus propias tareas
+        self.search_debouncer.cancel()
+        self.cancel_pending()
\ No newline at end of file
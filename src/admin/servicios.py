@@ -6,6 +6,9 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime
 from .base_module import BaseModule
+from src.ui.components import TreeviewFiller
+from database.catalog import catalog
+from database.materialized import materialized
 
 class ServiciosModule(BaseModule):
     """Módulo para gestión completa de servicios y precios"""
@@ -142,6 +145,7 @@ class ServiciosModule(BaseModule):
         columns = ('ID', 'Nombre', 'Descripción', 'Precios Config.', 'Fecha Creación', 'Acciones')
         
         self.services_tree = ttk.Treeview(table_frame, columns=columns, show='headings', height=12)
+        self.services_filler = TreeviewFiller(self.services_tree)
         
         # Configurar columnas
         self.services_tree.heading('ID', text='ID')
@@ -216,10 +220,6 @@ class ServiciosModule(BaseModule):
     def load_services_data(self):
         """Cargar datos de servicios"""
         try:
-            # Limpiar tabla
-            for item in self.services_tree.get_children():
-                self.services_tree.delete(item)
-            
             # Query para servicios con conteo de precios
             services_query = """
                 SELECT 
@@ -247,18 +247,21 @@ class ServiciosModule(BaseModule):
             
             results = self.db.execute_query(services_query, params)
             
-            if results:
-                for row in results:
-                    precios_status = f"{row['precios_configurados']}/5 tipos"
-                    
-                    self.services_tree.insert('', 'end', values=(
-                        row['id'],
-                        row['nombre'],
-                        row['descripcion'][:50] + "..." if len(row['descripcion']) > 50 else row['descripcion'],
-                        precios_status,
-                        row['fecha_creacion'],
-                        '🔧 Acciones'
-                    ))
+            rows = []
+            for row in results or []:
+                precios_status = f"{row['precios_configurados']}/5 tipos"
+                
+                rows.append((row['id'], (
+                    row['id'],
+                    row['nombre'],
+                    row['descripcion'][:50] + "..." if len(row['descripcion']) > 50 else row['descripcion'],
+                    precios_status,
+                    row['fecha_creacion'],
+                    '🔧 Acciones'
+                ), ()))
+            
+            # Solo se tocan las filas que cambiaron
+            self.services_filler.sync(rows)
                     
         except Exception as e:
             print(f"Error cargando servicios: {e}")
@@ -425,6 +428,11 @@ class ServiciosModule(BaseModule):
                 result = self.db.execute_insert(query, params) if mode == "add" else self.db.execute_update(query, params)
                 
                 if result is not None:
+                    catalog.invalidate()
+                    self.notify_data_changed()
+                    if mode != "add":
+                        # Nombre materializado en los registros del servicio
+                        materialized.refresh("r.id_servicio = %s", (service_id,))
                     messagebox.showinfo("Éxito", success_msg)
                     form_window.destroy()
                     self.load_services_data()
@@ -654,6 +662,10 @@ class ServiciosModule(BaseModule):
                         """
                         self.db.execute_update(deactivate_query, (service_id, vehicle_type))
                 
+                # Los precios válidos ya se guardaron aunque otros tengan errores
+                catalog.invalidate()
+                self.notify_data_changed()
+                
                 if errors:
                     messagebox.showerror("Errores en los precios", "\n".join(errors))
                     return
@@ -711,19 +723,7 @@ class ServiciosModule(BaseModule):
     def get_current_prices(self, service_id):
         """Obtener precios actuales de un servicio"""
         try:
-            query = """
-                SELECT tipo_vehiculo, precio
-                FROM servicio_precios
-                WHERE id_servicio = %s AND activo = 1
-            """
-            results = self.db.execute_query(query, (service_id,))
-            
-            prices = {}
-            if results:
-                for row in results:
-                    prices[row['tipo_vehiculo']] = row['precio']
-            
-            return prices
+            return catalog.prices_for_service(service_id)
         except Exception as e:
             print(f"Error obteniendo precios actuales: {e}")
             return {}
@@ -771,6 +771,8 @@ class ServiciosModule(BaseModule):
                 # Luego eliminar servicio
                 delete_service_query = "DELETE FROM servicios WHERE id = %s"
                 result = self.db.execute_update(delete_service_query, (service_id,))
+                catalog.invalidate()
+                self.notify_data_changed()
                 
                 if result:
                     messagebox.showinfo("Éxito", f"Servicio '{service_name}' eliminado correctamente")
@@ -790,20 +792,8 @@ class ServiciosModule(BaseModule):
             for widget in self.matrix_container.winfo_children():
                 widget.destroy()
             
-            # Obtener datos de la vista de precios
-            matrix_query = """
-                SELECT * FROM vista_lista_precios
-                ORDER BY servicio_id, 
-                CASE tipo_vehiculo 
-                    WHEN 'motorcycle' THEN 1 
-                    WHEN 'car' THEN 2 
-                    WHEN 'pickup' THEN 3 
-                    WHEN 'suv' THEN 4 
-                    WHEN 'truck' THEN 5 
-                END
-            """
-            
-            results = self.db.execute_query(matrix_query)
+            # Precios activos desde el catálogo en memoria
+            results = catalog.price_matrix()
             
             if not results:
                 no_data_label = tk.Label(
@@ -997,6 +987,8 @@ class ServiciosModule(BaseModule):
     
     def refresh(self):
         """Refrescar datos del módulo"""
+        # Actualizar manual: leer el catálogo desde la base
+        catalog.invalidate()
         self.load_services_data()
         self.load_price_matrix()
     
@@ -1,17 +1,23 @@
 """
 Módulo de Gestión de Usuarios y Lavadores
 """
-import bcrypt
 import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime
 from src.admin.base_module import BaseModule
+from src.auth.passwords import hash_password
+from src.utils.debounce import Debouncer
+from src.ui.components import TreeviewFiller
+from database.materialized import materialized
 
 class UsuariosModule(BaseModule):
     """Módulo para gestión de usuarios del sistema y lavadores"""
     
     def setup_module(self):
         """Configurar módulo de usuarios"""
+        self.load_task = None
+        self.search_debouncer = Debouncer(self.parent, self.search_usuarios, on_trigger=self.cancel_load)
+        
         # Título del módulo
         self.create_header()
         
@@ -72,6 +78,10 @@ class UsuariosModule(BaseModule):
         self.btn_usuarios.config(bg='#2563eb')
         self.btn_lavadores.config(bg='#64748b')
         
+        # Detener consultas de la pestaña de lavadores que se va a destruir
+        if hasattr(self, 'lavadores_instance'):
+            self.lavadores_instance.cleanup()
+        
         # Limpiar contenido
         for widget in self.tab_content.winfo_children():
             widget.destroy()
@@ -85,6 +95,10 @@ class UsuariosModule(BaseModule):
         self.btn_usuarios.config(bg='#64748b')
         self.btn_lavadores.config(bg='#2563eb')
         
+        # Detener búsquedas de usuarios cuya tabla se va a destruir
+        self.search_debouncer.cancel()
+        self.cancel_load()
+        
         # Limpiar contenido
         for widget in self.tab_content.winfo_children():
             widget.destroy()
@@ -171,7 +185,7 @@ class UsuariosModule(BaseModule):
                 value=value,
                 font=('Segoe UI', 10),
                 bg='white',
-                command=self.search_usuarios
+                command=self.search_debouncer.run_now
             )
             rb.pack(side='left', padx=5)
         
@@ -191,7 +205,7 @@ class UsuariosModule(BaseModule):
             width=25
         )
         search_entry.pack(side='left', ipady=5, padx=(0, 10))
-        search_entry.bind('<KeyRelease>', lambda e: self.search_usuarios())
+        search_entry.bind('<KeyRelease>', lambda e: self.search_debouncer.trigger())
         
         search_btn = tk.Button(
             search_frame,
@@ -203,7 +217,7 @@ class UsuariosModule(BaseModule):
             padx=10,
             pady=5,
             cursor='hand2',
-            command=self.search_usuarios
+            command=self.search_debouncer.run_now
         )
         search_btn.pack(side='left')
     
@@ -226,6 +240,7 @@ class UsuariosModule(BaseModule):
         columns = ('ID', 'Nombre', 'Email', 'Rol', 'Provider', 'Fecha Registro', 'Acciones')
         
         self.usuarios_tree = ttk.Treeview(table_frame, columns=columns, show='headings', height=12)
+        self.usuarios_filler = TreeviewFiller(self.usuarios_tree)
         
         self.usuarios_tree.heading('ID', text='ID')
         self.usuarios_tree.heading('Nombre', text='Nombre')
@@ -257,53 +272,75 @@ class UsuariosModule(BaseModule):
         table_scrollbar.pack(side='right', fill='y', pady=(0, 20), padx=(0, 20))
     
     def load_usuarios_data(self, search_term="", rol_filter="todos"):
-        """Cargar datos de usuarios"""
+        """Cargar datos de usuarios en segundo plano"""
+        self.cancel_load()
+        self.load_task = self.run_async(
+            self.fetch_usuarios_data, search_term, rol_filter,
+            callback=self.render_usuarios_data,
+            error_callback=self.on_load_error
+        )
+    
+    def cancel_load(self):
+        """Descartar una consulta en curso que ya quedó obsoleta"""
+        if self.load_task:
+            self.load_task.cancel()
+            self.load_task = None
+    
+    def fetch_usuarios_data(self, search_term, rol_filter):
+        """Consultar usuarios (fuera del hilo de Tk)"""
+        base_query = """
+            SELECT id, nombre, email, rol, provider,
+                   DATE_FORMAT(creado_en, '%d/%m/%Y') as fecha_registro
+            FROM usuarios
+            WHERE 1=1
+        """
+        
+        params = []
+        
+        if search_term:
+            base_query += " AND (nombre LIKE %s OR email LIKE %s)"
+            search_pattern = f"%{search_term}%"
+            params.extend([search_pattern, search_pattern])
+        
+        if rol_filter != "todos":
+            base_query += " AND rol = %s"
+            params.append(rol_filter)
+        
+        base_query += " ORDER BY nombre"
+        
+        results = self.db.execute_query(base_query, params if params else None)
+        if results is None:
+            raise RuntimeError("No se pudo consultar la lista de usuarios")
+        return results
+    
+    def render_usuarios_data(self, results):
+        """Pintar usuarios en la tabla"""
+        self.load_task = None
         try:
-            for item in self.usuarios_tree.get_children():
-                self.usuarios_tree.delete(item)
-            
-            base_query = """
-                SELECT id, nombre, email, rol, provider,
-                       DATE_FORMAT(creado_en, '%d/%m/%Y') as fecha_registro
-                FROM usuarios
-                WHERE 1=1
-            """
-            
-            params = []
-            
-            if search_term:
-                base_query += " AND (nombre LIKE %s OR email LIKE %s)"
-                search_pattern = f"%{search_term}%"
-                params.extend([search_pattern, search_pattern])
-            
-            if rol_filter != "todos":
-                base_query += " AND rol = %s"
-                params.append(rol_filter)
-            
-            base_query += " ORDER BY nombre"
-            
-            results = self.db.execute_query(base_query, params if params else None)
-            
-            if results:
-                for row in results:
-                    tags = ('admin',) if row['rol'] == 'admin' else ('secretario',)
-                    
-                    self.usuarios_tree.insert('', 'end', values=(
-                        row['id'],
-                        row['nombre'],
-                        row['email'],
-                        row['rol'].title(),
-                        row['provider'].title(),
-                        row['fecha_registro'],
-                        '🔧 Acciones'
-                    ), tags=tags)
+            self.usuarios_filler.sync(
+                (row['id'], (
+                    row['id'],
+                    row['nombre'],
+                    row['email'],
+                    row['rol'].title(),
+                    row['provider'].title(),
+                    row['fecha_registro'],
+                    '🔧 Acciones'
+                ), ('admin',) if row['rol'] == 'admin' else ('secretario',))
+                for row in results
+            )
             
             self.usuarios_tree.tag_configure('admin', background='#fef3c7')  # Amarillo claro
             self.usuarios_tree.tag_configure('secretario', background='#dbeafe')  # Azul claro
             
         except Exception as e:
-            print(f"Error cargando usuarios: {e}")
-            messagebox.showerror("Error", "Error al cargar la lista de usuarios")
+            self.on_load_error(e)
+    
+    def on_load_error(self, error):
+        """Manejar error al cargar usuarios"""
+        self.load_task = None
+        print(f"Error cargando usuarios: {error}")
+        messagebox.showerror("Error", "Error al cargar la lista de usuarios")
     
     def search_usuarios(self):
         """Buscar usuarios"""
@@ -472,8 +509,8 @@ class UsuariosModule(BaseModule):
                     return
                 
                 if mode == "add":
-                    # Hashear contraseña con bcrypt
-                    password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+                    # Hashear contraseña con bcrypt (costo de BCRYPT_ROUNDS)
+                    password_hash = hash_password(password)
                     
                     query = "INSERT INTO usuarios (nombre, email, password, rol, provider) VALUES (%s, %s, %s, %s, %s)"
                     params = (nombre, email, password_hash, rol, provider)  # ✅ Contraseña hasheada
@@ -486,6 +523,9 @@ class UsuariosModule(BaseModule):
                 result = self.db.execute_insert(query, params) if mode == "add" else self.db.execute_update(query, params)
                 
                 if result is not None:
+                    if mode != "add":
+                        # Nombre materializado en los registros del usuario
+                        materialized.refresh("r.id_usuario = %s", (usuario_id,))
                     messagebox.showinfo("Éxito", success_msg)
                     form_window.destroy()
                     self.load_usuarios_data()
@@ -580,5 +620,6 @@ class UsuariosModule(BaseModule):
     
     def cleanup(self):
         """Limpiar recursos del módulo"""
+        self.search_debouncer.cancel()
         if hasattr(self, 'lavadores_instance'):
             self.lavadores_instance.cleanup()
\ No newline at end of file
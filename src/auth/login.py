@@ -4,17 +4,25 @@ Sistema de Login y Autenticación con Registro
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-import bcrypt
 from database.db_config import db
+from src.auth.passwords import hash_password, verify_password, needs_rehash, rehash_in_background
+from src.utils.background import background
 
 class LoginWindow:
     """Ventana de inicio de sesión y registro"""
     
-    def __init__(self, parent, on_success_callback):
+    def __init__(self, parent, on_success_callback, db_ready=True):
         self.parent = parent
         self.on_success = on_success_callback
         self.remember_me = tk.BooleanVar(value=False)
         self.current_tab = "login"  # 'login' o 'register'
+        # Al arrancar la ventana se muestra mientras se conecta en segundo plano
+        self.db_ready = db_ready
+        self.status_text = "" if db_ready else "⏳ Conectando con la base de datos..."
+        self.status_color = '#6c757d'
+        self.submit_btn = None
+        # Verificación o registro en curso en segundo plano
+        self.busy = False
         self.setup_ui()
     
     def setup_ui(self):
@@ -122,12 +130,23 @@ class LoginWindow:
         )
         self.tab_register.pack(side='left', fill='x', expand=True)
         
+        # Estado de la conexión (vacío cuando la base de datos está lista)
+        self.status_label = tk.Label(
+            card_frame,
+            font=('Segoe UI', 9),
+            bg='white',
+            wraplength=320,
+            justify='center'
+        )
+        self.status_label.pack(fill='x', padx=40, pady=(15, 0))
+        
         # Contenedor de contenido
         self.content_frame = tk.Frame(card_frame, bg='white')
         self.content_frame.pack(fill='both', padx=40, pady=25)
         
         # Mostrar login por defecto
         self.show_login_form()
+        self.set_db_status(self.status_text, self.db_ready, self.status_color)
         
         # Footer
         footer_frame = tk.Frame(card_frame, bg='white')
@@ -243,6 +262,8 @@ class LoginWindow:
             command=self.authenticate
         )
         login_btn.pack(fill='x', pady=(0, 12), ipady=10)
+        self.submit_btn = login_btn
+        self.update_submit_state()
         
         # Link "¿Olvidaste tu contraseña?"
         forgot_link = tk.Label(
@@ -381,6 +402,8 @@ class LoginWindow:
             command=self.register_user
         )
         register_btn.pack(fill='x', pady=(0, 15), ipady=10)
+        self.submit_btn = register_btn
+        self.update_submit_state()
         
         # Nota informativa
         tk.Label(
@@ -401,6 +424,42 @@ class LoginWindow:
         # Foco inicial
         self.register_name_entry.focus()
     
+    def set_db_status(self, text, ready, color='#6c757d'):
+        """Mostrar el estado de la conexión y habilitar el envío cuando esté lista"""
+        self.db_ready = ready
+        self.status_text = text
+        self.status_color = color
+        if not self.busy:
+            self.show_status(text, color)
+        self.update_submit_state()
+    
+    def set_busy(self, text):
+        """Mostrar el progreso de una operación en segundo plano (None al terminar)"""
+        self.busy = bool(text)
+        if text:
+            self.show_status(text, '#0d6efd')
+        else:
+            self.show_status(self.status_text, self.status_color)
+        self.update_submit_state()
+    
+    def show_status(self, text, color):
+        if not self.status_label.winfo_exists():
+            return
+        self.status_label.config(text=text, fg=color)
+        if text:
+            self.status_label.pack(fill='x', padx=40, pady=(15, 0), before=self.content_frame)
+        else:
+            self.status_label.pack_forget()
+    
+    def update_submit_state(self):
+        """Deshabilitar Iniciar Sesión / Registrarse sin conexión o mientras se verifica"""
+        enabled = self.db_ready and not self.busy
+        if self.submit_btn and self.submit_btn.winfo_exists():
+            self.submit_btn.config(
+                state='normal' if enabled else 'disabled',
+                cursor='hand2' if enabled else 'watch'
+            )
+    
     def clear_placeholder(self, event, placeholder):
         """Limpiar placeholder del campo"""
         widget = event.widget
@@ -444,75 +503,76 @@ class LoginWindow:
             messagebox.showerror("Error", "Por favor ingrese su contraseña")
             return
         
-        try:
-            # Consultar usuario
-            query = """
-                SELECT id, nombre, email, password, rol, activo
-                FROM usuarios 
-                WHERE email = %s
-            """
-            
-            result = db.execute_query(query, (email,))
-            
-            if not result:
-                messagebox.showerror("Error", "Usuario no encontrado")
-                return
-            
-            user_data = result[0]
-            
-            # Verificar si está activo
-            if not user_data['activo']:
-                messagebox.showerror("Error", "Usuario desactivado. Contacte al administrador.")
-                return
-            
-            stored_password = user_data['password']
-            password_valid = False
-            
-            # Verificar contraseña
-            if stored_password.startswith('$2b$') or stored_password.startswith('$2a$'):
-                try:
-                    password_valid = bcrypt.checkpw(
-                        password.encode('utf-8'), 
-                        stored_password.encode('utf-8')
-                    )
-                except Exception as e:
-                    print(f"Error verificando hash bcrypt: {e}")
-                    password_valid = False
-            else:
-                # Contraseña en texto plano (legacy)
-                password_valid = (stored_password == password)
-                
-                # Migrar a bcrypt
-                if password_valid:
-                    try:
-                        new_hash = bcrypt.hashpw(
-                            password.encode('utf-8'), 
-                            bcrypt.gensalt()
-                        ).decode('utf-8')
-                        
-                        update_query = "UPDATE usuarios SET password = %s WHERE id = %s"
-                        db.execute_update(update_query, (new_hash, user_data['id']))
-                        print(f"Contraseña migrada a bcrypt para: {user_data['email']}")
-                    except Exception as e:
-                        print(f"Error migrando contraseña: {e}")
-            
-            if password_valid:
-                # Guardar preferencia de "recordar sesión" si es necesario
-                if self.remember_me.get():
-                    self.save_remember_me(email)
-                
-                messagebox.showinfo("Login Exitoso", f"Bienvenido {user_data['nombre']}")
-                self.on_success(user_data)
-            else:
-                messagebox.showerror("Error", "Contraseña incorrecta")
+        # Enter en la contraseña no pasa por el botón deshabilitado
+        if not self.db_ready or self.busy:
+            return
+        
+        # bcrypt tarda a propósito: se verifica en segundo plano
+        self.set_busy("🔐 Verificando credenciales...")
+        background.submit(
+            self.check_credentials, email, password,
+            callback=lambda result: self.on_authenticated(result, email, password),
+            error_callback=self.on_auth_error,
+            owner=self
+        )
+    
+    def check_credentials(self, email, password):
+        """Consultar el usuario y verificar la contraseña (fuera del hilo de Tk)
+        
+        Devuelve (estado, usuario) con estado 'ok', 'no_encontrado',
+        'inactivo' o 'incorrecta'.
+        """
+        query = """
+            SELECT id, nombre, email, password, rol, activo
+            FROM usuarios 
+            WHERE email = %s
+        """
+        
+        result = db.execute_query(query, (email,))
+        if result is None:
+            raise RuntimeError("No se pudo consultar el usuario")
+        if not result:
+            return 'no_encontrado', None
+        
+        user_data = result[0]
+        if not user_data['activo']:
+            return 'inactivo', user_data
+        if not verify_password(password, user_data['password']):
+            return 'incorrecta', user_data
+        return 'ok', user_data
+    
+    def on_authenticated(self, result, email, password):
+        """Terminar el login con el resultado de la verificación"""
+        self.set_busy(None)
+        status, user_data = result
+        
+        if status == 'no_encontrado':
+            messagebox.showerror("Error", "Usuario no encontrado")
+        elif status == 'inactivo':
+            messagebox.showerror("Error", "Usuario desactivado. Contacte al administrador.")
+        elif status == 'incorrecta':
+            messagebox.showerror("Error", "Contraseña incorrecta")
+            if self.current_tab == 'login':
                 self.login_password_entry.delete(0, tk.END)
                 self.login_password_entry.config(show='')
                 self.login_password_entry.insert(0, "Ingrese su contraseña")
                 self.login_password_entry.config(fg='#adb5bd')
-                
-        except Exception as e:
-            messagebox.showerror("Error", f"Error de autenticación: {str(e)}")
-            print(f"Error en login: {e}")
+        else:
+            # Texto plano legacy o costo viejo: se migra sin demorar la entrada
+            if needs_rehash(user_data['password']):
+                rehash_in_background(user_data['id'], password, user_data['password'])
+            
+            # Guardar preferencia de "recordar sesión" si es necesario
+            if self.remember_me.get():
+                self.save_remember_me(email)
+            
+            messagebox.showinfo("Login Exitoso", f"Bienvenido {user_data['nombre']}")
+            self.on_success(user_data)
+    
+    def on_auth_error(self, error):
+        self.set_busy(None)
+        messagebox.showerror("Error", f"Error de autenticación: {str(error)}")
+        print(f"Error en login: {error}")
     
     def register_user(self):
         """Registrar nuevo usuario"""
@@ -538,44 +598,57 @@ class LoginWindow:
             messagebox.showerror("Error", "Email inválido")
             return
         
-        try:
-            # Verificar si el email ya existe
-            check_query = "SELECT id FROM usuarios WHERE email = %s"
-            existing = db.execute_query(check_query, (email,))
-            
-            if existing:
-                messagebox.showerror("Error", "El email ya está registrado")
-                return
-            
-            # Hashear contraseña
-            password_hash = bcrypt.hashpw(
-                password.encode('utf-8'),
-                bcrypt.gensalt()
-            ).decode('utf-8')
-            
-            # Insertar usuario con rol secretario
-            insert_query = """
-                INSERT INTO usuarios (nombre, email, password, rol, provider, activo)
-                VALUES (%s, %s, %s, 'secretario', 'local', 1)
-            """
-            
-            result = db.execute_insert(insert_query, (nombre, email, password_hash))
-            
-            if result:
-                messagebox.showinfo(
-                    "Registro Exitoso",
-                    f"Usuario {nombre} registrado correctamente.\n\nPuedes iniciar sesión ahora."
-                )
-                self.switch_tab('login')
-                self.login_email_entry.delete(0, tk.END)
-                self.login_email_entry.insert(0, email)
-                self.login_email_entry.config(fg='#212529')
-            else:
-                messagebox.showerror("Error", "No se pudo registrar el usuario")
-                
-        except Exception as e:
-            messagebox.showerror("Error", f"Error en el registro: {str(e)}")
-            print(f"Error en registro: {e}")
+        if not self.db_ready or self.busy:
+            return
+        
+        self.set_busy("🔐 Creando la cuenta...")
+        background.submit(
+            self.create_account, nombre, email, password,
+            callback=lambda result: self.on_registered(result, nombre, email),
+            error_callback=self.on_register_error,
+            owner=self
+        )
+    
+    def create_account(self, nombre, email, password):
+        """Verificar el email, hashear e insertar (fuera del hilo de Tk)
+        
+        Devuelve el id del usuario nuevo, 'existe' o None si falló el INSERT.
+        """
+        check_query = "SELECT id FROM usuarios WHERE email = %s"
+        existing = db.execute_query(check_query, (email,))
+        if existing is None:
+            raise RuntimeError("No se pudo verificar el email")
+        if existing:
+            return 'existe'
+        
+        # Insertar usuario con rol secretario
+        insert_query = """
+            INSERT INTO usuarios (nombre, email, password, rol, provider, activo)
+            VALUES (%s, %s, %s, 'secretario', 'local', 1)
+        """
+        return db.execute_insert(insert_query, (nombre, email, hash_password(password)))
+    
+    def on_registered(self, result, nombre, email):
+        """Informar el resultado del registro"""
+        self.set_busy(None)
+        if result == 'existe':
+            messagebox.showerror("Error", "El email ya está registrado")
+        elif result:
+            messagebox.showinfo(
+                "Registro Exitoso",
+                f"Usuario {nombre} registrado correctamente.\n\nPuedes iniciar sesión ahora."
+            )
+            self.switch_tab('login')
+            self.login_email_entry.delete(0, tk.END)
+            self.login_email_entry.insert(0, email)
+            self.login_email_entry.config(fg='#212529')
+        else:
+            messagebox.showerror("Error", "No se pudo registrar el usuario")
+    
+    def on_register_error(self, error):
+        self.set_busy(None)
+        messagebox.showerror("Error", f"Error en el registro: {str(error)}")
+        print(f"Error en registro: {error}")
     
     def save_remember_me(self, email):
         """Guardar preferencia de recordar sesión (implementación básica)"""
@@ -0,0 +1,75 @@
+"""
+Contraseñas - Hash y verificación con bcrypt
+Son operaciones lentas a propósito (el costo sube al doble con cada ronda),
+así que la ventana de login las ejecuta en el executor de segundo plano. Las
+contraseñas legacy en texto plano o con otro costo se vuelven a hashear
+después del login, también en segundo plano.
+"""
+
+import hmac
+from database.db_config import db, env_vars
+from src.utils.background import background
+
+# Costo de bcrypt (2^rondas iteraciones); bcrypt acepta de 4 a 31
+BCRYPT_ROUNDS = min(max(int(env_vars.get('BCRYPT_ROUNDS', 12)), 4), 31)
+
+BCRYPT_PREFIXES = ('$2a$', '$2b$', '$2y$')
+
+
+def is_bcrypt(stored):
+    return bool(stored) and stored.startswith(BCRYPT_PREFIXES)
+
+
+def hash_password(password, rounds=None):
+    """Hash bcrypt de la contraseña con el costo configurado"""
+    # bcrypt se importa al usarlo, no al abrir la ventana
+    import bcrypt
+    return bcrypt.hashpw(
+        password.encode('utf-8'),
+        bcrypt.gensalt(rounds or BCRYPT_ROUNDS)
+    ).decode('utf-8')
+
+
+def verify_password(password, stored):
+    """Comparar la contraseña con el hash guardado (o con el texto plano legacy)"""
+    if not stored:
+        return False
+    if not is_bcrypt(stored):
+        return hmac.compare_digest(stored.encode('utf-8'), password.encode('utf-8'))
+    
+    import bcrypt
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), stored.encode('utf-8'))
+    except ValueError as e:
+        print(f"Error verificando hash bcrypt: {e}")
+        return False
+
+
+def needs_rehash(stored):
+    """Texto plano o hash bcrypt con un costo distinto al configurado"""
+    if not is_bcrypt(stored):
+        return True
+    try:
+        return int(stored.split('$')[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
+def rehash_in_background(user_id, password, stored):
+    """Reemplazar en segundo plano el hash de un usuario que acaba de entrar"""
+    return background.submit(
+        _rehash, user_id, password, stored,
+        error_callback=lambda e: print(f"Error migrando contraseña: {e}")
+    )
+
+
+def _rehash(user_id, password, stored):
+    new_hash = hash_password(password)
+    # Si la contraseña cambió mientras tanto, no se pisa
+    updated = db.execute_update(
+        "UPDATE usuarios SET password = %s WHERE id = %s AND password = %s",
+        (new_hash, user_id, stored)
+    )
+    if updated:
+        print(f"🔐 Contraseña del usuario {user_id} migrada a bcrypt ({BCRYPT_ROUNDS} rondas)")
+    return updated
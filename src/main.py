@@ -7,45 +7,131 @@ import tkinter as tk
 from tkinter import messagebox
 import sys
 import os
+import importlib
+import threading
 
 # Agregar el directorio padre al path para importar módulos
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from database.db_config import db
+from database.db_config import db, env_vars
 from src.auth.login import LoginWindow
+from src.utils.background import background
+
+# Lo que no hace falta para dibujar el login: se importa en segundo plano
+# mientras el usuario escribe (PREWARM_IMPORTS=0 lo desactiva) o al usarlo
+PREWARM_MODULES = [
+    'bcrypt',
+    'src.admin.admin_panel',
+    'src.admin.dashboard',
+    'secretary.secretary_panel',
+    'src.admin.historial',
+    'src.admin.usuarios',
+    'src.admin.servicios',
+    'openpyxl'
+]
 
 class LaundryApp:
     """Aplicación principal del sistema de lavadero"""
     
+    # Reintentos de conexión al arrancar: espera inicial y máxima en segundos
+    # (se duplica en cada intento fallido)
+    CONNECT_RETRY_DELAY = 1
+    CONNECT_RETRY_MAX_DELAY = 30
+    # Intentos fallidos antes de avisar con las causas más probables
+    CONNECT_WARN_AFTER = 3
+    
     def __init__(self):
         self.root = None
+        self.login_window = None
         self.current_user = None
         self.current_role = None
+        self.connect_attempts = 0
     
     def initialize_database(self):
-        """Inicializar y probar conexión a base de datos"""
-        print("🚀 Iniciando Sistema de Lavadero...")
+        """Conectar y actualizar el esquema (corre en un hilo de trabajo)
         
+        Devuelve 'lista', 'sin_conexion' o 'esquema' si falló la migración.
+        """
         if not db.test_connection():
+            return 'sin_conexion'
+        
+        # Esquema, índices y tabla de agregados versionados
+        from database.migrations import migrations
+        if not migrations.run():
+            return 'esquema'
+        
+        return 'lista'
+    
+    def connect_database(self):
+        """Conectar en segundo plano; el login queda visible pero deshabilitado"""
+        self.connect_attempts += 1
+        if self.connect_attempts > 1:
+            self.set_login_status(f"⏳ Reintentando conexión (intento {self.connect_attempts})...", False)
+        
+        background.submit(
+            self.initialize_database,
+            callback=self.on_database_result,
+            error_callback=self.on_database_error,
+            owner=self
+        )
+    
+    def on_database_result(self, status):
+        """Habilitar el login, reintentar con espera exponencial o cerrar"""
+        if status == 'lista':
+            self.set_login_status("", True)
+            return
+        
+        if status == 'esquema':
             messagebox.showerror(
-                "Error de Conexión", 
+                "Error de Base de Datos",
+                "No se pudo actualizar el esquema de la base de datos.\n\n"
+                "Revisa la consola para ver el detalle del error."
+            )
+            background.shutdown()
+            db.disconnect()
+            self.root.destroy()
+            return
+        
+        delay = min(
+            self.CONNECT_RETRY_DELAY * 2 ** (self.connect_attempts - 1),
+            self.CONNECT_RETRY_MAX_DELAY
+        )
+        self.set_login_status(
+            f"🔌 Sin conexión con MySQL. Reintentando en {delay:g} s...", False, '#dc3545'
+        )
+        self.root.after(int(delay * 1000), self.connect_database)
+        
+        if self.connect_attempts == self.CONNECT_WARN_AFTER:
+            messagebox.showwarning(
+                "Error de Conexión",
                 "No se pudo conectar a la base de datos MySQL.\n\n"
                 "Verifica que:\n"
                 "• XAMPP esté ejecutándose\n"
                 "• MySQL esté activo\n"
                 "• La base de datos 'lavadero' exista\n"
-                "• Las credenciales en .env sean correctas"
+                "• Las credenciales en .env sean correctas\n\n"
+                "Se seguirá intentando en segundo plano."
             )
-            return False
-        return True
+    
+    def on_database_error(self, error):
+        """Un error inesperado al conectar se reintenta igual que una caída"""
+        print(f"❌ Error inicializando la base de datos: {error}")
+        self.on_database_result('sin_conexion')
+    
+    def set_login_status(self, text, ready, color='#6c757d'):
+        if self.login_window:
+            self.login_window.set_db_status(text, ready, color)
     
     def start_login(self):
         """Iniciar ventana de login"""
         self.root = tk.Tk()
         self.root.withdraw()  # Ocultar ventana principal
         
-        # Crear ventana de login
-        login_window = LoginWindow(self.root, self.on_login_success)
+        # Resultados de consultas en segundo plano se entregan en este hilo
+        background.bind(self.root)
+        
+        # Crear ventana de login (deshabilitada hasta que conecte)
+        self.login_window = LoginWindow(self.root, self.on_login_success, db_ready=db.ready)
         
         # Centrar ventana en la pantalla
         self.root.geometry("450x600")
@@ -58,8 +144,27 @@ class LaundryApp:
         # Evento al cerrar la aplicación
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
         
+        # Con el login ya dibujado, adelantar los imports de los paneles
+        self.root.after_idle(self.prewarm_imports)
+        
         return self.root
     
+    def prewarm_imports(self):
+        """Importar en un hilo los paneles y las dependencias pesadas"""
+        if env_vars.get('PREWARM_IMPORTS', '1') == '0':
+            return
+        threading.Thread(target=self._prewarm, name='prewarm-imports', daemon=True).start()
+    
+    def _prewarm(self):
+        for name in PREWARM_MODULES:
+            try:
+                importlib.import_module(name)
+            except ModuleNotFoundError:
+                # Dependencia opcional no instalada (p. ej. openpyxl)
+                pass
+            except Exception as e:
+                print(f"⚠️ No se pudo pre-importar {name}: {e}")
+    
     def on_login_success(self, user_data):
         """Callback cuando el login es exitoso"""
         self.current_user = user_data
@@ -172,189 +277,21 @@ class LaundryApp:
         self.root.title("Sistema Lavadero - Login")
         
         from src.auth.login import LoginWindow
-        LoginWindow(self.root, self.on_login_success)
+        self.login_window = LoginWindow(self.root, self.on_login_success)
     
     def on_closing(self):
         """Manejar cierre de aplicación"""
         if messagebox.askokcancel("Salir", "¿Deseas salir del sistema?"):
+            background.shutdown()
             db.disconnect()
             self.root.destroy()
             sys.exit()
     
     def run(self):
-        """Ejecutar la aplicación"""
-        if not self.initialize_database():
-            return
-        
-        root = self.start_login()
-        root.mainloop()
-
-def main():
-    """Función principal"""
-    app = LaundryApp()
-    app.run()
-
-if __name__ == "__main__":
-    main()
-
-"""
-Sistema de Gestión de Lavadero de Vehículos
-Aplicación principal - Punto de entrada
-"""
-
-import tkinter as tk
-from tkinter import messagebox
-import sys
-import os
-
-# Agregar el directorio padre al path para importar módulos
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from database.db_config import db
-from src.auth.login import LoginWindow
-
-class LaundryApp:
-    """Aplicación principal del sistema de lavadero"""
-    
-    def __init__(self):
-        self.root = None
-        self.current_user = None
-        self.current_role = None
-    
-    def initialize_database(self):
-        """Inicializar y probar conexión a base de datos"""
+        """Ejecutar la aplicación: la ventana aparece antes de conectar"""
         print("🚀 Iniciando Sistema de Lavadero...")
-        
-        if not db.test_connection():
-            messagebox.showerror(
-                "Error de Conexión", 
-                "No se pudo conectar a la base de datos MySQL.\n\n"
-                "Verifica que:\n"
-                "• XAMPP esté ejecutándose\n"
-                "• MySQL esté activo\n"
-                "• La base de datos 'lavadero' exista\n"
-                "• Las credenciales en .env sean correctas"
-            )
-            return False
-        return True
-    
-    def start_login(self):
-        """Iniciar ventana de login"""
-        self.root = tk.Tk()
-        self.root.withdraw()  # Ocultar ventana principal
-        
-        # Crear ventana de login
-        login_window = LoginWindow(self.root, self.on_login_success)
-        
-        # Centrar ventana en la pantalla
-        self.root.geometry("400x300")
-        self.root.eval('tk::PlaceWindow . center')
-        
-        # Configuraciones de la ventana principal
-        self.root.title("Sistema Lavadero - Login")
-        self.root.resizable(False, False)
-        
-        # Evento al cerrar la aplicación
-        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
-        
-        return self.root
-    
-    def on_login_success(self, user_data):
-        """Callback cuando el login es exitoso"""
-        self.current_user = user_data
-        self.current_role = user_data['rol']
-        
-        print(f"✅ Login exitoso: {user_data['nombre']} ({user_data['rol']})")
-        
-        # Ocultar ventana de login
-        for widget in self.root.winfo_children():
-            widget.destroy()
-        
-        # Cargar interfaz según el rol
-        if self.current_role == 'admin':
-            self.load_admin_interface()
-        else:
-            self.load_secretary_interface()
-    
-    def load_admin_interface(self):
-        """Cargar interfaz de administrador"""
-        self.root.deiconify()  # Mostrar ventana principal
-        self.root.geometry("1200x800")
-        self.root.title("Sistema Lavadero - Panel Administrador")
-        
-        # Por ahora, mostrar mensaje temporal
-        frame = tk.Frame(self.root, bg='#2c3e50', padx=20, pady=20)
-        frame.pack(fill='both', expand=True)
-        
-        title = tk.Label(
-            frame, 
-            text=f"👋 Bienvenido, {self.current_user['nombre']}", 
-            font=('Arial', 24, 'bold'),
-            fg='white',
-            bg='#2c3e50'
-        )
-        title.pack(pady=(50, 20))
-        
-        subtitle = tk.Label(
-            frame,
-            text="Panel de Administrador",
-            font=('Arial', 16),
-            fg='#ecf0f1',
-            bg='#2c3e50'
-        )
-        subtitle.pack(pady=(0, 30))
-        
-        # Botón temporal de logout
-        logout_btn = tk.Button(
-            frame,
-            text="Cerrar Sesión",
-            font=('Arial', 12),
-            bg='#e74c3c',
-            fg='white',
-            padx=30,
-            pady=10,
-            command=self.logout
-        )
-        logout_btn.pack(pady=20)
-    
-    def load_secretary_interface(self):
-        """Cargar interfaz de secretario"""
-        from src.secretary.register import SecretaryRegisterPanel
-        
-        self.root.deiconify()  # Mostrar ventana principal
-        
-        # Crear panel del secretario
-        SecretaryRegisterPanel(self.root, self.current_user, self.logout)
-    
-    def logout(self):
-        """Cerrar sesión y volver al login"""
-        self.current_user = None
-        self.current_role = None
-        
-        # Limpiar ventana actual
-        for widget in self.root.winfo_children():
-            widget.destroy()
-        
-        # Volver a mostrar login
-        self.root.geometry("400x300")
-        self.root.title("Sistema Lavadero - Login")
-        
-        from src.auth.login import LoginWindow
-        LoginWindow(self.root, self.on_login_success)
-    
-    def on_closing(self):
-        """Manejar cierre de aplicación"""
-        if messagebox.askokcancel("Salir", "¿Deseas salir del sistema?"):
-            db.disconnect()
-            self.root.destroy()
-            sys.exit()
-    
-    def run(self):
-        """Ejecutar la aplicación"""
-        if not self.initialize_database():
-            return
-        
         root = self.start_login()
+        self.connect_database()
         root.mainloop()
 
 def main():
@@ -363,4 +300,4 @@ def main():
     app.run()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -6,11 +6,16 @@ Clase base para todos los módulos del panel de secretario
 import tkinter as tk
 from abc import ABC, abstractmethod
 from tkinter import ttk
+from src.utils.background import background
 
 
 class BaseModule(ABC):
     """Clase base abstracta para módulos del secretario"""
     
+    # El panel renderiza cada módulo una sola vez y lo oculta al cambiar de
+    # pantalla; al volver después de estos segundos llama a refresh()
+    STALE_AFTER = 60
+    
     def __init__(self, user_data):
         self.user_data = user_data
         self.parent_frame = None
@@ -30,6 +35,17 @@ class BaseModule(ABC):
         """Refrescar datos"""
         pass
     
+    def run_async(self, func, *args, callback=None, error_callback=None, **kwargs):
+        """Ejecutar func en segundo plano y entregar el resultado en el hilo de Tk"""
+        return background.submit(
+            func, *args,
+            callback=callback, error_callback=error_callback, owner=self, **kwargs
+        )
+    
+    def cancel_pending(self):
+        """Cancelar las tareas en segundo plano pendientes del módulo"""
+        background.cancel(self)
+    
     def clear_parent(self, parent):
         """Limpiar widgets del parent"""
         for widget in parent.winfo_children():
@@ -8,7 +8,14 @@ from tkinter import ttk, messagebox, filedialog
 import csv
 from datetime import datetime
 from database.db_config import db
+from database.daily_summary import daily_summary
+from database.catalog import catalog
+from database.replica import replica
+from database.journal import APLICADA, PENDIENTE
+from database.materialized import calculated_fields
 from secretary.base_module import BaseModule
+from secretary.register_queue import registration_queue
+from src.ui.components import CanvasChart, TreeviewFiller
 
 
 class CashModule(BaseModule):
@@ -19,8 +26,9 @@ class CashModule(BaseModule):
         self.records_tree = None
         self.current_date = datetime.now().strftime('%Y-%m-%d')
         self.summary_labels = {}
-        self.lavador_stats_frame = None
-        self.servicios_stats_frame = None
+        self.lavador_stats_chart = None
+        self.servicios_stats_chart = None
+        self.load_task = None
     
     def render(self, parent):
         """Renderizar módulo de cierre de caja"""
@@ -141,6 +149,7 @@ class CashModule(BaseModule):
         self.records_tree = ttk.Treeview(
             table_container, columns=columns, show='headings', height=12
         )
+        self.records_filler = TreeviewFiller(self.records_tree)
 
         # Menú contextual
         self.context_menu = tk.Menu(self.records_tree, tearoff=0)
@@ -188,8 +197,7 @@ class CashModule(BaseModule):
             bg='white'
         ).pack(anchor='w', pady=(0, 15))
         
-        self.lavador_stats_frame = tk.Frame(lavador_content, bg='white')
-        self.lavador_stats_frame.pack(fill='both', expand=True)
+        self.lavador_stats_chart = self.create_stats_chart(lavador_content, "No hay datos de lavadores")
         
         # Servicios más solicitados
         servicios_frame = tk.Frame(analytics_frame, bg='white', relief='solid', borderwidth=1)
@@ -206,78 +214,190 @@ class CashModule(BaseModule):
             bg='white'
         ).pack(anchor='w', pady=(0, 15))
         
-        self.servicios_stats_frame = tk.Frame(servicios_content, bg='white')
-        self.servicios_stats_frame.pack(fill='both', expand=True)
+        self.servicios_stats_chart = self.create_stats_chart(servicios_content, "No hay datos de servicios")
+    
+    def create_stats_chart(self, parent, empty_text):
+        """Ranking dibujado en un canvas que se reutiliza en cada carga"""
+        chart = CanvasChart(
+            parent, row_height=24, show_bars=False, empty_text=empty_text,
+            label_font=('Segoe UI', 10), value_font=('Segoe UI', 9),
+            label_color='#1e293b', value_color='#6b7280'
+        )
+        chart.pack(fill='both', expand=True)
+        return chart
     
     def load_data(self):
-        """Cargar datos del día"""
+        """Cargar datos del día en segundo plano"""
+        today = datetime.now().strftime('%Y-%m-%d')
+        
+        # Descartar una carga anterior que aún no haya terminado
+        if self.load_task:
+            self.load_task.cancel()
+        
+        self.load_task = self.run_async(
+            self.fetch_day_data, today,
+            callback=self.render_day_data,
+            error_callback=self.on_load_error
+        )
+    
+    def prefetch(self):
+        """Actualizar los datos del día mientras el módulo está oculto
+        
+        Sin mensajes de error: el secretario está en otra pantalla y la carga
+        normal vuelve a intentarlo al mostrar el cierre.
+        """
+        if self.load_task:
+            return False
+        
+        self.load_task = self.run_async(
+            self.fetch_day_data, datetime.now().strftime('%Y-%m-%d'),
+            callback=self.render_day_data,
+            error_callback=self.on_prefetch_error
+        )
+        return True
+    
+    def on_prefetch_error(self, error):
+        """Error de una carga anticipada: solo se registra en consola"""
+        self.load_task = None
+        print(f"🔌 No se pudo anticipar el cierre de caja: {error}")
+    
+    def fetch_day_data(self, date):
+        """Ejecutar las consultas del cierre de caja (fuera del hilo de Tk)"""
+        records_query = """
+            SELECT id, hora, vehiculo_nombre, placa, servicio_nombre,
+                costo, comision_calculada, lavador, pago
+            FROM vista_registros_completos
+            WHERE fecha = %s
+            ORDER BY hora ASC
+        """
+        
+        # El día actual siempre está en la réplica local
+        if replica.covers(date):
+            return self.fetch_local_day_data(date, records_query)
+        
+        lavador_query = """
+            SELECT TRIM(CONCAT(l.nombre, ' ', l.apellido)) as lavador,
+                CAST(SUM(rd.cantidad) AS SIGNED) as servicios,
+                SUM(rd.total_comision) as total_comision
+            FROM resumen_diario rd
+            LEFT JOIN lavadores l ON rd.id_lavador = l.id
+            WHERE rd.fecha = %s
+            GROUP BY rd.id_lavador, l.nombre, l.apellido
+            ORDER BY total_comision DESC
+            LIMIT 5
+        """
+        
+        servicios_query = """
+            SELECT s.nombre as servicio_nombre,
+                CAST(SUM(r.cantidad) AS SIGNED) as cantidad,
+                SUM(r.total_costo) as total_ingresos
+            FROM resumen_diario r
+            LEFT JOIN servicios s ON r.id_servicio = s.id
+            WHERE r.fecha = %s
+            GROUP BY s.nombre
+            ORDER BY cantidad DESC
+            LIMIT 5
+        """
+        
+        return {
+            'summary': daily_summary.day_totals(date),
+            'records': db.execute_query(records_query, (date,)),
+            'lavadores': db.execute_query(lavador_query, (date,)),
+            'servicios': db.execute_query(servicios_query, (date,))
+        }
+    
+    def fetch_local_day_data(self, date, records_query):
+        """Los mismos datos del cierre calculados sobre la réplica local"""
+        summary_query = """
+            SELECT COUNT(*) as total_servicios,
+                COALESCE(SUM(costo), 0) as total_ingresos,
+                COALESCE(SUM(comision_calculada), 0) as total_comisiones,
+                COALESCE(SUM(ganancia_neta), 0) as balance_neto
+            FROM vista_registros_completos
+            WHERE fecha = %s
+        """
+        
+        lavador_query = """
+            SELECT lavador,
+                COUNT(*) as servicios,
+                SUM(comision_calculada) as total_comision
+            FROM vista_registros_completos
+            WHERE fecha = %s
+            GROUP BY id_lavador
+            ORDER BY total_comision DESC
+            LIMIT 5
+        """
+        
+        servicios_query = """
+            SELECT servicio_nombre,
+                COUNT(*) as cantidad,
+                SUM(costo) as total_ingresos
+            FROM vista_registros_completos
+            WHERE fecha = %s
+            GROUP BY servicio_nombre
+            ORDER BY cantidad DESC
+            LIMIT 5
+        """
+        
+        return {
+            'summary': replica.execute_query(summary_query, (date,)),
+            'records': replica.execute_query(records_query, (date,)),
+            'lavadores': replica.execute_query(lavador_query, (date,)),
+            'servicios': replica.execute_query(servicios_query, (date,))
+        }
+    
+    def render_day_data(self, data):
+        """Pintar los datos del día en los widgets"""
+        self.load_task = None
         try:
-            today = datetime.now().strftime('%Y-%m-%d')
-            
-            # Obtener resumen
-            summary_query = """
-                SELECT 
-                    COUNT(*) as total_servicios,
-                    COALESCE(SUM(costo), 0) as total_ingresos,
-                    COALESCE(SUM(comision_calculada), 0) as total_comisiones,
-                    COALESCE(SUM(ganancia_neta), 0) as balance_neto
-                FROM vista_registros_completos
-                WHERE fecha = %s
-            """
-            
-            summary = db.execute_query(summary_query, (today,))
-            
+            summary = data['summary']
             if summary:
-                data = summary[0]
+                day = summary[0]
                 self.summary_labels['ingresos'].config(
-                    text=f"${data['total_ingresos']:,.0f}"
+                    text=f"${day['total_ingresos']:,.0f}"
                 )
                 self.summary_labels['comisiones'].config(
-                    text=f"${data['total_comisiones']:,.0f}"
+                    text=f"${day['total_comisiones']:,.0f}"
                 )
                 self.summary_labels['balance'].config(
-                    text=f"${data['balance_neto']:,.0f}"
+                    text=f"${day['balance_neto']:,.0f}"
                 )
                 self.summary_labels['servicios'].config(
-                    text=str(data['total_servicios'])
+                    text=str(day['total_servicios'])
                 )
             
-            self.load_records(today)
-            self.load_lavador_stats(today)
-            self.load_servicios_stats(today)
+            self.load_records(data['records'])
+            self.load_lavador_stats(data['lavadores'])
+            self.load_servicios_stats(data['servicios'])
             
         except Exception as e:
-            print(f"Error cargando datos de caja: {e}")
-            messagebox.showerror("Error", "Error al cargar datos del cierre de caja")
+            self.on_load_error(e)
     
-    def load_records(self, date):
+    def on_load_error(self, error):
+        """Manejar error en la carga del cierre de caja"""
+        self.load_task = None
+        print(f"Error cargando datos de caja: {error}")
+        messagebox.showerror("Error", "Error al cargar datos del cierre de caja")
+    
+    def load_records(self, records):
         """Cargar registros del día"""
         try:
-            for item in self.records_tree.get_children():
-                self.records_tree.delete(item)
-            
-            query = """
-                SELECT id, hora, vehiculo_nombre, placa, servicio_nombre,
-                    costo, comision_calculada, lavador, pago
-                FROM vista_registros_completos
-                WHERE fecha = %s
-                ORDER BY hora ASC
-            """
+            rows = []
+            for record in records or []:
+                hora = self.format_time(record['hora'])
+                costo = self.format_currency(record['costo'])
+                comision = self.format_currency(record['comision_calculada'])
+                
+                rows.append((record['id'], (
+                    record['id'], hora, record['vehiculo_nombre'],
+                    record['placa'], record['servicio_nombre'],
+                    costo, comision, record['lavador'], record['pago']
+                ), ()))
             
-            records = db.execute_query(query, (date,))
+            # Tras editar o eliminar un registro solo cambia esa fila
+            self.records_filler.sync(rows)
             
-            if records:
-                for record in records:
-                    hora = self.format_time(record['hora'])
-                    costo = self.format_currency(record['costo'])
-                    comision = self.format_currency(record['comision_calculada'])
-                    
-                    self.records_tree.insert('', 'end', values=(
-                        record['id'], hora, record['vehiculo_nombre'],
-                        record['placa'], record['servicio_nombre'],
-                        costo, comision, record['lavador'], record['pago']
-                    ))
-            else:
+            if not records:
                 self.records_tree.insert('', 'end', values=(
                     '', '', '', '', 'No hay registros para hoy',
                     '', '', '', ''
@@ -286,114 +406,32 @@ class CashModule(BaseModule):
         except Exception as e:
             print(f"Error cargando registros: {e}")
     
-    def load_lavador_stats(self, date):
+    def load_lavador_stats(self, stats):
         """Cargar estadísticas de lavadores"""
         try:
-            for widget in self.lavador_stats_frame.winfo_children():
-                widget.destroy()
-            
-            query = """
-                SELECT lavador, COUNT(*) as servicios,
-                    SUM(comision_calculada) as total_comision
-                FROM vista_registros_completos
-                WHERE fecha = %s
-                GROUP BY lavador
-                ORDER BY total_comision DESC
-                LIMIT 5
-            """
-            
-            stats = db.execute_query(query, (date,))
-            
-            if stats:
-                for i, stat in enumerate(stats, 1):
-                    row_frame = tk.Frame(self.lavador_stats_frame, bg='white')
-                    row_frame.pack(fill='x', pady=2)
-                    
-                    pos_label = tk.Label(
-                        row_frame, text=f"{i}.",
-                        font=('Segoe UI', 10, 'bold'),
-                        bg='white', fg='#374151', width=2
-                    )
-                    pos_label.pack(side='left')
-                    
-                    name_label = tk.Label(
-                        row_frame, text=stat['lavador'],
-                        font=('Segoe UI', 10),
-                        bg='white', fg='#1e293b'
-                    )
-                    name_label.pack(side='left', padx=(5, 0))
-                    
-                    stats_label = tk.Label(
-                        row_frame,
-                        text=f"{stat['servicios']} servicios - ${stat['total_comision']:,.0f}",
-                        font=('Segoe UI', 9),
-                        bg='white', fg='#6b7280'
-                    )
-                    stats_label.pack(side='right')
-            else:
-                no_data = tk.Label(
-                    self.lavador_stats_frame,
-                    text="No hay datos de lavadores",
-                    font=('Segoe UI', 10),
-                    fg='#6b7280', bg='white'
-                )
-                no_data.pack(expand=True)
+            self.lavador_stats_chart.update_rows([
+                {
+                    'marker': f"{i}.",
+                    'label': stat['lavador'],
+                    'value': f"{stat['servicios']} servicios - ${stat['total_comision']:,.0f}"
+                }
+                for i, stat in enumerate(stats or [], 1)
+            ])
                 
         except Exception as e:
             print(f"Error cargando estadísticas de lavadores: {e}")
     
-    def load_servicios_stats(self, date):
+    def load_servicios_stats(self, stats):
         """Cargar estadísticas de servicios"""
         try:
-            for widget in self.servicios_stats_frame.winfo_children():
-                widget.destroy()
-            
-            query = """
-                SELECT servicio_nombre, COUNT(*) as cantidad,
-                    SUM(costo) as total_ingresos
-                FROM vista_registros_completos
-                WHERE fecha = %s
-                GROUP BY servicio_nombre
-                ORDER BY cantidad DESC
-                LIMIT 5
-            """
-            
-            stats = db.execute_query(query, (date,))
-            
-            if stats:
-                for i, stat in enumerate(stats, 1):
-                    row_frame = tk.Frame(self.servicios_stats_frame, bg='white')
-                    row_frame.pack(fill='x', pady=2)
-                    
-                    pos_label = tk.Label(
-                        row_frame, text=f"{i}.",
-                        font=('Segoe UI', 10, 'bold'),
-                        bg='white', fg='#374151', width=2
-                    )
-                    pos_label.pack(side='left')
-                    
-                    name_label = tk.Label(
-                        row_frame, text=stat['servicio_nombre'],
-                        font=('Segoe UI', 10),
-                        bg='white', fg='#1e293b'
-                    )
-                    name_label.pack(side='left', padx=(5, 0))
-                    
-                    stats_label = tk.Label(
-                        row_frame,
-                        text=f"{stat['cantidad']} veces - ${stat['total_ingresos']:,.0f}",
-                        font=('Segoe UI', 9),
-                        bg='white', fg='#6b7280'
-                    )
-                    stats_label.pack(side='right')
-            else:
-                no_data = tk.Label(
-                    self.servicios_stats_frame,
-                    text="No hay datos de servicios",
-                    font=('Segoe UI', 10),
-                    fg='#6b7280', bg='white'
-                )
-                no_data.pack(expand=True)
+            self.servicios_stats_chart.update_rows([
+                {
+                    'marker': f"{i}.",
+                    'label': stat['servicio_nombre'],
+                    'value': f"{stat['cantidad']} veces - ${stat['total_ingresos']:,.0f}"
+                }
+                for i, stat in enumerate(stats or [], 1)
+            ])
                 
         except Exception as e:
             print(f"Error cargando estadísticas de servicios: {e}")
@@ -483,17 +521,7 @@ class CashModule(BaseModule):
             today = datetime.now().strftime('%Y-%m-%d')
             today_formatted = datetime.now().strftime('%A, %d de %B de %Y')
             
-            summary_query = """
-                SELECT 
-                    COUNT(*) as total_servicios,
-                    COALESCE(SUM(costo), 0) as total_ingresos,
-                    COALESCE(SUM(comision_calculada), 0) as total_comisiones,
-                    COALESCE(SUM(ganancia_neta), 0) as balance_neto
-                FROM vista_registros_completos
-                WHERE fecha = %s
-            """
-            
-            summary = db.execute_query(summary_query, (today,))
+            summary = daily_summary.day_totals(today)
             
             records_query = """
                 SELECT hora, vehiculo_nombre, placa, servicio_nombre,
@@ -631,18 +659,16 @@ Balance Neto:          ${data['balance_neto']:>10,.0f}
         
         # Obtener datos completos del registro
         try:
-            query = """
-                SELECT r.*, s.nombre as servicio_nombre
-                FROM registros r
-                LEFT JOIN servicios s ON r.id_servicio = s.id
-                WHERE r.id = %s
-            """
+            query = "SELECT * FROM registros WHERE id = %s"
             record_data = db.execute_query(query, (record_id,))
             if not record_data:
                 messagebox.showerror("Error", "No se encontró el registro")
                 return
             
             record = record_data[0]
+            
+            # Lavadores activos más el asignado actualmente (aunque esté inactivo)
+            lavadores = catalog.lavadores(include_ids=(record['id_lavador'],))
         except Exception as e:
             messagebox.showerror("Error", f"Error al cargar registro: {str(e)}")
             return
@@ -739,9 +765,23 @@ Balance Neto:          ${data['balance_neto']:>10,.0f}
         
         # 8. Lavador
         tk.Label(fields_frame, text="Lavador:", font=('Segoe UI', 10, 'bold'), bg='white').pack(anchor='w', pady=(0, 5))
-        lavador_entry = tk.Entry(fields_frame, font=('Segoe UI', 10), relief='solid', borderwidth=1)
-        lavador_entry.pack(fill='x', pady=(0, 15), ipady=6)
-        lavador_entry.insert(0, record['lavador'] or '')
+        sin_lavador = "Sin asignar"
+        lavador_options = {}
+        for lavador in lavadores:
+            name = lavador['nombre_completo']
+            # Distinguir lavadores con el mismo nombre
+            if name in lavador_options:
+                name = f"{name} (#{lavador['id']})"
+            lavador_options[name] = lavador['id']
+        lavador_var = tk.StringVar()
+        lavador_combo = ttk.Combobox(fields_frame, textvariable=lavador_var,
+                                    values=[sin_lavador] + list(lavador_options),
+                                    font=('Segoe UI', 10), state='readonly')
+        lavador_combo.pack(fill='x', pady=(0, 15), ipady=6)
+        lavador_combo.set(next(
+            (name for name, lavador_id in lavador_options.items() if lavador_id == record['id_lavador']),
+            sin_lavador
+        ))
         
         # 9. Observaciones
         tk.Label(fields_frame, text="Observaciones:", font=('Segoe UI', 10, 'bold'), bg='white').pack(anchor='w', pady=(0, 5))
@@ -785,42 +825,56 @@ Balance Neto:          ${data['balance_neto']:>10,.0f}
                 nueva_placa = placa_entry.get().strip().upper() or None
                 nuevo_costo = float(costo_entry.get().replace(',', ''))
                 nuevo_porcentaje = float(porcentaje_entry.get())
-                nuevo_lavador = lavador_entry.get().strip() or None
+                nuevo_lavador = lavador_options.get(lavador_var.get())
                 nuevas_observaciones = observaciones_text.get('1.0', tk.END).strip() or None
                 nuevo_estado = 'Pagado' if status_var.get() else 'Pendiente'
                 
                 datetime.strptime(nueva_fecha, '%Y-%m-%d')
                 datetime.strptime(nueva_hora, '%H:%M')
                 
-                update_query = """
-                    UPDATE registros 
-                    SET fecha = %s, hora = %s, vehiculo = %s, placa = %s,
-                        costo = %s, porcentaje = %s, lavador = %s,
-                        observaciones = %s, pago = %s
-                    WHERE id = %s
-                """
-                
-                params = (nueva_fecha, nueva_hora, nuevo_vehiculo, nueva_placa,
-                        nuevo_costo, nuevo_porcentaje, nuevo_lavador,
-                        nuevas_observaciones, nuevo_estado, record_id)
+                cambios = {
+                    'fecha': nueva_fecha, 'hora': nueva_hora, 'vehiculo': nuevo_vehiculo,
+                    'placa': nueva_placa, 'costo': nuevo_costo, 'porcentaje': nuevo_porcentaje,
+                    'id_lavador': nuevo_lavador, 'observaciones': nuevas_observaciones,
+                    'pago': nuevo_estado,
+                    'lavador_nombre': next(
+                        (l['nombre_completo'] for l in lavadores if l['id'] == nuevo_lavador), None
+                    )
+                }
+                cambios.update(calculated_fields(nuevo_costo, nuevo_porcentaje, nuevo_vehiculo))
                 
-                if db.execute_update(update_query, params):
-                    messagebox.showinfo("Éxito", "Registro actualizado correctamente")
-                    on_close()
-                    self.load_data()
-                else:
-                    messagebox.showerror("Error", "No se pudo actualizar el registro")
+                # El envío corre en segundo plano; la ventana espera su resultado
+                save_btn.config(state='disabled', text="⏳ Guardando...")
+                registration_queue.submit('update', cambios, int(record_id), callback=on_saved)
                     
             except ValueError:
                 messagebox.showerror("Error", "Formato de fecha/hora o valores numéricos inválidos")
             except Exception as e:
+                save_btn.config(state='normal', text="💾 Guardar Cambios")
                 messagebox.showerror("Error", f"Error al guardar: {str(e)}")
         
-        tk.Button(
+        def on_saved(result):
+            if result == APLICADA:
+                messagebox.showinfo("Éxito", "Registro actualizado correctamente")
+                on_close()
+                self.load_data()
+            elif result == PENDIENTE:
+                messagebox.showinfo(
+                    "Guardado sin conexión",
+                    "No hay conexión con el servidor. El cambio quedó guardado en este "
+                    "equipo y se aplicará automáticamente al volver la conexión."
+                )
+                on_close()
+            else:
+                save_btn.config(state='normal', text="💾 Guardar Cambios")
+                messagebox.showerror("Error", "No se pudo actualizar el registro")
+        
+        save_btn = tk.Button(
             buttons_frame, text="💾 Guardar Cambios", font=('Segoe UI', 10, 'bold'),
             bg='#059669', fg='white', relief='flat', padx=20, pady=10,
             command=save_all_changes
-        ).pack(side='right')
+        )
+        save_btn.pack(side='right')
     def delete_record(self):
         """Eliminar registro seleccionado"""
         selected = self.records_tree.selection()
@@ -835,11 +889,23 @@ Balance Neto:          ${data['balance_neto']:>10,.0f}
             return
         
         if messagebox.askyesno("Confirmar", f"¿Eliminar el registro #{record_id}?"):
-            try:
-                if db.execute_update("DELETE FROM registros WHERE id = %s", (record_id,)):
+            def on_deleted(result):
+                if result == APLICADA:
                     messagebox.showinfo("Éxito", "Registro eliminado")
                     self.load_data()
+                elif result == PENDIENTE:
+                    messagebox.showinfo(
+                        "Guardado sin conexión",
+                        "No hay conexión con el servidor. La eliminación se aplicará "
+                        "automáticamente al volver la conexión."
+                    )
+                    if self.records_tree.exists(selected[0]):
+                        self.records_tree.delete(selected[0])
                 else:
                     messagebox.showerror("Error", "No se pudo eliminar")
+            
+            try:
+                # MySQL se consulta en segundo plano; on_deleted recibe el resultado
+                registration_queue.submit('delete', {}, int(record_id), callback=on_deleted)
             except Exception as e:
                 messagebox.showerror("Error", f"Error: {str(e)}")
\ No newline at end of file
@@ -7,21 +7,45 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime
 from database.db_config import db
+from database.plates import plate_index
+from database.replica import replica
 from secretary.base_module import BaseModule
+from secretary.history_data import HistoryQuery
+from src.utils.debounce import Debouncer
+from src.ui.components import TreeviewFiller
 
 
 class HistoryModule(BaseModule):
     """Módulo para consultar historial de servicios"""
     
+    # Filas por página; las siguientes se piden con "Cargar más" o al llegar al final
+    PAGE_SIZE = 100
+    # Fracción del recorrido del scroll a partir de la cual se pide otra página
+    SCROLL_MARGIN = 0.1
+    # Más placas que esto no es un filtro selectivo: se busca con LIKE al recorrer por fecha
+    MAX_PLATES = 200
+    
     def __init__(self, user_data):
         super().__init__(user_data)
         self.history_tree = None
+        self.load_task = None
+        self.page_task = None
+        self.search_debouncer = None
+        self.active_query = None
+        self.last_row = None
+        self.has_more = False
+        self.loaded_count = 0
+        self.approximate = False
+        self.lavador_ids = {}
     
     def render(self, parent):
         """Renderizar módulo de historial"""
         self.parent_frame = parent
         self.clear_parent(parent)
         
+        # Búsqueda mientras se escribe, con una sola consulta al dejar de teclear
+        self.search_debouncer = Debouncer(parent, self.search_history, on_trigger=self.cancel_search)
+        
         main_container = tk.Frame(parent, bg='#f8fafc')
         main_container.pack(fill='both', expand=True)
         
@@ -62,10 +86,21 @@ class HistoryModule(BaseModule):
         plate_frame.pack(side='left', fill='x', expand=True, padx=10)
         self.filter_plate = self.create_input_field(plate_frame, "Placa:")
         
-        # Filtro por lavador
+        # Filtro por lavador (por id, los nombres pueden repetirse)
         washer_frame = tk.Frame(filters_row, bg='white')
         washer_frame.pack(side='left', fill='x', expand=True, padx=10)
-        self.filter_washer = self.create_input_field(washer_frame, "Lavador:")
+        tk.Label(
+            washer_frame, text="Lavador:",
+            font=('Segoe UI', 10, 'bold'), bg='white', fg='#374151'
+        ).pack(anchor='w')
+        
+        self.washer_var = tk.StringVar(value="Todos")
+        self.washer_combo = ttk.Combobox(
+            washer_frame, textvariable=self.washer_var,
+            values=['Todos'], font=('Segoe UI', 10), state='readonly'
+        )
+        self.washer_combo.pack(fill='x', pady=(5, 0), ipady=8)
+        self.washer_combo.bind('<<ComboboxSelected>>', lambda e: self.search_debouncer.run_now())
         
         # Botón buscar
         search_btn_frame = tk.Frame(filters_row, bg='white')
@@ -74,9 +109,13 @@ class HistoryModule(BaseModule):
         
         search_btn = self.create_button(
             search_btn_frame, "🔍 Buscar",
-            self.search_history, bg_color='#2563eb'
+            self.search_debouncer.run_now, bg_color='#2563eb'
         )
         search_btn.pack(pady=(5, 0))
+        
+        for entry in (self.filter_date, self.filter_plate):
+            entry.bind('<KeyRelease>', lambda e: self.search_debouncer.trigger())
+            entry.bind('<Return>', lambda e: self.search_debouncer.run_now())
     
     def create_history_table(self, parent):
         """Crear tabla de historial"""
@@ -102,6 +141,7 @@ class HistoryModule(BaseModule):
         self.history_tree = ttk.Treeview(
             table_frame, columns=columns, show='headings', height=15
         )
+        self.history_filler = TreeviewFiller(self.history_tree)
         
         # Configurar encabezados
         self.history_tree.heading('ID', text='ID')
@@ -129,7 +169,23 @@ class HistoryModule(BaseModule):
         scrollbar = ttk.Scrollbar(
             table_frame, orient='vertical', command=self.history_tree.yview
         )
-        self.history_tree.configure(yscrollcommand=scrollbar.set)
+        self.history_scrollbar = scrollbar
+        self.history_tree.configure(yscrollcommand=self.on_history_scroll)
+        
+        # Pie con el conteo de filas cargadas y el botón para pedir más
+        footer = tk.Frame(table_frame, bg='white')
+        footer.pack(side='bottom', fill='x', padx=20, pady=(0, 15))
+        
+        self.count_label = tk.Label(
+            footer, text="", font=('Segoe UI', 10), fg='#64748b', bg='white'
+        )
+        self.count_label.pack(side='left')
+        
+        self.load_more_btn = self.create_button(
+            footer, "⬇️ Cargar más", self.load_more, bg_color='#64748b'
+        )
+        self.load_more_btn.pack(side='right')
+        self.load_more_btn.config(state='disabled')
         
         # Empaquetar tabla y scrollbar
         self.history_tree.pack(
@@ -139,78 +195,199 @@ class HistoryModule(BaseModule):
     
     def load_data(self):
         """Cargar datos iniciales"""
+        self.run_async(
+            self.fetch_washers,
+            callback=self.render_washers,
+            error_callback=lambda e: print(f"Error cargando lavadores: {e}")
+        )
         self.search_history()
     
+    def fetch_washers(self):
+        """Consultar los lavadores con historial (fuera del hilo de Tk)"""
+        # EXISTS usa el índice de registros.id_lavador; incluye lavadores inactivos
+        return db.execute_query("""
+            SELECT l.id, TRIM(CONCAT(l.nombre, ' ', l.apellido)) as lavador
+            FROM lavadores l
+            WHERE EXISTS (SELECT 1 FROM registros r WHERE r.id_lavador = l.id)
+            ORDER BY lavador
+        """)
+    
+    def render_washers(self, rows):
+        """Llenar el combo de lavadores"""
+        self.lavador_ids = {}
+        for row in rows or []:
+            name = row['lavador']
+            # Distinguir lavadores con el mismo nombre
+            if name in self.lavador_ids:
+                name = f"{name} (#{row['id']})"
+            self.lavador_ids[name] = row['id']
+        
+        self.washer_combo['values'] = ['Todos'] + list(self.lavador_ids)
+    
     def refresh(self):
         """Refrescar datos"""
         self.search_history()
     
     def search_history(self):
-        """Buscar en el historial con filtros"""
+        """Buscar en el historial con filtros (primera página, en segundo plano)"""
+        self.cancel_search()
+        
+        filters = {
+            'fecha': self.filter_date.get().strip(),
+            'placa': self.filter_plate.get().strip(),
+            'id_lavador': self.lavador_ids.get(self.washer_var.get())
+        }
+        
+        self.load_task = self.run_async(
+            self.fetch_first_page, filters,
+            callback=self.render_history,
+            error_callback=self.on_search_error
+        )
+    
+    def load_more(self):
+        """Pedir la página siguiente a la última fila cargada"""
+        if self.load_task or self.page_task or not self.has_more:
+            return
+        
+        self.load_more_btn.config(state='disabled', text="⏳ Cargando...")
+        self.page_task = self.run_async(
+            self.fetch_history, self.active_query, self.last_row,
+            callback=self.append_page,
+            error_callback=self.on_search_error
+        )
+    
+    def on_history_scroll(self, first, last):
+        """Actualizar el scrollbar y cargar más filas al acercarse al final"""
+        self.history_scrollbar.set(first, last)
+        if float(last) >= 1 - self.SCROLL_MARGIN:
+            self.load_more()
+    
+    def cancel_pending(self):
+        """Cancelar búsquedas programadas y en curso al salir del módulo"""
+        if self.search_debouncer:
+            self.search_debouncer.cancel()
+        super().cancel_pending()
+    
+    def cancel_search(self):
+        """Descartar una búsqueda en curso que ya quedó obsoleta"""
+        for task in (self.load_task, self.page_task):
+            if task:
+                task.cancel()
+        self.load_task = None
+        self.page_task = None
+    
+    def fetch_first_page(self, filters):
+        """Resolver la placa con el índice en memoria y consultar la primera página"""
+        approximate = False
+        if filters['placa']:
+            plates, approximate = plate_index.search(filters['placa'])
+            if plates is not None and len(plates) <= self.MAX_PLATES:
+                filters['placas'] = plates
+            else:
+                approximate = False
+        
+        query = HistoryQuery(filters)
+        return query, approximate, self.fetch_history(query)
+    
+    def fetch_history(self, query, after=None):
+        """Consultar una página del historial (fuera del hilo de Tk)"""
+        sql, params = query.rows_query(after=after, limit=self.PAGE_SIZE)
+        
+        # La réplica local responde si la fecha está en su período; sin fecha,
+        # solo si llenó la página (lo anterior al período no podría desplazarla)
+        if replica.covers(query.fecha):
+            results = replica.execute_query(sql, params)
+            if results is not None and (query.fecha or len(results) == self.PAGE_SIZE):
+                return results
+        
+        results = db.execute_query(sql, params)
+        if results is None:
+            raise RuntimeError("No se pudo consultar el historial")
+        return results
+    
+    def render_history(self, page):
+        """Pintar la primera página de resultados"""
+        self.load_task = None
+        self.active_query, self.approximate, results = page
         try:
-            # Limpiar tabla
-            for item in self.history_tree.get_children():
-                self.history_tree.delete(item)
-            
-            # Consulta base
-            base_query = """
-                SELECT id, fecha, hora, vehiculo_nombre, placa, 
-                       servicio_nombre, costo, lavador, pago
-                FROM vista_registros_completos
-                WHERE 1=1
-            """
-            
-            params = []
-            
-            # Aplicar filtro por fecha
-            if self.filter_date.get().strip():
-                base_query += " AND fecha = %s"
-                params.append(self.filter_date.get().strip())
-            
-            # Aplicar filtro por placa
-            if self.filter_plate.get().strip():
-                base_query += " AND placa LIKE %s"
-                params.append(f"%{self.filter_plate.get().strip()}%")
-            
-            # Aplicar filtro por lavador
-            if self.filter_washer.get().strip():
-                base_query += " AND lavador LIKE %s"
-                params.append(f"%{self.filter_washer.get().strip()}%")
-            
-            # Ordenar y limitar resultados
-            base_query += " ORDER BY fecha DESC, hora DESC LIMIT 100"
-            
-            # Ejecutar consulta
-            results = db.execute_query(base_query, params if params else None)
+            # Limpiar tabla (una sola llamada) y descartar tandas pendientes
+            self.history_filler.replace([])
+            self.loaded_count = 0
+            self.last_row = None
             
             if results:
-                for row in results:
-                    # Formatear datos
-                    fecha = row['fecha'].strftime('%Y-%m-%d') if row['fecha'] else ''
-                    hora = str(row['hora']) if row['hora'] else ''
-                    costo = f"${row['costo']:,.0f}" if row['costo'] else '$0'
-                    placa = row['placa'] or 'N/A'
-                    lavador = row['lavador'] or 'N/A'
-                    
-                    # Insertar fila en tabla
-                    self.history_tree.insert('', 'end', values=(
-                        row['id'],
-                        fecha,
-                        hora,
-                        row['vehiculo_nombre'],
-                        placa,
-                        row['servicio_nombre'],
-                        costo,
-                        lavador,
-                        row['pago']
-                    ))
+                self.add_rows(results)
             else:
                 # Mostrar mensaje cuando no hay resultados
                 self.history_tree.insert('', 'end', values=(
                     '', '', '', 'No se encontraron resultados',
                     '', '', '', '', ''
                 ))
-                
+            
+            self.update_footer(len(results) == self.PAGE_SIZE)
+            self.history_tree.yview_moveto(0)
+            
+        except Exception as e:
+            self.on_search_error(e)
+    
+    def append_page(self, results):
+        """Agregar al final de la tabla la página siguiente"""
+        self.page_task = None
+        try:
+            if results:
+                self.add_rows(results)
+            self.update_footer(len(results) == self.PAGE_SIZE)
         except Exception as e:
-            print(f"Error buscando historial: {e}")
-            messagebox.showerror("Error", "Error al buscar en el historial")
\ No newline at end of file
+            self.on_search_error(e)
+    
+    def add_rows(self, results):
+        """Insertar filas en la tabla y recordar la última como borde de la página"""
+        rows = []
+        for row in results:
+            # Formatear datos
+            fecha = row['fecha'].strftime('%Y-%m-%d') if row['fecha'] else ''
+            hora = str(row['hora']) if row['hora'] else ''
+            costo = f"${row['costo']:,.0f}" if row['costo'] else '$0'
+            placa = row['placa'] or 'N/A'
+            lavador = row['lavador'] or 'N/A'
+            
+            rows.append(((
+                row['id'],
+                fecha,
+                hora,
+                row['vehiculo_nombre'],
+                placa,
+                row['servicio_nombre'],
+                costo,
+                lavador,
+                row['pago']
+            ), ()))
+        
+        # Por tandas con after_idle, detrás de las que aún estén pendientes
+        self.history_filler.append(rows)
+        self.last_row = results[-1]
+        self.loaded_count += len(results)
+    
+    def update_footer(self, has_more):
+        """Mostrar cuántas filas hay cargadas y si quedan más"""
+        self.has_more = has_more
+        suffix = "" if has_more else " (fin del historial)"
+        if self.approximate:
+            # Sin coincidencias exactas: se muestran placas a una letra de distancia
+            placas = ', '.join(self.active_query.filters['placas'][:5])
+            suffix += f" · placas parecidas: {placas}"
+        self.count_label.config(text=f"{self.loaded_count} registros cargados{suffix}")
+        self.load_more_btn.config(
+            state='normal' if has_more else 'disabled', text="⬇️ Cargar más"
+        )
+    
+    def on_search_error(self, error):
+        """Manejar error en la búsqueda"""
+        self.load_task = None
+        self.page_task = None
+        # Se puede reintentar la página desde la misma fila
+        self.load_more_btn.config(
+            state='normal' if self.has_more else 'disabled', text="⬇️ Cargar más"
+        )
+        print(f"Error buscando historial: {error}")
+        messagebox.showerror("Error", "Error al buscar en el historial")
@@ -0,0 +1,75 @@
+"""
+Consultas del Historial del Secretario - Filtros y paginación por llave
+"""
+
+from database.plates import normalize_plate
+from database.replica import format_hora
+
+
+class HistoryQuery:
+    """Construye las páginas del historial a partir de los filtros de búsqueda"""
+    
+    RESULT_COLUMNS = """
+        id, fecha, hora, vehiculo_nombre, placa,
+        servicio_nombre, costo, lavador, pago
+    """
+    
+    def __init__(self, filters):
+        """filters['placas'] son las placas que encontró el índice de placas para
+        el texto de filters['placa'] (None si no se usó el índice)"""
+        self.filters = dict(filters)
+        self.fecha = self.filters['fecha'] or None
+        self.where, self.params = self.build_filter_clause()
+    
+    def build_filter_clause(self):
+        """Construir la condición WHERE y sus parámetros a partir de los filtros"""
+        where = "1=1"
+        params = []
+        
+        if self.filters['fecha']:
+            where += " AND fecha = %s"
+            params.append(self.filters['fecha'])
+        
+        if self.filters.get('placas') is not None:
+            # Placas resueltas en memoria: rango de idx_registros_placa_fecha por cada una
+            placeholders = ', '.join(['%s'] * len(self.filters['placas'])) or 'NULL'
+            where += f" AND placa_normalizada IN ({placeholders})"
+            params.extend(self.filters['placas'])
+        elif self.filters['placa']:
+            where += " AND placa_normalizada LIKE %s"
+            params.append(f"%{normalize_plate(self.filters['placa'])}%")
+        
+        if self.filters.get('id_lavador'):
+            # Por id, como el historial del administrador: usa idx_registros_id_lavador
+            where += " AND id_lavador = %s"
+            params.append(self.filters['id_lavador'])
+        
+        return where, params
+    
+    def rows_query(self, after=None, limit=None):
+        """Página de filas más recientes que after, en orden (fecha, hora, id) DESC
+        
+        Recorre idx_registros_fecha_hora hacia atrás desde la fila del borde (el
+        índice incluye id como llave primaria), así que cada página lee solo sus
+        filas sin importar cuántas se hayan cargado antes. Fecha y hora del borde
+        van como texto para que la réplica SQLite compare igual que MySQL.
+        """
+        query = f"SELECT {self.RESULT_COLUMNS} FROM vista_registros_completos WHERE {self.where}"
+        params = list(self.params)
+        
+        if after:
+            fecha, hora = str(after['fecha']), format_hora(after['hora'])
+            query += """
+                AND (fecha < %s
+                    OR (fecha = %s AND (hora < %s
+                        OR (hora = %s AND id < %s))))
+            """
+            params.extend([fecha, fecha, hora, hora, after['id']])
+        
+        query += " ORDER BY fecha DESC, hora DESC, id DESC"
+        
+        if limit:
+            query += " LIMIT %s"
+            params.append(limit)
+        
+        return query, params
@@ -5,10 +5,15 @@ Maneja el registro de vehículos y servicios prestados
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-from datetime import datetime
+from datetime import datetime, date
 import re
-from database.db_config import db
+from database.catalog import catalog
+from database.journal import APLICADA, PENDIENTE
+from database.materialized import calculated_fields
+from database.plate_summary import plate_summary
 from secretary.base_module import BaseModule
+from secretary.register_queue import registration_queue
+from src.utils.debounce import Debouncer
 
 
 class RegisterModule(BaseModule):
@@ -20,11 +25,25 @@ class RegisterModule(BaseModule):
         self.lavadores_data = []
         self.current_services = []
         self.selected_service = None
+        # Modo rápido: la cola sobrevive a los cambios de módulo
+        self.quick_mode = False
+        self.queue = registration_queue
+        self.queue_status_label = None
+        self.register_btn = None
+        self.confirm_label = None
+        self._confirm_after = None
+        # Historial del vehículo mientras se escribe la placa
+        self.visits_debouncer = None
+        self.visits_task = None
+        self.visits_labels = {}
+        # Aviso al panel tras cada registro (anticipa el cierre de caja)
+        self.on_registered = None
     
     def render(self, parent):
         """Renderizar módulo de registro"""
         self.parent_frame = parent
         self.clear_parent(parent)
+        self.queue.on_change = self.update_queue_status
         
         main_container = tk.Frame(parent, bg='#f8fafc')
         main_container.pack(fill='both', expand=True)
@@ -36,6 +55,12 @@ class RegisterModule(BaseModule):
         )
         header.pack(anchor='w', pady=(0, 20))
         
+        # Panel lateral con el historial del vehículo de la placa ingresada
+        self.visits_debouncer = Debouncer(
+            parent, self.load_vehicle_visits, delay=150, on_trigger=self.cancel_visits
+        )
+        self.create_visits_panel(main_container)
+        
         # Canvas con scrollbar
         canvas_frame = tk.Frame(main_container, bg='#f8fafc')
         canvas_frame.pack(fill='both', expand=True)
@@ -117,6 +142,7 @@ class RegisterModule(BaseModule):
         plate_frame = tk.Frame(row2, bg='white')
         plate_frame.pack(side='right', fill='x', expand=True, padx=(10, 0))
         self.plate_entry = self.create_input_field(plate_frame, "Placa:")
+        self.plate_entry.bind('<KeyRelease>', lambda e: self.visits_debouncer.trigger())
         
         # Fila 3: Servicio
         row3 = tk.Frame(parent, bg='white')
@@ -195,6 +221,36 @@ class RegisterModule(BaseModule):
         )
         self.observations_text.pack(fill='x', pady=(5, 0))
         
+        # Modo rápido
+        quick_frame = tk.Frame(parent, bg='#f0f9ff', relief='solid', borderwidth=1)
+        quick_frame.pack(fill='x', pady=(0, 10))
+        
+        self.quick_mode_var = tk.BooleanVar(value=self.quick_mode)
+        tk.Checkbutton(
+            quick_frame, text="⚡ Modo rápido (guardar por lotes)",
+            variable=self.quick_mode_var, command=self.toggle_quick_mode,
+            font=('Segoe UI', 10, 'bold'), bg='#f0f9ff', fg='#1e40af'
+        ).pack(side='left', padx=10, pady=8)
+        
+        flush_btn = tk.Button(
+            quick_frame, text="📤 Enviar ahora", command=self.queue.flush,
+            font=('Segoe UI', 9), bg='#0891b2', fg='white',
+            relief='flat', padx=10, cursor='hand2'
+        )
+        flush_btn.pack(side='right', padx=10, pady=6)
+        
+        self.queue_status_label = tk.Label(
+            quick_frame, font=('Segoe UI', 10), bg='#f0f9ff'
+        )
+        self.queue_status_label.pack(side='right', padx=10)
+        
+        self.confirm_label = tk.Label(
+            quick_frame, font=('Segoe UI', 10, 'bold'), bg='#f0f9ff', fg='#059669'
+        )
+        self.confirm_label.pack(side='left', padx=10)
+        
+        self.update_queue_status()
+        
         # Botones
         buttons_frame = tk.Frame(parent, bg='white')
         buttons_frame.pack(fill='x', pady=(20, 0))
@@ -205,11 +261,11 @@ class RegisterModule(BaseModule):
         )
         clear_btn.pack(side='left', padx=(0, 10))
         
-        register_btn = self.create_button(
+        self.register_btn = self.create_button(
             buttons_frame, "✅ Registrar Servicio",
             self.register_service, bg_color='#059669'
         )
-        register_btn.pack(side='right')
+        self.register_btn.pack(side='right')
     
     def load_data(self):
         """Cargar tipos de vehículos y lavadores"""
@@ -238,13 +294,7 @@ class RegisterModule(BaseModule):
     def load_lavadores(self):
         """Cargar lista de lavadores activos"""
         try:
-            query = """
-                SELECT id, CONCAT(nombre, ' ', apellido) as nombre_completo 
-                FROM lavadores 
-                WHERE activo = 1 
-                ORDER BY nombre
-            """
-            self.lavadores_data = db.execute_query(query) or []
+            self.lavadores_data = catalog.lavadores()
             
             if self.lavadores_data:
                 lavador_names = [l['nombre_completo'] for l in self.lavadores_data]
@@ -269,16 +319,7 @@ class RegisterModule(BaseModule):
     def load_services_for_vehicle(self, vehicle_type):
         """Cargar servicios disponibles para tipo de vehículo"""
         try:
-            query = """
-                SELECT s.id, s.nombre, s.descripcion, sp.precio,
-                    CONCAT('$', FORMAT(sp.precio, 0)) as precio_formato
-                FROM servicios s
-                INNER JOIN servicio_precios sp ON s.id = sp.id_servicio
-                WHERE sp.tipo_vehiculo = %s AND sp.activo = 1
-                ORDER BY sp.precio ASC
-            """
-            
-            self.current_services = db.execute_query(query, (vehicle_type,)) or []
+            self.current_services = catalog.services_for_vehicle(vehicle_type)
             
             service_names = [
                 f"{s['nombre']} - {s['precio_formato']}" 
@@ -313,6 +354,7 @@ class RegisterModule(BaseModule):
         
         self.vehicle_var.set("")
         self.plate_entry.delete(0, tk.END)
+        self.visits_debouncer.run_now()
         self.service_var.set("")
         self.cost_entry.delete(0, tk.END)
         self.percent_entry.delete(0, tk.END)
@@ -367,6 +409,157 @@ class RegisterModule(BaseModule):
         patron_moto = r'^[A-Z]{3}\d{2}[A-Z]$'
         return bool(re.match(patron_carro, plate) or re.match(patron_moto, plate))
     
+    def create_visits_panel(self, parent):
+        """Crear el panel lateral con el historial del vehículo"""
+        panel = tk.Frame(parent, bg='white', relief='solid', borderwidth=1, width=260)
+        panel.pack(side='right', fill='y', padx=(15, 0))
+        panel.pack_propagate(False)
+        
+        tk.Label(
+            panel, text="🚗 Historial del Vehículo",
+            font=('Segoe UI', 12, 'bold'), fg='#1e293b', bg='white'
+        ).pack(anchor='w', padx=15, pady=(15, 10))
+        
+        self.visits_status = tk.Label(
+            panel, text="Ingrese una placa para ver sus visitas",
+            font=('Segoe UI', 10), fg='#64748b', bg='white',
+            wraplength=230, justify='left'
+        )
+        self.visits_status.pack(anchor='w', padx=15, pady=(0, 10))
+        
+        self.visits_labels = {}
+        for key, title in (('visitas', "Visitas"), ('ultima_visita', "Última visita"),
+                           ('servicio_favorito', "Servicio favorito"), ('gasto_total', "Gasto total")):
+            tk.Label(
+                panel, text=title, font=('Segoe UI', 9, 'bold'), fg='#374151', bg='white'
+            ).pack(anchor='w', padx=15)
+            value = tk.Label(
+                panel, text="—", font=('Segoe UI', 11), fg='#1e293b', bg='white',
+                wraplength=230, justify='left'
+            )
+            value.pack(anchor='w', padx=15, pady=(0, 10))
+            self.visits_labels[key] = value
+    
+    def cancel_visits(self):
+        """Descartar la consulta de una placa que ya cambió"""
+        if self.visits_task:
+            self.visits_task.cancel()
+            self.visits_task = None
+    
+    def load_vehicle_visits(self):
+        """Consultar el historial de la placa cuando tiene un formato completo"""
+        plate = self.plate_entry.get().strip().upper()
+        if not self._validate_plate(plate):
+            status = "Placa incompleta" if plate else "Ingrese una placa para ver sus visitas"
+            self.render_vehicle_visits(None, status)
+            return
+        
+        # Las placas consultadas quedan en la caché LRU: volver a escribirlas no va a MySQL
+        self.visits_task = self.run_async(
+            plate_summary.visits, plate,
+            callback=lambda visits: self.render_vehicle_visits(
+                visits, f"🆕 Primera visita de {plate}" if visits is None else f"Cliente frecuente: {plate}"
+            ),
+            error_callback=self.on_visits_error
+        )
+    
+    def render_vehicle_visits(self, visits, status):
+        """Pintar el resumen de visitas de la placa"""
+        self.visits_task = None
+        if not self.visits_labels or not self.visits_status.winfo_exists():
+            return
+        
+        self.visits_status.config(text=status)
+        if not visits:
+            for label in self.visits_labels.values():
+                label.config(text="—")
+            return
+        
+        days = (date.today() - visits['ultima_visita']).days
+        ago = "hoy" if days == 0 else f"hace {days} día{'s' if days != 1 else ''}"
+        self.visits_labels['visitas'].config(text=str(visits['visitas']))
+        self.visits_labels['ultima_visita'].config(
+            text=f"{visits['ultima_visita'].strftime('%d/%m/%Y')} ({ago})"
+        )
+        self.visits_labels['servicio_favorito'].config(
+            text=f"{visits['servicio_favorito']} ({visits['veces_favorito']} veces)"
+        )
+        self.visits_labels['gasto_total'].config(text=self.format_currency(visits['gasto_total']))
+    
+    def on_visits_error(self, error):
+        """Sin conexión el formulario sigue funcionando; solo se avisa en el panel"""
+        print(f"Error consultando historial del vehículo: {error}")
+        self.render_vehicle_visits(None, "🔌 Historial no disponible sin conexión")
+    
+    def cancel_pending(self):
+        """Cancelar la consulta de placa programada al salir del módulo"""
+        if self.visits_debouncer:
+            self.visits_debouncer.cancel()
+        super().cancel_pending()
+    
+    def toggle_quick_mode(self):
+        """Activar o desactivar el modo rápido"""
+        self.quick_mode = self.quick_mode_var.get()
+        # Al salir del modo rápido se envía lo que quede en cola
+        if not self.quick_mode:
+            self.queue.flush()
+    
+    def update_queue_status(self):
+        """Mostrar el contador de operaciones pendientes del diario local"""
+        if not self.queue_status_label or not self.queue_status_label.winfo_exists():
+            return
+        
+        count = self.queue.count
+        if self.queue.offline and count:
+            text, color = f"🔌 Sin conexión: {count} en cola, reintentando...", '#dc2626'
+        elif self.queue.flushing:
+            text, color = f"📤 Guardando {count}...", '#2563eb'
+        elif count:
+            text, color = f"⏳ Pendientes: {count}", '#d97706'
+        else:
+            text, color = "✅ Todo guardado", '#059669'
+        
+        if self.queue.rejected:
+            text += f"  ·  ⚠️ {self.queue.rejected} rechazados"
+            color = '#dc2626'
+        
+        self.queue_status_label.config(text=text, fg=color)
+    
+    def show_quick_confirmation(self, registro):
+        """Confirmación no modal del registro encolado"""
+        if not self.confirm_label or not self.confirm_label.winfo_exists():
+            return
+        
+        self.confirm_label.config(text=f"✅ {registro['placa'] or 'Vehículo'} en cola")
+        if self._confirm_after:
+            self.confirm_label.after_cancel(self._confirm_after)
+        self._confirm_after = self.confirm_label.after(
+            2500, lambda: self.confirm_label.winfo_exists() and self.confirm_label.config(text="")
+        )
+    
+    def on_service_saved(self, result):
+        """Informar el resultado del registro enviado (hilo de Tk)"""
+        self.register_btn.config(state='normal', text="✅ Registrar Servicio")
+        
+        if result == APLICADA:
+            self.notify_registered()
+            messagebox.showinfo("Éxito", "Servicio registrado correctamente")
+            self.clear_form()
+        elif result == PENDIENTE:
+            messagebox.showinfo(
+                "Guardado sin conexión",
+                "No hay conexión con el servidor. El servicio quedó guardado en este "
+                "equipo y se enviará automáticamente al volver la conexión."
+            )
+            self.clear_form()
+        else:
+            messagebox.showerror("Error", "No se pudo registrar el servicio")
+    
+    def notify_registered(self):
+        """Avisar al panel que se registró un servicio"""
+        if self.on_registered:
+            self.on_registered()
+    
     def register_service(self):
         """Registrar nuevo servicio en la base de datos"""
         if not self.validate_form():
@@ -378,7 +571,9 @@ class RegisterModule(BaseModule):
                  if item['display'] == self.vehicle_var.get()), None
             )
             
-            lavador_name = self.lavador_var.get()
+            # Por posición en el combo: distingue lavadores con el mismo nombre
+            lavador_index = self.lavador_combo.current()
+            lavador = self.lavadores_data[lavador_index] if lavador_index >= 0 else None
             
             registro_data = {
                 'fecha': self.date_entry.get(),
@@ -386,31 +581,34 @@ class RegisterModule(BaseModule):
                 'vehiculo': vehicle_value,
                 'placa': self.plate_entry.get().strip().upper() or None,
                 'id_servicio': self.selected_service['id'],
+                'servicio_nombre': self.selected_service['nombre'],
                 'costo': float(self.cost_entry.get().replace(',', '')),
                 'porcentaje': float(self.percent_entry.get()) or 50.0,
-                'lavador': lavador_name or None,
+                'id_lavador': lavador['id'] if lavador else None,
+                'lavador_nombre': lavador['nombre_completo'] if lavador else None,
                 'observaciones': self.observations_text.get(1.0, tk.END).strip() or None,
                 'pago': 'Pagado' if self.payment_status_var.get() else 'Pendiente',
-                'id_usuario': self.user_data['id']
+                'id_usuario': self.user_data['id'],
+                'usuario_nombre': self.user_data['nombre']
             }
+            # Montos y nombre del vehículo materializados en la fila
+            registro_data.update(calculated_fields(
+                registro_data['costo'], registro_data['porcentaje'], vehicle_value
+            ))
             
-            query = """
-                INSERT INTO registros 
-                (fecha, hora, vehiculo, placa, id_servicio, costo, porcentaje, 
-                 lavador, observaciones, pago, id_usuario)
-                VALUES (%(fecha)s, %(hora)s, %(vehiculo)s, %(placa)s, %(id_servicio)s,
-                        %(costo)s, %(porcentaje)s, %(lavador)s, %(observaciones)s, 
-                        %(pago)s, %(id_usuario)s)
-            """
-            
-            registro_id = db.execute_insert(query, registro_data)
-            
-            if registro_id:
-                messagebox.showinfo("Éxito", "Servicio registrado correctamente")
+            if self.quick_mode:
+                self.queue.add(registro_data)
+                self.notify_registered()
                 self.clear_form()
-            else:
-                messagebox.showerror("Error", "No se pudo registrar el servicio")
+                self.show_quick_confirmation(registro_data)
+                self.vehicle_combo.focus_set()
+                return
+            
+            # El envío corre en segundo plano; el botón espera su resultado
+            self.register_btn.config(state='disabled', text="⏳ Registrando...")
+            self.queue.submit('insert', registro_data, callback=self.on_service_saved)
                 
         except Exception as e:
             print(f"Error registrando servicio: {e}")
+            self.register_btn.config(state='normal', text="✅ Registrar Servicio")
             messagebox.showerror("Error", f"Error al registrar: {str(e)}")
\ No newline at end of file
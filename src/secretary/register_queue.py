@@ -0,0 +1,164 @@
+"""
+Cola de envío del diario local
+Registros, ediciones y eliminaciones quedan primero en el diario local
+(database/journal.py); esta cola decide cuándo reenviarlos a MySQL: los de
+submit() de inmediato, los del modo rápido al llegar a N operaciones o al
+vencer un temporizador y, sin conexión, cada cierto tiempo hasta que el
+servidor vuelva.
+"""
+
+import tkinter as tk
+from mysql.connector import Error
+from database.journal import journal, is_retryable, APLICADA, PENDIENTE
+from src.utils.background import background
+
+
+class RegistrationQueue:
+    """Envío por lotes y en segundo plano de las operaciones del diario
+    
+    Hay una sola instancia por aplicación (registration_queue): sigue enviando
+    aunque cambie el módulo visible o se cierre la sesión. on_change() se invoca
+    en el hilo de Tk cada vez que cambia el estado de la cola.
+    """
+    
+    def __init__(self, journal, batch_size=5, flush_delay=3000, retry_delay=5000):
+        self.journal = journal
+        self.widget = None
+        self.on_change = None
+        self.batch_size = batch_size
+        self.flush_delay = flush_delay
+        self.retry_delay = retry_delay
+        self.offline = False
+        self._task = None
+        self._after_id = None
+        # Callbacks de submit() por uuid, a la espera del resultado del envío
+        self._waiting = {}
+    
+    def bind(self, widget):
+        """Asociar la cola al widget raíz y reenviar lo que quedó de otra sesión"""
+        self.widget = widget
+        if self.count:
+            self._schedule(0)
+    
+    @property
+    def count(self):
+        """Operaciones que aún no están en la base de datos"""
+        return self.journal.count()
+    
+    @property
+    def rejected(self):
+        """Operaciones que MySQL rechazó y quedaron apartadas en el diario"""
+        return self.journal.count('rechazada')
+    
+    @property
+    def flushing(self):
+        return self._task is not None
+    
+    def add(self, registro):
+        """Guardar un registro validado del modo rápido y enviarlo por lotes"""
+        self.journal.append('insert', registro)
+        self._notify()
+        
+        if self.count >= self.batch_size and not self.offline:
+            self.flush()
+        elif not self.flushing:
+            self._schedule(self.retry_delay if self.offline else self.flush_delay)
+    
+    def submit(self, tipo, datos, registro_id=None, callback=None):
+        """Guardar una operación en el diario y enviarla ya, en segundo plano
+        
+        El hilo de Tk solo escribe en el diario local; MySQL se consulta en el
+        hilo de trabajo. callback(resultado) se invoca en el hilo de Tk con
+        APLICADA, PENDIENTE (sin conexión) o None si MySQL la rechazó.
+        """
+        op_uuid = self.journal.append(tipo, datos, registro_id)
+        if callback:
+            self._waiting[op_uuid] = callback
+        self._notify()
+        self.flush()
+    
+    def flush(self):
+        """Enviar ahora todo lo pendiente del diario"""
+        self._cancel_timer()
+        if self.flushing or not self.count:
+            return
+        
+        self._task = background.submit(
+            self.journal.replay,
+            callback=self._on_replayed, error_callback=self._on_failed, owner=self
+        )
+        self._notify()
+    
+    def _on_replayed(self, result):
+        """Programar el siguiente envío según lo que llegó mientras tanto"""
+        self.offline = False
+        self._task = None
+        self._notify()
+        self._resolve_waiting()
+        
+        pending = self.count
+        # Lo enviado con submit() mientras corría este envío no espera el lote
+        if pending >= self.batch_size or self._waiting:
+            self.flush()
+        elif pending:
+            self._schedule(self.flush_delay)
+    
+    def _on_failed(self, error):
+        """Sin conexión: lo pendiente sigue en el diario, reintentar más tarde"""
+        if isinstance(error, Error) and is_retryable(error):
+            print(f"🔌 No se pudo enviar el diario local: {error}")
+        else:
+            print(f"❌ Error enviando el diario local: {error}")
+        self.offline = True
+        self._task = None
+        self._notify()
+        self._resolve_waiting()
+        self._schedule(self.retry_delay)
+    
+    def _resolve_waiting(self):
+        """Informar el resultado de las operaciones enviadas con submit()"""
+        for op_uuid, callback in list(self._waiting.items()):
+            estado = self.journal.status(op_uuid)
+            if estado == PENDIENTE and not self.offline:
+                # Llegó con el envío ya en curso: sale en el siguiente
+                continue
+            del self._waiting[op_uuid]
+            try:
+                callback(estado if estado in (APLICADA, PENDIENTE) else None)
+            except tk.TclError:
+                # La ventana que esperaba el resultado ya se cerró
+                pass
+    
+    def _schedule(self, delay):
+        """Programar el próximo envío descartando el anterior"""
+        self._cancel_timer()
+        if self.widget is None:
+            return
+        try:
+            self._after_id = self.widget.after(delay, self._on_timer)
+        except tk.TclError:
+            self._after_id = None
+    
+    def _cancel_timer(self):
+        if self._after_id:
+            try:
+                self.widget.after_cancel(self._after_id)
+            except tk.TclError:
+                pass
+            self._after_id = None
+    
+    def _on_timer(self):
+        self._after_id = None
+        self.flush()
+    
+    def _notify(self):
+        if self.on_change:
+            try:
+                self.on_change()
+            except tk.TclError:
+                # El formulario no está visible
+                pass
+
+
+# Instancia global de la cola de envío
+registration_queue = RegistrationQueue(journal)
@@ -9,20 +9,31 @@ from datetime import datetime
 from secretary.register import RegisterModule
 from secretary.history import HistoryModule
 from secretary.cash import CashModule
+from secretary.register_queue import registration_queue
+from src.utils.module_cache import ModuleCache
 
 
 class SecretaryPanel:
     """Panel principal para el secretario con navegación lateral"""
     
+    # Cada cuánto se actualiza el cierre de caja oculto mientras se registra (ms)
+    CASH_PREFETCH_INTERVAL = 30000
+    # Espera tras un registro antes de actualizarlo (agrupa registros seguidos)
+    CASH_PREFETCH_DELAY = 2000
+    
     def __init__(self, parent, user_data, on_logout_callback):
         self.parent = parent
         self.user_data = user_data
         self.on_logout = on_logout_callback
         self.current_module = None
         self.modules = {}
+        self.module_cache = None
+        self._prefetch_after = None
+        
+        # Reenvía en segundo plano lo que haya quedado en el diario local
+        registration_queue.bind(self.parent)
         
         self.setup_ui()
-        self.load_modules()
     
     def setup_ui(self):
         """Configurar interfaz principal"""
@@ -46,9 +57,16 @@ class SecretaryPanel:
         # Contenido dinámico
         self.content_frame = tk.Frame(main_container, bg='#f8fafc')
         self.content_frame.pack(side='right', fill='both', expand=True, padx=20, pady=20)
-
+        
+        # Los tres módulos se renderizan una vez y luego solo se muestran u ocultan
+        self.module_cache = ModuleCache(self.content_frame, self.render_module, max_alive=3)
+        
         self.load_modules()
         self.show_module('register')
+        
+        # Pre-renderizar historial y caja cuando la ventana quede libre
+        self.parent.after_idle(self.preload_modules)
+        self.schedule_cash_prefetch(self.CASH_PREFETCH_INTERVAL)
     
     def create_header(self):
         """Crear header de la aplicación"""
@@ -86,7 +104,7 @@ class SecretaryPanel:
             padx=15,
             pady=5,
             cursor='hand2',
-            command=self.on_logout
+            command=self.logout
         )
         logout_btn.pack(side='right')
         
@@ -199,6 +217,9 @@ class SecretaryPanel:
                 'history': HistoryModule(self.user_data),
                 'cash': CashModule(self.user_data)
             }
+            self.modules['register'].on_registered = lambda: self.schedule_cash_prefetch(
+                self.CASH_PREFETCH_DELAY
+            )
         except Exception as e:
             messagebox.showerror("Error", f"Error cargando módulos: {str(e)}")
     
@@ -208,17 +229,60 @@ class SecretaryPanel:
             messagebox.showerror("Error", "Módulo no encontrado")
             return
         
-        # Limpiar contenido anterior
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
-        
         # Actualizar botones del sidebar
         self.update_sidebar_buttons(module_name)
         
-        # Mostrar módulo
+        # Mostrar módulo: el anterior se oculta con sus datos y consultas en curso
+        try:
+            self.current_module = self.module_cache.show(module_name)
+        except Exception as e:
+            messagebox.showerror("Error", f"Error mostrando módulo: {str(e)}")
+    
+    def render_module(self, module_name, frame):
+        """Renderizar un módulo dentro del frame que le asigna la caché"""
         module = self.modules[module_name]
-        module.render(self.content_frame)
-        self.current_module = module
+        module.render(frame)
+        return module
+    
+    def preload_modules(self):
+        """Renderizar ocultos los módulos que aún no se abrieron"""
+        if not self.content_frame.winfo_exists():
+            return
+        for module_name in self.modules:
+            try:
+                self.module_cache.preload(module_name)
+            except Exception as e:
+                print(f"❌ Error pre-renderizando módulo {module_name}: {e}")
+    
+    def schedule_cash_prefetch(self, delay):
+        """Programar la próxima actualización anticipada del cierre de caja"""
+        self.cancel_cash_prefetch()
+        self._prefetch_after = self.parent.after(delay, self.prefetch_cash)
+    
+    def cancel_cash_prefetch(self):
+        if self._prefetch_after:
+            try:
+                self.parent.after_cancel(self._prefetch_after)
+            except tk.TclError:
+                pass
+            self._prefetch_after = None
+    
+    def prefetch_cash(self):
+        """Mientras se registra, mantener al día el cierre de caja oculto"""
+        self._prefetch_after = None
+        if self.module_cache.current == 'register':
+            cash = self.module_cache.get('cash')
+            if cash and cash.prefetch():
+                self.module_cache.mark_fresh('cash')
+        self.schedule_cash_prefetch(self.CASH_PREFETCH_INTERVAL)
+    
+    def logout(self):
+        """Cerrar sesión; lo pendiente del diario local se sigue enviando"""
+        registration_queue.on_change = None
+        registration_queue.flush()
+        self.cancel_cash_prefetch()
+        self.module_cache.clear()
+        self.on_logout()
     
     def update_sidebar_buttons(self, active_module):
         """Actualizar estilos de botones activos"""
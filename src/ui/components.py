@@ -0,0 +1,216 @@
+"""
+Componentes reutilizables de la interfaz
+"""
+
+import time
+import tkinter as tk
+from collections import deque
+
+
+class CanvasChart(tk.Canvas):
+    """Lista de filas (marcador, etiqueta, barra opcional y valor) dibujada en un solo Canvas
+    
+    Los ítems del canvas se crean una vez por fila y se reutilizan: update_rows()
+    solo cambia textos, colores y coordenadas, y oculta las filas sobrantes. Así
+    refrescar o cambiar de período no destruye ni crea widgets.
+    
+    Cada fila es un dict con 'label' y 'value' (textos) y, opcionalmente,
+    'fraction' (largo de la barra entre 0 y 1), 'color' (barra), 'marker' y
+    'marker_color' (texto a la izquierda, p. ej. "1." o "●").
+    """
+    
+    def __init__(self, parent, row_height=26, label_width=70, marker_width=24,
+                 show_bars=True, empty_text="No hay datos para mostrar", bg='white',
+                 label_font=('Segoe UI', 9), value_font=('Segoe UI', 9, 'bold'),
+                 marker_font=('Segoe UI', 10, 'bold'), label_color='#374151',
+                 value_color='#374151', **kwargs):
+        super().__init__(parent, bg=bg, highlightthickness=0, height=row_height, **kwargs)
+        self.row_height = row_height
+        self.label_width = label_width
+        self.marker_width = marker_width
+        self.show_bars = show_bars
+        self.label_font = label_font
+        self.value_font = value_font
+        self.marker_font = marker_font
+        self.label_color = label_color
+        self.value_color = value_color
+        self._rows = []
+        self._items = []
+        
+        self._empty = self.create_text(
+            0, 0, text=empty_text, font=('Segoe UI', 12), fill='#6b7280', state='hidden'
+        )
+        self.bind('<Configure>', lambda event: self._layout())
+    
+    def update_rows(self, rows):
+        """Mostrar estas filas reutilizando los ítems ya dibujados"""
+        self._rows = list(rows)
+        while len(self._items) < len(self._rows):
+            self._items.append(self._create_row_items())
+        
+        for items, row in zip(self._items, self._rows):
+            self.itemconfigure(
+                items['marker'], text=row.get('marker', ''),
+                fill=row.get('marker_color', self.label_color), state='normal'
+            )
+            self.itemconfigure(items['label'], text=row['label'], state='normal')
+            self.itemconfigure(items['value'], text=row['value'], state='normal')
+            color = row.get('color', '#059669')
+            self.itemconfigure(
+                items['bar'], fill=color, outline=color,
+                state='normal' if self.show_bars and row.get('fraction') else 'hidden'
+            )
+        
+        # Filas de una carga anterior más larga: se ocultan, no se destruyen
+        for items in self._items[len(self._rows):]:
+            for item in items.values():
+                self.itemconfigure(item, state='hidden')
+        
+        self.itemconfigure(self._empty, state='hidden' if self._rows else 'normal')
+        self.configure(height=max(len(self._rows), 2) * self.row_height)
+        self._layout()
+    
+    def _create_row_items(self):
+        return {
+            'marker': self.create_text(0, 0, anchor='w', font=self.marker_font),
+            'label': self.create_text(0, 0, anchor='w', font=self.label_font, fill=self.label_color),
+            'bar': self.create_rectangle(0, 0, 0, 0),
+            'value': self.create_text(0, 0, anchor='e', font=self.value_font, fill=self.value_color)
+        }
+    
+    def _layout(self):
+        """Ubicar los ítems según el ancho actual del canvas"""
+        width = self.winfo_width()
+        if width <= 1:
+            # Todavía sin tamaño: se ubican al recibir el primer <Configure>
+            return
+        
+        has_markers = any(row.get('marker') for row in self._rows)
+        label_x = self.marker_width if has_markers else 0
+        bar_x = label_x + self.label_width + 10
+        value_space = 0
+        for items, _ in zip(self._items, self._rows):
+            box = self.bbox(items['value'])
+            if box:
+                value_space = max(value_space, box[2] - box[0])
+        bar_max = max(width - bar_x - value_space - 20, 0)
+        
+        for index, (items, row) in enumerate(zip(self._items, self._rows)):
+            y = index * self.row_height + self.row_height / 2
+            self.coords(items['marker'], 0, y)
+            self.coords(items['label'], label_x, y)
+            self.coords(items['value'], width, y)
+            length = bar_max * min(max(float(row.get('fraction') or 0), 0), 1)
+            self.coords(items['bar'], bar_x, y - 5, bar_x + length, y + 5)
+        
+        self.coords(self._empty, width / 2, self.row_height)
+
+
+class TreeviewFiller:
+    """Llena un ttk.Treeview con pocas llamadas a Tcl y sin congelar la interfaz
+    
+    - replace(): borra todas las filas en una sola llamada y agrega las nuevas
+    - sync(): compara por iid con lo que ya está en la tabla y solo inserta,
+      actualiza, mueve o borra las filas que cambiaron (conserva la selección)
+    - append(): agrega filas al final, detrás de lo que aún esté pendiente
+    
+    La primera tanda se pinta de inmediato; si quedan más filas, se siguen
+    insertando en tandas con after_idle para que la ventana procese eventos y se
+    redibuje entre una y otra. Las filas son (values, tags) o, en sync(),
+    (iid, values, tags).
+    """
+    
+    def __init__(self, tree, chunk_size=200, time_slice=0.015):
+        self.tree = tree
+        self.chunk_size = chunk_size
+        self.time_slice = time_slice
+        self._pending = deque()
+        self._after_id = None
+        self._rows = {}
+        self._order = []
+    
+    def replace(self, rows):
+        """Vaciar la tabla en una sola llamada y cargar las filas nuevas"""
+        self.cancel()
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
+        self._rows.clear()
+        self._order = []
+        self.append(rows)
+    
+    def append(self, rows):
+        """Agregar filas al final de la tabla"""
+        self._pending.extend(('append', None, tuple(values), tuple(tags)) for values, tags in rows)
+        self._start()
+    
+    def sync(self, rows):
+        """Dejar la tabla igual a rows tocando solo las filas que cambiaron"""
+        self.cancel()
+        rows = [(str(iid), tuple(values), tuple(tags)) for iid, values, tags in rows]
+        keep = {iid for iid, _, _ in rows}
+        
+        children = self.tree.get_children()
+        stale = [iid for iid in children if iid not in keep]
+        if stale:
+            self.tree.delete(*stale)
+            for iid in stale:
+                self._rows.pop(iid, None)
+        self._order = [iid for iid in children if iid in keep]
+        
+        self._pending.extend(
+            (index, iid, values, tags) for index, (iid, values, tags) in enumerate(rows)
+        )
+        self._start()
+    
+    def cancel(self):
+        """Descartar las tandas pendientes (la tabla queda como esté)"""
+        if self._after_id:
+            try:
+                self.tree.after_cancel(self._after_id)
+            except tk.TclError:
+                pass
+            self._after_id = None
+        self._pending.clear()
+    
+    @property
+    def pending(self):
+        return bool(self._pending)
+    
+    def _start(self):
+        if self._after_id is None:
+            self._step()
+    
+    def _step(self):
+        """Aplicar una tanda y programar la siguiente si quedan filas"""
+        self._after_id = None
+        deadline = time.perf_counter() + self.time_slice
+        try:
+            for _ in range(self.chunk_size):
+                if not self._pending:
+                    return
+                self._apply(*self._pending.popleft())
+                if time.perf_counter() > deadline:
+                    break
+            if self._pending:
+                self._after_id = self.tree.after_idle(self._step)
+        except tk.TclError:
+            # La tabla fue destruida (se cambió de módulo)
+            self._pending.clear()
+    
+    def _apply(self, index, iid, values, tags):
+        if index == 'append':
+            self._order.append(self.tree.insert('', 'end', values=values, tags=tags))
+            return
+        
+        if not self.tree.exists(iid):
+            self.tree.insert('', index, iid=iid, values=values, tags=tags)
+            self._order.insert(index, iid)
+        else:
+            if self._rows.get(iid) != (values, tags):
+                self.tree.item(iid, values=values, tags=tags)
+            if index >= len(self._order) or self._order[index] != iid:
+                self.tree.move(iid, '', index)
+                self._order.remove(iid)
+                self._order.insert(index, iid)
+        self._rows[iid] = (values, tags)
@@ -0,0 +1,172 @@
+"""
+Ejecución de tareas en segundo plano para la interfaz Tkinter
+Corre consultas y trabajos pesados en un pool de hilos y entrega los
+resultados en el hilo de Tk mediante root.after
+"""
+
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from database.db_config import db
+
+
+class BackgroundTask:
+    """Referencia a una tarea enviada al executor"""
+    
+    def __init__(self, owner, callback, error_callback):
+        self.owner = owner
+        self.callback = callback
+        self.error_callback = error_callback
+        self.future = None
+        self._cancelled = threading.Event()
+    
+    def cancel(self):
+        """Cancelar la tarea; si ya está corriendo, su resultado se descarta"""
+        self._cancelled.set()
+        if self.future:
+            self.future.cancel()
+    
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+
+class BackgroundExecutor:
+    """Pool de hilos que devuelve resultados al hilo principal de Tk"""
+    
+    def __init__(self, max_workers=4, poll_interval=30):
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self.root = None
+        self._pool = None
+        self._results = queue.Queue()
+        self._tasks = set()
+        self._lock = threading.Lock()
+        self._polling = False
+    
+    def bind(self, root):
+        """Asociar el executor a la ventana raíz de Tk"""
+        if root is not self.root:
+            self.root = root
+            self._polling = False
+    
+    def submit(self, func, *args, callback=None, error_callback=None, owner=None, **kwargs):
+        """Ejecutar func(*args, **kwargs) en un hilo de trabajo
+        
+        callback(resultado) y error_callback(excepción) se invocan en el hilo
+        de Tk. owner agrupa tareas para poder cancelarlas juntas.
+        """
+        task = BackgroundTask(owner, callback, error_callback)
+        
+        # Sin ventana asociada se ejecuta de forma síncrona
+        if self.root is None:
+            self._run_inline(task, func, args, kwargs)
+            return task
+        
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix='lavadero-bg'
+            )
+        
+        with self._lock:
+            self._tasks.add(task)
+        task.future = self._pool.submit(self._run, task, func, args, kwargs)
+        # También se dispara si la tarea se cancela antes de empezar
+        task.future.add_done_callback(lambda future: self._results.put((task, future)))
+        self._ensure_polling()
+        return task
+    
+    def run_query(self, query, params=None, callback=None, error_callback=None, owner=None):
+        """Atajo para ejecutar db.execute_query en segundo plano"""
+        return self.submit(
+            db.execute_query, query, params,
+            callback=callback, error_callback=error_callback, owner=owner
+        )
+    
+    def cancel(self, owner):
+        """Cancelar todas las tareas pendientes de un propietario"""
+        with self._lock:
+            tasks = [task for task in self._tasks if task.owner is owner]
+        for task in tasks:
+            task.cancel()
+    
+    def shutdown(self):
+        """Detener el pool de hilos descartando tareas pendientes"""
+        with self._lock:
+            tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+    
+    def _run(self, task, func, args, kwargs):
+        """Cuerpo ejecutado en el hilo de trabajo"""
+        if task.cancelled:
+            return None
+        return func(*args, **kwargs)
+    
+    def _run_inline(self, task, func, args, kwargs):
+        """Ejecutar la tarea en el hilo actual (sin Tk asociado)"""
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self._deliver(task, False, e)
+        else:
+            self._deliver(task, True, result)
+    
+    def _ensure_polling(self):
+        """Programar el vaciado de resultados si no está activo"""
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_interval, self._poll)
+    
+    def _poll(self):
+        """Entregar en el hilo de Tk los resultados terminados"""
+        while True:
+            try:
+                task, future = self._results.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._tasks.discard(task)
+            if future.cancelled():
+                continue
+            error = future.exception()
+            if error is not None:
+                self._deliver(task, False, error)
+            else:
+                self._deliver(task, True, future.result())
+        
+        with self._lock:
+            pending = bool(self._tasks)
+        
+        if pending and self.root is not None:
+            try:
+                self.root.after(self.poll_interval, self._poll)
+                return
+            except Exception:
+                pass
+        self._polling = False
+    
+    def _deliver(self, task, ok, payload):
+        """Invocar el callback correspondiente si la tarea sigue vigente"""
+        if task.cancelled:
+            return
+        try:
+            if ok:
+                if task.callback:
+                    task.callback(payload)
+            else:
+                if task.error_callback:
+                    task.error_callback(payload)
+                else:
+                    print(f"❌ Error en tarea de segundo plano: {payload}")
+        except Exception as e:
+            # El widget destino pudo destruirse mientras la tarea corría
+            print(f"❌ Error entregando resultado de tarea: {e}")
+
+
+# Instancia global del executor
+background = BackgroundExecutor()
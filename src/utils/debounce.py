@@ -0,0 +1,57 @@
+"""
+Debounce para entradas de filtros en Tkinter
+Agrupa disparos repetidos (cada tecla) y ejecuta solo el último
+"""
+
+import tkinter as tk
+
+
+class Debouncer:
+    """Programa callback tras `delay` ms sin nuevos disparos
+    
+    Solo se conserva el último trabajo pendiente. on_trigger se invoca en
+    cada disparo para cancelar de inmediato consultas en curso cuyo
+    resultado ya quedó obsoleto.
+    """
+    
+    def __init__(self, widget, callback, delay=400, on_trigger=None):
+        self.widget = widget
+        self.callback = callback
+        self.delay = delay
+        self.on_trigger = on_trigger
+        self._after_id = None
+    
+    def trigger(self, *args, **kwargs):
+        """Reprogramar la llamada descartando la pendiente"""
+        self.cancel()
+        if self.on_trigger:
+            self.on_trigger()
+        try:
+            self._after_id = self.widget.after(self.delay, lambda: self._fire(args, kwargs))
+        except tk.TclError:
+            # El widget ya fue destruido
+            self._after_id = None
+    
+    def run_now(self, *args, **kwargs):
+        """Ejecutar de inmediato (botón Buscar, combos) descartando lo pendiente"""
+        self.cancel()
+        if self.on_trigger:
+            self.on_trigger()
+        self.callback(*args, **kwargs)
+    
+    def cancel(self):
+        """Descartar la llamada pendiente, si existe"""
+        if self._after_id:
+            try:
+                self.widget.after_cancel(self._after_id)
+            except tk.TclError:
+                pass
+            self._after_id = None
+    
+    @property
+    def pending(self):
+        return self._after_id is not None
+    
+    def _fire(self, args, kwargs):
+        self._after_id = None
+        self.callback(*args, **kwargs)
@@ -0,0 +1,158 @@
+"""
+Exportación de tablas por streaming a Excel (openpyxl write_only) o CSV
+Las filas llegan por lotes y se escriben con celdas tipadas, sin cargar
+todo el resultado en memoria
+"""
+
+import csv
+import os
+import threading
+from datetime import time, timedelta
+
+
+class ExportCancelled(Exception):
+    """La exportación fue cancelada por el usuario"""
+
+
+class ExportJob:
+    """Estado compartido entre el hilo de exportación y el diálogo de progreso"""
+    
+    def __init__(self, filename, total=0):
+        self.filename = filename
+        self.total = total
+        self.written = 0
+        self._cancelled = threading.Event()
+    
+    @property
+    def format(self):
+        return 'csv' if self.filename.lower().endswith('.csv') else 'xlsx'
+    
+    def cancel(self):
+        """Pedir la cancelación; se aplica al terminar el lote en curso"""
+        self._cancelled.set()
+    
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+
+class TableExporter:
+    """Escribe lotes de filas (diccionarios) en un archivo XLSX o CSV"""
+    
+    NUMBER_FORMATS = {
+        'money': '"$"#,##0',
+        'date': 'DD/MM/YYYY',
+        'time': 'HH:MM'
+    }
+    
+    def __init__(self, columns, sheet_title, extra_sheets=None):
+        # columns: lista de (encabezado, llave, tipo, ancho)
+        # tipo: 'int', 'money', 'date', 'time' o 'text'
+        self.columns = columns
+        self.sheet_title = sheet_title
+        # extra_sheets: lista de (título, filas (etiqueta, valor)); solo XLSX
+        self.extra_sheets = extra_sheets or []
+    
+    def export(self, job, batches):
+        """Escribir todos los lotes; borra el archivo parcial si falla o se cancela"""
+        try:
+            if job.format == 'csv':
+                self._write_csv(job, batches)
+            else:
+                self._write_xlsx(job, batches)
+        except BaseException:
+            self._remove_partial(job.filename)
+            raise
+        finally:
+            # Cierra el cursor del servidor si se dejó de iterar
+            close = getattr(batches, 'close', None)
+            if close:
+                close()
+        return job
+    
+    def _write_csv(self, job, batches):
+        """Escribir CSV (UTF-8 con BOM para que Excel respete los acentos)"""
+        with open(job.filename, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow([header for header, _, _, _ in self.columns])
+            
+            for batch in batches:
+                if job.cancelled:
+                    raise ExportCancelled()
+                writer.writerows(
+                    [self._convert(row[key], kind) for _, key, kind, _ in self.columns]
+                    for row in batch
+                )
+                job.written += len(batch)
+    
+    def _write_xlsx(self, job, batches):
+        """Escribir XLSX en modo write_only (las filas no quedan en memoria)"""
+        import openpyxl
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font, PatternFill, Alignment
+        from openpyxl.utils import get_column_letter
+        
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet(title=self.sheet_title)
+        
+        for col, (_, _, _, width) in enumerate(self.columns, 1):
+            ws.column_dimensions[get_column_letter(col)].width = width
+        
+        # Headers
+        header_font = Font(bold=True, color="FFFFFF")
+        header_fill = PatternFill(start_color="2563EB", end_color="2563EB", fill_type="solid")
+        header_alignment = Alignment(horizontal="center", vertical="center")
+        headers = []
+        for header, _, _, _ in self.columns:
+            cell = WriteOnlyCell(ws, value=header)
+            cell.font = header_font
+            cell.fill = header_fill
+            cell.alignment = header_alignment
+            headers.append(cell)
+        ws.append(headers)
+        
+        # Datos
+        for batch in batches:
+            if job.cancelled:
+                raise ExportCancelled()
+            for row in batch:
+                values = []
+                for _, key, kind, _ in self.columns:
+                    value = self._convert(row[key], kind)
+                    if kind in self.NUMBER_FORMATS and value is not None:
+                        cell = WriteOnlyCell(ws, value=value)
+                        cell.number_format = self.NUMBER_FORMATS[kind]
+                        value = cell
+                    values.append(value)
+                ws.append(values)
+            job.written += len(batch)
+        
+        # Hojas adicionales (estadísticas, filtros)
+        for title, rows in self.extra_sheets:
+            extra_ws = wb.create_sheet(title=title)
+            extra_ws.column_dimensions['A'].width = 25
+            extra_ws.column_dimensions['B'].width = 20
+            for label, value in rows:
+                label_cell = WriteOnlyCell(extra_ws, value=label)
+                # Etiquetas sin valor son títulos de sección
+                if label and value in (None, ''):
+                    label_cell.font = Font(bold=True)
+                extra_ws.append([label_cell, value])
+        
+        wb.save(job.filename)
+    
+    def _convert(self, value, kind):
+        """Convertir valores de MySQL a tipos que Excel/CSV entienden"""
+        if kind == 'time' and isinstance(value, timedelta):
+            # mysql.connector devuelve TIME como timedelta
+            seconds = int(value.total_seconds()) % 86400
+            return time(seconds // 3600, seconds % 3600 // 60, seconds % 60)
+        return value
+    
+    def _remove_partial(self, filename):
+        """Eliminar un archivo incompleto"""
+        try:
+            if os.path.exists(filename):
+                os.remove(filename)
+        except OSError:
+            pass
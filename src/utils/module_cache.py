@@ -0,0 +1,134 @@
+"""
+Caché de módulos de los paneles
+Los módulos usados recientemente quedan construidos y ocultos (pack_forget) en
+lugar de destruirse; al volver a uno se muestra de inmediato y solo se
+refresca si sus datos son más viejos que su STALE_AFTER o si se invalidó.
+"""
+
+import time
+import tkinter as tk
+from collections import OrderedDict
+
+
+class ModuleCache:
+    """Módulos vivos de un panel con un máximo de max_alive (LRU)
+    
+    factory(module_id, frame) construye el módulo dentro de frame. Los módulos
+    pueden definir STALE_AFTER (segundos; None = no vence), refresh(),
+    cancel_pending() y cleanup().
+    """
+    
+    def __init__(self, container, factory, max_alive=3, bg='#f8fafc'):
+        self.container = container
+        self.factory = factory
+        self.max_alive = max_alive
+        self.bg = bg
+        self.current = None
+        self._entries = OrderedDict()
+    
+    def show(self, module_id):
+        """Mostrar el módulo (construyéndolo si no está vivo) y devolverlo"""
+        self.hide_current()
+        
+        entry = self._entries.get(module_id)
+        if entry:
+            self._entries.move_to_end(module_id)
+            entry['frame'].pack(fill='both', expand=True)
+            if self._is_stale(entry):
+                entry['module'].refresh()
+                entry['loaded_at'] = time.monotonic()
+                entry['stale'] = False
+        else:
+            entry = self._build(module_id, visible=True)
+        
+        self.current = module_id
+        self._evict()
+        return entry['module']
+    
+    def preload(self, module_id):
+        """Construir un módulo oculto para que la primera vez se muestre al instante"""
+        if module_id not in self._entries:
+            self._build(module_id, visible=False)
+            self._entries.move_to_end(module_id, last=False)
+            self._evict()
+        return self._entries.get(module_id, {}).get('module')
+    
+    def hide_current(self):
+        """Ocultar el módulo visible sin destruirlo"""
+        entry = self._entries.get(self.current)
+        if entry:
+            entry['frame'].pack_forget()
+        self.current = None
+    
+    def mark_fresh(self, module_id):
+        """Anotar que el módulo acaba de recargar sus datos por su cuenta"""
+        entry = self._entries.get(module_id)
+        if entry:
+            entry['loaded_at'] = time.monotonic()
+            entry['stale'] = False
+    
+    def get(self, module_id):
+        entry = self._entries.get(module_id)
+        return entry['module'] if entry else None
+    
+    def invalidate(self, module_id=None):
+        """Marcar un módulo (o todos) para refrescarlo la próxima vez que se muestre"""
+        for key, entry in self._entries.items():
+            if module_id is None or key == module_id:
+                entry['stale'] = True
+    
+    def refresh(self, module_id):
+        """Refrescar ahora un módulo vivo"""
+        entry = self._entries.get(module_id)
+        if entry:
+            entry['module'].refresh()
+            entry['loaded_at'] = time.monotonic()
+            entry['stale'] = False
+    
+    def clear(self):
+        """Cancelar y destruir todos los módulos (cierre de sesión)"""
+        for module_id in list(self._entries):
+            self._destroy(module_id)
+        self.current = None
+    
+    def _is_stale(self, entry):
+        if entry['stale']:
+            return True
+        max_age = getattr(entry['module'], 'STALE_AFTER', None)
+        return max_age is not None and time.monotonic() - entry['loaded_at'] > max_age
+    
+    def _build(self, module_id, visible):
+        frame = tk.Frame(self.container, bg=self.bg)
+        if visible:
+            frame.pack(fill='both', expand=True)
+        try:
+            module = self.factory(module_id, frame)
+        except Exception:
+            frame.destroy()
+            raise
+        entry = {'frame': frame, 'module': module, 'loaded_at': time.monotonic(), 'stale': False}
+        self._entries[module_id] = entry
+        return entry
+    
+    def _evict(self):
+        """Destruir los módulos menos usados por encima de max_alive"""
+        while len(self._entries) > self.max_alive:
+            oldest = next((key for key in self._entries if key != self.current), None)
+            if oldest is None:
+                break
+            self._destroy(oldest)
+    
+    def _destroy(self, module_id):
+        entry = self._entries.pop(module_id)
+        module = entry['module']
+        try:
+            if hasattr(module, 'cancel_pending'):
+                module.cancel_pending()
+            if hasattr(module, 'cleanup'):
+                module.cleanup()
+        except Exception as e:
+            print(f"❌ Error liberando módulo {module_id}: {e}")
+        try:
+            entry['frame'].destroy()
+        except tk.TclError:
+            pass
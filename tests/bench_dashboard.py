@@ -0,0 +1,172 @@
+"""
+Benchmark del Dashboard - Consultas separadas vs. agregación en una pasada
+
+Uso (requiere MySQL configurado en .env):
+    python tests/bench_dashboard.py --seed 1000000   # sembrar registros de prueba
+    python tests/bench_dashboard.py --year 2025 --month 10
+"""
+
+import argparse
+import calendar
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.db_config import db
+from database.daily_summary import daily_summary
+from database.materialized import materialized
+from src.admin.dashboard_data import DashboardDataProvider
+
+# Consultas que el dashboard ejecutaba antes de DashboardDataProvider
+LEGACY_QUERIES = [
+    ("""
+        SELECT COALESCE(SUM(costo), 0) as total_ingresos, COUNT(*) as total_servicios,
+            COALESCE(AVG(costo), 0) as promedio_servicio,
+            COALESCE(SUM(comision_calculada), 0) as total_comisiones,
+            COALESCE(SUM(ganancia_neta), 0) as ganancia_neta
+        FROM vista_registros_completos
+        WHERE fecha BETWEEN %s AND %s AND pago = 'Pagado'
+    """, True),
+    ("""
+        SELECT COUNT(*) as servicios_hoy FROM vista_registros_completos
+        WHERE fecha = CURDATE() AND pago = 'Pagado'
+    """, False),
+    ("""
+        SELECT DATE(fecha) as dia, COALESCE(SUM(costo), 0) as ingresos_dia
+        FROM vista_registros_completos
+        WHERE fecha BETWEEN %s AND %s AND pago = 'Pagado'
+        GROUP BY DATE(fecha) ORDER BY dia DESC LIMIT 15
+    """, True),
+    ("""
+        SELECT vehiculo_nombre, COUNT(*) as cantidad, COALESCE(SUM(costo), 0) as ingresos_tipo
+        FROM vista_registros_completos
+        WHERE fecha BETWEEN %s AND %s AND pago = 'Pagado'
+        GROUP BY vehiculo_nombre ORDER BY cantidad DESC
+    """, True),
+    ("""
+        SELECT lavador, COUNT(*) as total_servicios, COALESCE(SUM(costo), 0) as total_ingresos,
+            COALESCE(SUM(comision_calculada), 0) as total_comision
+        FROM vista_registros_completos
+        WHERE fecha BETWEEN %s AND %s AND pago = 'Pagado'
+        GROUP BY lavador ORDER BY total_ingresos DESC
+    """, True),
+    ("""
+        SELECT fecha, vehiculo_nombre, servicio_nombre, costo
+        FROM vista_registros_completos
+        WHERE pago = 'Pagado' ORDER BY fecha DESC, hora DESC LIMIT 15
+    """, False)
+]
+
+
+class CountingDB:
+    """Envoltura de db que cuenta las consultas ejecutadas"""
+    
+    def __init__(self, database):
+        self.database = database
+        self.queries = 0
+    
+    def execute_query(self, query, params=None):
+        self.queries += 1
+        return self.database.execute_query(query, params)
+
+
+def seed(total, batch_size=5000):
+    """Insertar registros aleatorios repartidos en los últimos 3 años"""
+    servicios = [row['id'] for row in db.execute_query("SELECT id FROM servicios") or []]
+    usuarios = [row['id'] for row in db.execute_query("SELECT id FROM usuarios") or []]
+    lavadores = [row['id'] for row in db.execute_query("SELECT id FROM lavadores") or []]
+    
+    if not servicios or not usuarios:
+        print("❌ Se necesitan servicios y usuarios existentes para sembrar registros")
+        return
+    
+    vehiculos = ['motorcycle', 'car', 'pickup', 'suv', 'truck']
+    today = date.today()
+    query = """
+        INSERT INTO registros
+        (fecha, hora, vehiculo, placa, id_servicio, costo, porcentaje, id_lavador, pago, id_usuario)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """
+    
+    inserted = 0
+    with db.connection() as connection:
+        cursor = connection.cursor()
+        while inserted < total:
+            batch = []
+            for _ in range(min(batch_size, total - inserted)):
+                fecha = today - timedelta(days=random.randint(0, 3 * 365))
+                hora = f"{random.randint(7, 19):02d}:{random.randint(0, 59):02d}:00"
+                placa = ''.join(random.choices('ABCDEFGHIJKLMNOPQRSTUVWXYZ', k=3)) + f"{random.randint(0, 999):03d}"
+                batch.append((
+                    fecha, hora, random.choice(vehiculos), placa,
+                    random.choice(servicios), random.choice([15000, 20000, 35000, 50000]),
+                    50.0, random.choice(lavadores) if lavadores else None,
+                    random.choice(['Pagado', 'Pagado', 'Pagado', 'Pendiente']),
+                    random.choice(usuarios)
+                ))
+            cursor.executemany(query, batch)
+            inserted += len(batch)
+            print(f"   {inserted:,} / {total:,}")
+        cursor.close()
+    
+    print(f"✅ {inserted:,} registros sembrados")
+    
+    # Los registros sembrados no pasan por el mantenimiento incremental
+    daily_summary.ensure_table(populate=False)
+    daily_summary.rebuild()
+    materialized.refresh("r.comision_calculada IS NULL")
+
+
+def run_legacy(counting_db, start_date, end_date):
+    """Ejecutar las seis consultas originales del dashboard"""
+    for query, uses_period in LEGACY_QUERIES:
+        counting_db.execute_query(query, (start_date, end_date) if uses_period else None)
+
+
+def run_provider(counting_db, start_date, end_date):
+    """Ejecutar DashboardDataProvider"""
+    DashboardDataProvider(counting_db).fetch(start_date, end_date)
+
+
+def measure(label, func, start_date, end_date, repeat):
+    """Medir tiempo promedio y número de consultas"""
+    counting_db = CountingDB(db)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func(counting_db, start_date, end_date)
+    elapsed = (time.perf_counter() - started) / repeat
+    print(f"{label:<28} {counting_db.queries // repeat:>3} consultas   {elapsed * 1000:>9.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de consultas del dashboard")
+    parser.add_argument('--seed', type=int, default=0, help="Registros a sembrar antes de medir")
+    parser.add_argument('--year', type=int, default=date.today().year)
+    parser.add_argument('--month', type=int, default=date.today().month)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    
+    if not db.connect():
+        sys.exit(1)
+    
+    if args.seed:
+        seed(args.seed)
+    
+    total = db.execute_query("SELECT COUNT(*) as total FROM registros")[0]['total']
+    last_day = calendar.monthrange(args.year, args.month)[1]
+    start_date = f"{args.year}-{args.month:02d}-01"
+    end_date = f"{args.year}-{args.month:02d}-{last_day}"
+    
+    print(f"\n📊 registros: {total:,}   período: {start_date} a {end_date}\n")
+    measure("Antes (consultas separadas)", run_legacy, start_date, end_date, args.repeat)
+    measure("Después (una pasada)", run_provider, start_date, end_date, args.repeat)
+    
+    db.disconnect()
+
+
+if __name__ == "__main__":
+    main()
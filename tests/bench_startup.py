@@ -0,0 +1,111 @@
+"""
+Benchmark de arranque - Tiempo de imports hasta poder dibujar el login
+
+Importa src/main.py como lo hace `python src/main.py` (sin abrir ventanas)
+con `python -X importtime` y muestra el tiempo total de imports, los módulos
+más costosos y si algún módulo que debería cargarse bajo demanda (paneles,
+bcrypt, openpyxl, migraciones) se importó al arrancar.
+
+Uso:
+    python tests/bench_startup.py
+    python tests/bench_startup.py --repeat 10 --top 20
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Mismo sys.path que al ejecutar src/main.py; el bloque __main__ no corre
+STARTUP_CODE = "import sys; sys.path.insert(0, 'src'); import main"
+
+# Referencia: lo mínimo que cualquier arranque con Tk tiene que importar
+BASELINE_CODE = "import tkinter, tkinter.ttk, tkinter.messagebox"
+
+# Módulos que no deben importarse antes de mostrar el login
+DEFERRED_MODULES = [
+    'bcrypt',
+    'openpyxl',
+    'database.migrations',
+    'src.admin.admin_panel',
+    'src.admin.dashboard',
+    'src.admin.historial',
+    'src.admin.usuarios',
+    'src.admin.servicios',
+    'src.admin.lavadores',
+    'secretary.secretary_panel'
+]
+
+LINE_RE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)\s*$')
+
+
+def run_importtime(code):
+    """Ejecutar code con -X importtime; devuelve [(módulo, self_us, acumulado_us, nivel)]"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT, capture_output=True, text=True,
+        env={**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'}
+    )
+    if result.returncode != 0:
+        tail = '\n'.join(result.stderr.strip().splitlines()[-5:])
+        raise RuntimeError(f"El import falló:\n{tail}")
+    
+    entries = []
+    for line in result.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((name, int(self_us), int(cumulative_us), len(indent)))
+    return entries
+
+
+def total_ms(entries):
+    """Tiempo total de imports: la suma de los tiempos propios de cada módulo"""
+    return sum(self_us for _, self_us, _, _ in entries) / 1000
+
+
+def measure(label, code, repeat):
+    """Mediana de varias corridas (la primera solo calienta los .pyc del sistema)"""
+    run_importtime(code)
+    runs = [run_importtime(code) for _ in range(repeat)]
+    totals = [total_ms(entries) for entries in runs]
+    median = statistics.median(totals)
+    print(f"{label:<28} {median:>8.1f} ms   (mín {min(totals):.1f}, máx {max(totals):.1f})")
+    return runs[totals.index(sorted(totals)[len(totals) // 2])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de imports al arrancar")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help="Módulos más costosos a mostrar")
+    args = parser.parse_args()
+    
+    print(f"\n🚀 python -X importtime ({args.repeat} corridas, mediana)\n")
+    try:
+        measure("Solo tkinter", BASELINE_CODE, args.repeat)
+        entries = measure("Arranque hasta el login", STARTUP_CODE, args.repeat)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    
+    # Los de menor nivel son los importados directamente por el arranque
+    top_level = min(level for _, _, _, level in entries)
+    direct = [entry for entry in entries if entry[3] <= top_level + 2]
+    print(f"\n{'Módulo':<40} {'propio':>10} {'acumulado':>12}")
+    for name, self_us, cumulative_us, _ in sorted(direct, key=lambda e: -e[2])[:args.top]:
+        print(f"{name:<40} {self_us / 1000:>8.1f} ms {cumulative_us / 1000:>10.1f} ms")
+    
+    imported = {name for name, _, _, _ in entries}
+    eager = [name for name in DEFERRED_MODULES if name in imported]
+    if eager:
+        print(f"\n❌ Importados al arrancar (deberían cargarse bajo demanda): {', '.join(eager)}")
+        sys.exit(1)
+    print(f"\n✅ Ninguno de los {len(DEFERRED_MODULES)} módulos diferidos se importa al arrancar")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Configuración común de las pruebas
+Las pruebas importan los módulos como la aplicación: `database.x` y `src.x`
+desde la raíz del proyecto y `secretary.x` desde src/.
+"""
+
+import importlib.util
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, 'src')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# Casi todo el código importa database.db_config, que necesita el conector
+requires_mysql = pytest.mark.skipif(
+    importlib.util.find_spec('mysql') is None,
+    reason="mysql-connector-python no está instalado"
+)
+
+
+class FakeRoot:
+    """Ventana de Tk mínima: guarda los after() para ejecutarlos a mano"""
+    
+    def __init__(self):
+        # after_id -> (delay, callback), en el orden en que se programaron
+        self.scheduled = {}
+        self.next_id = 0
+        self.destroyed = False
+    
+    def after(self, delay, callback):
+        self.next_id += 1
+        self.scheduled[f"after#{self.next_id}"] = (delay, callback)
+        return f"after#{self.next_id}"
+    
+    def after_cancel(self, after_id):
+        self.scheduled.pop(after_id, None)
+    
+    def destroy(self):
+        self.destroyed = True
+    
+    def delays(self):
+        return sorted(delay for delay, _ in self.scheduled.values())
+    
+    def run_pending(self):
+        """Ejecutar lo programado hasta ahora (no lo que programen esas llamadas)"""
+        for after_id in list(self.scheduled):
+            entry = self.scheduled.pop(after_id, None)
+            if entry:
+                entry[1]()
+
+
+class FakeServer:
+    """Servidor MySQL para el chequeo de socket del pool: registra cada intento"""
+    
+    def __init__(self):
+        # (dirección, timeout) de cada socket abierto
+        self.connections = []
+        self.error = None
+    
+    def create_connection(self, address, timeout=None):
+        self.connections.append((address, timeout))
+        if self.error:
+            raise self.error
+        return self
+    
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def mysql_server(monkeypatch):
+    """Reemplazar los sockets de database.db_config por un FakeServer alcanzable"""
+    from database import db_config
+    server = FakeServer()
+    monkeypatch.setattr(db_config.socket, 'create_connection', server.create_connection)
+    return server
+
+
+@pytest.fixture
+def tk_root():
+    """Ventana de Tk oculta; la prueba se omite si no hay pantalla"""
+    import tkinter as tk
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        pytest.skip(f"Tk no disponible: {e}")
+    root.withdraw()
+    yield root
+    root.destroy()
@@ -0,0 +1,828 @@
+"""
+Pruebas del lado administrador y de la capa de base de datos
+No necesitan un servidor MySQL: las conexiones son objetos de prueba.
+"""
+
+from contextlib import contextmanager
+
+import pytest
+
+from conftest import FakeRoot, requires_mysql
+
+
+class FakeConnection:
+    """Conexión MySQL mínima para el pool"""
+    
+    def __init__(self):
+        self.closed = False
+    
+    def is_connected(self):
+        return not self.closed
+    
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    from database import db_config
+    opened = []
+    
+    def connect(**kwargs):
+        opened.append(FakeConnection())
+        return opened[-1]
+    
+    monkeypatch.setattr(db_config.mysql.connector, 'connect', connect)
+    pool = db_config.ConnectionPool(2, health_check_interval=30, checkout_timeout=0.05)
+    pool.opened = opened
+    return pool
+
+
+@requires_mysql
+def test_pool_reuses_released_connections(pool):
+    first = pool.acquire()
+    pool.release(first)
+    assert pool.acquire() is first
+    assert len(pool.opened) == 1
+
+
+@requires_mysql
+def test_pool_exhausted_raises_pool_error(pool):
+    from mysql.connector import errors
+    pool.acquire()
+    pool.acquire()
+    with pytest.raises(errors.PoolError):
+        pool.acquire()
+
+
+@requires_mysql
+def test_pool_close_all_keeps_borrowed_connections_open(pool):
+    borrowed = pool.acquire()
+    idle = pool.acquire()
+    pool.release(idle)
+    
+    pool.close_all()
+    assert idle.closed
+    assert not borrowed.closed
+    
+    # Al devolverla se descarta en lugar de volver al pool
+    pool.release(borrowed)
+    assert borrowed.closed
+    assert pool.acquire() not in (borrowed, idle)
+
+
+@requires_mysql
+def test_release_goes_to_the_pool_that_lent_the_connection(monkeypatch, mysql_server):
+    from database import db_config
+    monkeypatch.setattr(db_config.mysql.connector, 'connect', lambda **kwargs: FakeConnection())
+    database = db_config.DatabaseConfig()
+    
+    assert database.connect()
+    connection = database.get_connection()
+    old_pool = database.pool
+    assert database.connect()
+    
+    database.release_connection(connection)
+    assert connection.closed
+    # El pool nuevo no recibió una devolución que no le corresponde
+    assert database.pool is not old_pool
+    assert database.pool._slots._value == database.pool.size
+
+
+@requires_mysql
+def test_concurrent_first_use_creates_a_single_pool(monkeypatch, mysql_server):
+    import threading
+    import time
+    from database import db_config
+    probes = []
+    
+    def connect(**kwargs):
+        if 'connection_timeout' in kwargs:
+            probes.append(kwargs)
+            # Prueba lenta: los demás hilos llegan mientras tanto sin pool
+            time.sleep(0.05)
+        return FakeConnection()
+    
+    monkeypatch.setattr(db_config.mysql.connector, 'connect', connect)
+    database = db_config.DatabaseConfig()
+    database.pool_size = 4
+    borrowed = []
+    
+    def borrow():
+        borrowed.append(database.get_connection())
+    
+    threads = [threading.Thread(target=borrow) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(probes) == 1
+    assert {database._lenders[connection] for connection in borrowed} == {database.pool}
+    assert not any(connection.closed for connection in borrowed)
+    
+    for connection in borrowed:
+        database.release_connection(connection)
+    assert database._lenders == {}
+    assert database.pool._slots._value == database.pool.size
+
+
+@pytest.fixture
+def executor():
+    from src.utils.background import BackgroundExecutor
+    executor = BackgroundExecutor(max_workers=2)
+    yield executor
+    executor.shutdown()
+
+
+@requires_mysql
+def test_background_runs_inline_without_root(executor):
+    results, errors = [], []
+    executor.submit(lambda x: x * 2, 21, callback=results.append)
+    executor.submit(lambda: 1 / 0, error_callback=errors.append)
+    assert results == [42]
+    assert isinstance(errors[0], ZeroDivisionError)
+
+
+@requires_mysql
+def test_background_delivers_results_in_the_tk_thread(executor):
+    root = FakeRoot()
+    executor.bind(root)
+    results = []
+    
+    task = executor.submit(sum, [1, 2, 3], callback=results.append)
+    task.future.result(timeout=2)
+    assert results == []
+    
+    root.run_pending()
+    assert results == [6]
+
+
+@requires_mysql
+def test_background_cancel_discards_results_of_an_owner(executor):
+    root = FakeRoot()
+    executor.bind(root)
+    owner, other = object(), object()
+    results = []
+    
+    cancelled = executor.submit(lambda: 'viejo', callback=results.append, owner=owner)
+    kept = executor.submit(lambda: 'otro', callback=results.append, owner=other)
+    executor.cancel(owner)
+    for task in (cancelled, kept):
+        try:
+            task.future.result(timeout=2)
+        except Exception:
+            pass
+    
+    root.run_pending()
+    assert results == ['otro']
+
+
+def test_dashboard_aggregate_derives_every_widget_from_grouped_rows():
+    from datetime import date
+    from src.admin.dashboard_data import DashboardDataProvider
+    
+    def row(dia, vehiculo, id_lavador, cantidad, ingresos):
+        return {
+            'dia': dia, 'vehiculo_nombre': vehiculo, 'id_lavador': id_lavador,
+            'lavador': f"Lavador {id_lavador}", 'cantidad': cantidad,
+            'ingresos': ingresos, 'comisiones': ingresos / 2, 'ganancia': ingresos / 2
+        }
+    
+    rows = [
+        row('2025-10-01', 'Automóvil', 1, 2, 40000),
+        row('2025-10-01', 'Motocicleta', 2, 1, 15000),
+        row('2025-10-02', 'Automóvil', 2, 3, 60000),
+        # Hoy, fuera del período: solo cuenta para servicios_hoy
+        row('2025-11-05', 'Camión', 1, 4, 200000)
+    ]
+    data = DashboardDataProvider(None).aggregate(
+        rows, date(2025, 10, 1), date(2025, 10, 31), date(2025, 11, 5)
+    )
+    
+    assert data['kpis']['total_servicios'] == 6
+    assert data['kpis']['total_ingresos'] == 115000
+    assert data['kpis']['promedio_servicio'] == pytest.approx(115000 / 6)
+    assert data['kpis']['total_comisiones'] == 57500
+    assert data['servicios_hoy'] == 4
+    assert data['daily'] == [
+        {'dia': date(2025, 10, 2), 'ingresos_dia': 60000},
+        {'dia': date(2025, 10, 1), 'ingresos_dia': 55000}
+    ]
+    assert [s['vehiculo_nombre'] for s in data['services']] == ['Automóvil', 'Motocicleta']
+    assert data['services'][0]['cantidad'] == 5
+    assert [w['lavador'] for w in data['workers']] == ['Lavador 2', 'Lavador 1']
+    assert data['workers'][0]['total_ingresos'] == 75000
+
+
+def test_dashboard_aggregate_of_an_empty_period():
+    from datetime import date
+    from src.admin.dashboard_data import DashboardDataProvider
+    
+    data = DashboardDataProvider(None).aggregate([], date(2025, 1, 1), date(2025, 1, 31), date(2025, 1, 15))
+    assert data['kpis']['total_servicios'] == 0
+    assert data['kpis']['promedio_servicio'] == 0
+    assert data['daily'] == data['services'] == data['workers'] == []
+
+
+class RecordingCursor:
+    """Cursor que guarda cada sentencia con sus parámetros"""
+    
+    def __init__(self, rowcount=0):
+        self.statements = []
+        self.rowcount = rowcount
+    
+    def execute(self, query, params=None):
+        self.statements.append((' '.join(query.split()), params))
+    
+    def executemany(self, query, rows):
+        self.statements.append((' '.join(query.split()), list(rows)))
+        self.rowcount = len(rows)
+
+
+@requires_mysql
+def test_daily_summary_applies_the_sign_to_every_total():
+    from database.daily_summary import DailySummary
+    cursor = RecordingCursor()
+    
+    DailySummary(None).subtract(cursor, [7, 9])
+    upsert, params = cursor.statements[0]
+    assert upsert.startswith("INSERT INTO resumen_diario")
+    assert "WHERE id IN (%s, %s)" in upsert
+    assert "ON DUPLICATE KEY UPDATE" in upsert
+    assert params == (-1, -1, -1, -1, 7, 9)
+    # Los grupos que quedan en cero se eliminan
+    assert cursor.statements[1][0].startswith("DELETE FROM resumen_diario WHERE cantidad <= 0")
+
+
+@requires_mysql
+def test_daily_summary_insert_batch_repopulates_the_affected_days():
+    from database.daily_summary import DailySummary
+    cursor = RecordingCursor()
+    rows = [{'fecha': '2025-10-02'}, {'fecha': '2025-10-01'}, {'fecha': '2025-10-02'}]
+    
+    inserted = DailySummary(None).insert_registros(cursor, "INSERT INTO registros ...", rows)
+    assert inserted == 3
+    delete, delete_params = cursor.statements[1]
+    insert, insert_params = cursor.statements[2]
+    assert delete == "DELETE FROM resumen_diario WHERE fecha IN (%s, %s)"
+    assert delete_params == ['2025-10-01', '2025-10-02']
+    assert "UPDATE" not in insert
+    assert insert_params == (1, 1, 1, 1, '2025-10-01', '2025-10-02')
+
+
+@requires_mysql
+def test_daily_summary_update_moves_the_row_between_groups():
+    from database.daily_summary import DailySummary
+    cursor = RecordingCursor()
+    
+    DailySummary(None).apply_update(cursor, 5, "UPDATE registros SET pago = %s WHERE id = %s", ('Pagado', 5))
+    signs = [params[0] for query, params in cursor.statements if query.startswith("INSERT")]
+    assert signs == [-1, 1]
+    assert ("UPDATE registros SET pago = %s WHERE id = %s", ('Pagado', 5)) in cursor.statements
+
+
+
+class FakeDashboardDatabase:
+    """Responde las filas del período y las de hoy por separado"""
+    
+    def __init__(self, period_rows, today_rows):
+        self.period_rows = period_rows
+        self.today_rows = today_rows
+        self.calls = []
+    
+    def execute_query(self, query, params=None):
+        from src.admin.dashboard_data import DashboardDataProvider
+        self.calls.append((query, params))
+        if query == DashboardDataProvider.PERIOD_QUERY:
+            return list(self.period_rows)
+        if query == DashboardDataProvider.TODAY_QUERY:
+            return list(self.today_rows)
+        return []
+
+
+def test_dashboard_fetches_today_apart_only_outside_the_period():
+    from datetime import date
+    from src.admin.dashboard_data import DashboardDataProvider
+    today_row = {'dia': date(2025, 11, 5), 'vehiculo_nombre': 'Camión', 'id_lavador': 1,
+                 'lavador': 'Lavador 1', 'cantidad': 4, 'ingresos': 200000,
+                 'comisiones': 100000, 'ganancia': 100000}
+    database = FakeDashboardDatabase([], [today_row])
+    
+    data = DashboardDataProvider(database).fetch('2025-10-01', '2025-10-31', date(2025, 11, 5))
+    queries = [query for query, _ in database.calls]
+    assert "OR" not in DashboardDataProvider.PERIOD_QUERY
+    assert database.calls[0][1] == (date(2025, 10, 1), date(2025, 10, 31))
+    assert queries[1] == DashboardDataProvider.TODAY_QUERY
+    assert data['servicios_hoy'] == 4
+    assert data['kpis']['total_servicios'] == 0
+    
+    # Con hoy dentro del período basta el rango
+    database.calls.clear()
+    DashboardDataProvider(database).fetch('2025-11-01', '2025-11-30', date(2025, 11, 5))
+    assert DashboardDataProvider.TODAY_QUERY not in [query for query, _ in database.calls]
+
+HISTORIAL_FILTERS = {
+    'fecha_inicio': '2025-10-01',
+    'fecha_fin': '2025-10-31',
+    'id_lavador': None,
+    'vehiculo': 'Todos',
+    'servicio': 'Todos',
+    'estado_pago': 'Todos'
+}
+
+
+def test_historial_first_page_is_newest_first():
+    from src.admin.historial_data import HistorialQuery
+    query, params = HistorialQuery(HISTORIAL_FILTERS).rows_query(limit=200)
+    assert "fecha >= %s AND fecha <= %s" in query
+    assert query.endswith("ORDER BY fecha DESC, hora DESC, id DESC LIMIT %s")
+    assert params == ['2025-10-01', '2025-10-31', 200]
+
+
+def test_historial_keyset_pages_after_and_before_the_edge_row():
+    from src.admin.historial_data import HistorialQuery
+    historial = HistorialQuery(dict(HISTORIAL_FILTERS, id_lavador=3))
+    edge = {'fecha': '2025-10-15', 'hora': '09:30:00', 'id': 42}
+    
+    older, older_params = historial.rows_query(after=edge, limit=50)
+    assert "fecha < %s" in older and "id < %s" in older
+    assert "ORDER BY fecha DESC" in older
+    assert older_params == ['2025-10-01', '2025-10-31', 3,
+                            '2025-10-15', '2025-10-15', '09:30:00', '09:30:00', 42, 50]
+    
+    # La página anterior se pide ascendente y se invierte al pintarla
+    newer, _ = historial.rows_query(before=edge, limit=50)
+    assert "fecha > %s" in newer and "id > %s" in newer
+    assert "ORDER BY fecha ASC, hora ASC, id ASC" in newer
+
+
+def test_historial_copies_the_filters():
+    from src.admin.historial_data import HistorialQuery
+    filters = dict(HISTORIAL_FILTERS)
+    historial = HistorialQuery(filters)
+    filters['estado_pago'] = 'Pendiente'
+    assert "pago = %s" not in historial.where
+
+
+def test_historial_stats_share_the_filter_of_the_rows():
+    from src.admin.historial_data import HistorialQuery
+    historial = HistorialQuery(dict(HISTORIAL_FILTERS, vehiculo='Automóvil', estado_pago='Pendiente'))
+    query, params = historial.stats_query()
+    
+    assert f"WHERE {historial.where}" in query
+    assert "vehiculo_nombre = %s AND pago = %s" in historial.where
+    assert params == ['2025-10-01', '2025-10-31', 'Automóvil', 'Pendiente']
+    for column in ('total_registros', 'total_ingresos', 'total_comisiones',
+                   'ganancia_neta', 'promedio_servicio', 'servicios_pendientes'):
+        assert f" as {column}" in query
+    assert "LIMIT" not in query
+
+
+EXPORT_COLUMNS = [
+    ('Fecha', 'fecha', 'date', 12),
+    ('Hora', 'hora', 'time', 8),
+    ('Costo', 'costo', 'money', 12)
+]
+
+
+def test_export_csv_streams_every_batch(tmp_path):
+    from datetime import date, timedelta
+    from src.utils.export import ExportJob, TableExporter
+    job = ExportJob(str(tmp_path / 'historial.csv'), total=3)
+    batches = iter([
+        [{'fecha': date(2025, 10, 1), 'hora': timedelta(hours=9, minutes=5), 'costo': 20000}],
+        [{'fecha': date(2025, 10, 2), 'hora': timedelta(hours=25), 'costo': 15000},
+         {'fecha': date(2025, 10, 2), 'hora': None, 'costo': 0}]
+    ])
+    
+    TableExporter(EXPORT_COLUMNS, 'Historial').export(job, batches)
+    assert job.format == 'csv'
+    assert job.written == 3
+    with open(job.filename, encoding='utf-8-sig') as f:
+        lines = f.read().splitlines()
+    # TIME llega como timedelta y puede pasar de 24 horas
+    assert lines == ['Fecha,Hora,Costo', '2025-10-01,09:05:00,20000',
+                     '2025-10-02,01:00:00,15000', '2025-10-02,,0']
+
+
+def test_export_cancelled_removes_the_partial_file(tmp_path):
+    from src.utils.export import ExportCancelled, ExportJob, TableExporter
+    job = ExportJob(str(tmp_path / 'historial.csv'))
+    closed = []
+    
+    def batches():
+        try:
+            yield [{'fecha': None, 'hora': None, 'costo': 1}]
+            job.cancel()
+            yield [{'fecha': None, 'hora': None, 'costo': 2}]
+        finally:
+            closed.append(True)
+    
+    with pytest.raises(ExportCancelled):
+        TableExporter(EXPORT_COLUMNS, 'Historial').export(job, batches())
+    assert job.written == 1
+    assert not (tmp_path / 'historial.csv').exists()
+    # El generador (y el cursor del servidor detrás) se cierra
+    assert closed == [True]
+
+
+def test_debouncer_runs_only_the_last_trigger():
+    from src.utils.debounce import Debouncer
+    widget = FakeRoot()
+    calls, cancels = [], []
+    debouncer = Debouncer(widget, calls.append, delay=400, on_trigger=lambda: cancels.append(True))
+    
+    for text in ('A', 'AB', 'ABC'):
+        debouncer.trigger(text)
+    assert debouncer.pending
+    assert len(widget.scheduled) == 1
+    # Cada tecla cancela la consulta en curso
+    assert len(cancels) == 3
+    
+    widget.run_pending()
+    assert calls == ['ABC']
+    assert not debouncer.pending
+
+
+def test_debouncer_run_now_discards_the_pending_call():
+    from src.utils.debounce import Debouncer
+    widget = FakeRoot()
+    calls = []
+    debouncer = Debouncer(widget, calls.append)
+    
+    debouncer.trigger('viejo')
+    debouncer.run_now('buscar')
+    widget.run_pending()
+    assert calls == ['buscar']
+    
+    debouncer.trigger('cancelado')
+    debouncer.cancel()
+    widget.run_pending()
+    assert calls == ['buscar']
+
+
+class FakeLockCursor:
+    """Cursor de la conexión que toma el candado de migraciones"""
+    
+    def __init__(self, log, granted):
+        self.log = log
+        self.granted = granted
+    
+    def execute(self, query, params=None):
+        self.log.append(query.split('(')[0])
+    
+    def fetchone(self):
+        return (1 if self.granted else 0,)
+    
+    def close(self):
+        pass
+
+
+class FakeMigrationDatabase:
+    """Base de prueba para MigrationRunner: versiones leídas en orden y sentencias registradas"""
+    
+    def __init__(self, versions, granted=True):
+        self.versions = list(versions)
+        self.granted = granted
+        self.log = []
+        self.cursor = RecordingCursor()
+    
+    def execute_query(self, query, params=None):
+        self.log.append('version')
+        return [{'version': self.versions.pop(0)}]
+    
+    @contextmanager
+    def transaction(self):
+        yield self.cursor
+    
+    @contextmanager
+    def connection(self):
+        connection = type('Connection', (), {})()
+        connection.cursor = lambda: FakeLockCursor(self.log, self.granted)
+        yield connection
+
+
+MIGRATION_STEPS = [
+    (1, "Uno", ["CREATE TABLE uno (id INT)"]),
+    (2, "Dos", ["CREATE TABLE dos (id INT)"])
+]
+
+
+@requires_mysql
+def test_migrations_apply_under_the_lock_and_ignore_recorded_versions():
+    from database.migrations import MigrationRunner
+    database = FakeMigrationDatabase([0, 1])
+    
+    assert MigrationRunner(database, MIGRATION_STEPS).run()
+    # La versión se relee con el candado tomado y solo queda la 2
+    assert database.log == ['version', 'SELECT GET_LOCK', 'version', 'SELECT RELEASE_LOCK']
+    statements = [query for query, _ in database.cursor.statements]
+    assert "CREATE TABLE uno (id INT)" not in statements
+    assert "CREATE TABLE dos (id INT)" in statements
+    assert database.cursor.statements[-1] == (
+        "INSERT IGNORE INTO schema_migrations (version, descripcion) VALUES (%s, %s)", [(2, "Dos")]
+    )
+
+
+@requires_mysql
+def test_migrations_applied_by_another_terminal_while_waiting():
+    from database.migrations import MigrationRunner
+    database = FakeMigrationDatabase([0, 2])
+    
+    assert MigrationRunner(database, MIGRATION_STEPS).run()
+    assert database.log[-1] == 'SELECT RELEASE_LOCK'
+    assert len(database.cursor.statements) == 1  # solo CREATE TABLE schema_migrations
+
+
+@requires_mysql
+def test_migrations_fail_when_the_lock_times_out():
+    from database.migrations import MigrationRunner
+    database = FakeMigrationDatabase([0], granted=False)
+    
+    assert not MigrationRunner(database, MIGRATION_STEPS).run()
+    assert 'SELECT RELEASE_LOCK' not in database.log
+
+
+class SchemaCursor(RecordingCursor):
+    """Cursor que responde las consultas a information_schema con un conteo fijo"""
+    
+    def __init__(self, total):
+        super().__init__()
+        self.total = total
+    
+    def fetchone(self):
+        return {'total': self.total}
+
+
+@requires_mysql
+def test_lavador_backfill_runs_only_while_the_text_column_exists():
+    from database.migrations import backfill_lavadores
+    
+    done = SchemaCursor(total=0)
+    backfill_lavadores(done)
+    assert len(done.statements) == 1
+    
+    pending = SchemaCursor(total=1)
+    backfill_lavadores(pending)
+    insert, update = [query for query, _ in pending.statements[1:]]
+    # Los nombres huérfanos se crean como lavadores inactivos
+    assert insert.startswith("INSERT INTO lavadores (nombre, apellido, activo)")
+    assert "WHERE r.id_lavador IS NULL" in insert
+    assert update.startswith("UPDATE registros r JOIN")
+    assert update.endswith("SET r.id_lavador = l.id WHERE r.id_lavador IS NULL")
+
+
+@requires_mysql
+def test_lavador_foreign_key_is_added_once():
+    from database.migrations import add_foreign_key
+    step = add_foreign_key('registros', 'fk_registros_lavador', 'id_lavador', 'lavadores(id)')
+    
+    missing = SchemaCursor(total=0)
+    step(missing)
+    assert missing.statements[-1][0] == (
+        "ALTER TABLE registros ADD CONSTRAINT fk_registros_lavador "
+        "FOREIGN KEY (id_lavador) REFERENCES lavadores(id)"
+    )
+    
+    existing = SchemaCursor(total=1)
+    step(existing)
+    assert len(existing.statements) == 1
+
+
+class FakeCatalogDatabase:
+    """Catálogo de prueba; verifica que ninguna consulta corra con el candado tomado"""
+    
+    def __init__(self):
+        self.cache = None
+        self.version = 1
+        self.queries = 0
+        self.during_load = None
+    
+    def execute_query(self, query, params=None):
+        assert not self.cache._lock.locked()
+        self.queries += 1
+        if 'COUNT(*)' in query:
+            return [{'servicios': self.version}] if self.version else None
+        if 'FROM servicio_precios' in query:
+            if self.during_load:
+                self.during_load()
+            return [
+                {'id_servicio': 1, 'tipo_vehiculo': 'car', 'precio': 30000},
+                {'id_servicio': 2, 'tipo_vehiculo': 'car', 'precio': 20000},
+                {'id_servicio': 1, 'tipo_vehiculo': 'motorcycle', 'precio': 15000}
+            ]
+        if 'FROM servicios' in query:
+            return [{'id': 1, 'nombre': 'Completo', 'descripcion': ''},
+                    {'id': 2, 'nombre': 'Básico', 'descripcion': ''}]
+        return [{'id': 1, 'nombre_completo': 'Ana Díaz', 'activo': 1},
+                {'id': 2, 'nombre_completo': 'Luis Gil', 'activo': 0}]
+
+
+@pytest.fixture
+def catalog_db():
+    from database.catalog import CatalogCache
+    database = FakeCatalogDatabase()
+    database.cache = CatalogCache(database, ttl=0)
+    return database
+
+
+@requires_mysql
+def test_catalog_indexes_services_prices_and_lavadores(catalog_db):
+    cache = catalog_db.cache
+    assert [s['nombre'] for s in cache.services_for_vehicle('car')] == ['Básico', 'Completo']
+    assert cache.prices_for_service('1') == {'car': 30000, 'motorcycle': 15000}
+    assert [(row['servicio_id'], row['tipo_vehiculo']) for row in cache.price_matrix()] == [
+        (1, 'motorcycle'), (1, 'car'), (2, 'car')
+    ]
+    assert [l['id'] for l in cache.lavadores()] == [1]
+    assert [l['id'] for l in cache.lavadores(include_ids=(2,))] == [1, 2]
+
+
+@requires_mysql
+def test_catalog_reloads_only_when_the_version_changes(catalog_db):
+    cache = catalog_db.cache
+    cache.price_matrix()
+    loaded = catalog_db.queries
+    
+    # TTL vencido con la misma versión: solo la consulta de versión
+    cache.price_matrix()
+    assert catalog_db.queries == loaded + 1
+    
+    catalog_db.version = 2
+    cache.price_matrix()
+    assert catalog_db.queries == loaded + 1 + 4
+    
+    # Sin conexión se sigue sirviendo el catálogo conocido
+    catalog_db.version = None
+    assert cache.price_matrix()
+
+
+@requires_mysql
+def test_catalog_invalidated_during_a_load_is_not_published(catalog_db):
+    cache = catalog_db.cache
+    catalog_db.during_load = cache.invalidate
+    
+    assert cache.price_matrix()
+    assert cache._data is None
+    
+    catalog_db.during_load = None
+    cache.price_matrix()
+    assert cache._data is not None
+
+
+@requires_mysql
+def test_daily_summary_sums_the_rounded_amount_of_each_registro():
+    from database.daily_summary import DailySummary
+    from database.materialized import MaterializedColumns
+    from database.migrations import MIGRATIONS, REBUILD_SUMMARY
+    
+    for column in ('comision_calculada', 'ganancia_neta'):
+        assert f"SUM({MaterializedColumns.DEFINITIONS[column]})" in DailySummary.AGGREGATE_SELECT
+    # La tabla ya poblada se reconstruye con la definición nueva
+    version, _, steps = MIGRATIONS[-1]
+    assert version == 11 and steps == [REBUILD_SUMMARY]
+
+
+def test_canvas_chart_reuses_its_items_between_loads(tk_root):
+    from src.ui.components import CanvasChart
+    chart = CanvasChart(tk_root)
+    
+    chart.update_rows([
+        {'label': 'Lun', 'value': '$40,000', 'fraction': 1},
+        {'label': 'Mar', 'value': '$20,000', 'fraction': 0.5},
+        {'label': 'Mié', 'value': '$0', 'fraction': 0}
+    ])
+    items = chart.find_all()
+    
+    chart.update_rows([{'label': 'Jue', 'value': '$10,000', 'fraction': 1, 'marker': '1.'}])
+    # Mismos ítems: se cambia el texto y se ocultan las filas sobrantes
+    assert chart.find_all() == items
+    first, *rest = chart._items
+    assert chart.itemcget(first['label'], 'text') == 'Jue'
+    assert chart.itemcget(first['marker'], 'text') == '1.'
+    assert all(chart.itemcget(item, 'state') == 'hidden' for row in rest for item in row.values())
+    assert chart.itemcget(chart._empty, 'state') == 'hidden'
+    
+    chart.update_rows([])
+    assert chart.find_all() == items
+    assert chart.itemcget(chart._empty, 'state') == 'normal'
+
+
+class FakeFrame:
+    """tk.Frame mínimo para la caché de módulos"""
+    
+    def __init__(self, parent, bg=None):
+        self.visible = False
+        self.destroyed = False
+    
+    def pack(self, **kwargs):
+        self.visible = True
+    
+    def pack_forget(self):
+        self.visible = False
+    
+    def destroy(self):
+        self.destroyed = True
+
+
+class FakeModule:
+    def __init__(self, module_id, frame):
+        self.module_id = module_id
+        self.frame = frame
+        self.refreshes = 0
+        self.cleaned = False
+    
+    def refresh(self):
+        self.refreshes += 1
+    
+    def cleanup(self):
+        self.cleaned = True
+
+
+class FakeClock:
+    """Reemplazo del módulo time con un reloj que se avanza a mano"""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def modules(monkeypatch):
+    from src.utils import module_cache
+    monkeypatch.setattr(module_cache.tk, 'Frame', FakeFrame)
+    return module_cache.ModuleCache(None, FakeModule, max_alive=2)
+
+
+def test_module_cache_keeps_recent_modules_alive(modules):
+    dashboard = modules.show('dashboard')
+    historial = modules.show('historial')
+    assert not dashboard.frame.visible and historial.frame.visible
+    
+    # Volver a un módulo vivo no lo reconstruye ni lo refresca
+    assert modules.show('dashboard') is dashboard
+    assert dashboard.frame.visible and dashboard.refreshes == 0
+    
+    # El menos usado se destruye al pasar de max_alive
+    modules.show('usuarios')
+    assert historial.cleaned and historial.frame.destroyed
+    assert modules.get('historial') is None
+    assert modules.get('dashboard') is dashboard
+
+
+def test_module_cache_refreshes_invalidated_or_stale_modules(modules, monkeypatch):
+    from src.utils import module_cache
+    clock = FakeClock()
+    monkeypatch.setattr(module_cache, 'time', clock)
+    
+    dashboard = modules.show('dashboard')
+    modules.show('historial')
+    modules.invalidate('dashboard')
+    modules.show('dashboard')
+    assert dashboard.refreshes == 1
+    
+    dashboard.STALE_AFTER = 60
+    clock.now += 30
+    modules.show('historial')
+    modules.show('dashboard')
+    assert dashboard.refreshes == 1
+    
+    clock.now += 61
+    modules.show('historial')
+    modules.show('dashboard')
+    assert dashboard.refreshes == 2
+
+
+@requires_mysql
+def test_saving_services_refreshes_dashboard_and_historial_on_return(modules):
+    from src.admin.admin_panel import AdminPanel
+    panel = AdminPanel.__new__(AdminPanel)
+    panel.module_cache = modules
+    
+    dashboard = modules.show('dashboard')
+    servicios = modules.show('servicios')
+    panel.on_module_data_changed('servicios')
+    
+    modules.show('dashboard')
+    assert dashboard.refreshes == 1
+    # El módulo que guardó ya tiene sus datos al día
+    modules.show('servicios')
+    assert servicios.refreshes == 0
+
+
+def test_module_cache_preload_never_evicts_the_visible_module(modules):
+    visible = modules.show('dashboard')
+    assert modules.preload('historial') is not None
+    assert not modules.get('historial').frame.visible
+    
+    # Lleno: el precargado entra como el menos usado y es el primero en salir
+    modules.show('historial')
+    assert modules.preload('servicios') is None
+    assert modules.get('dashboard') is visible
+    
+    modules.clear()
+    assert modules.current is None
+    assert visible.cleaned
@@ -0,0 +1,175 @@
+"""
+Pruebas del arranque y del login: imports diferidos, conexión inicial y contraseñas
+"""
+
+import subprocess
+import sys
+
+import pytest
+
+from conftest import FakeRoot, requires_mysql
+
+
+@requires_mysql
+def test_startup_defers_panels_and_heavy_dependencies():
+    from bench_startup import DEFERRED_MODULES, ROOT, STARTUP_CODE
+    code = STARTUP_CODE + "; print('\\n'.join(sys.modules))"
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True)
+    
+    assert result.returncode == 0, result.stderr
+    imported = set(result.stdout.split())
+    assert 'main' in imported
+    assert not imported & set(DEFERRED_MODULES)
+
+
+@requires_mysql
+def test_startup_retries_the_connection_with_exponential_backoff(monkeypatch):
+    import main
+    warnings = []
+    monkeypatch.setattr(main.messagebox, 'showwarning', lambda *args: warnings.append(args))
+    app = main.LaundryApp()
+    app.root = FakeRoot()
+    
+    for attempt in range(1, 8):
+        app.connect_attempts = attempt
+        app.on_database_result('sin_conexion')
+        # Solo se avisa una vez, al llegar a CONNECT_WARN_AFTER intentos
+        assert len(warnings) == (1 if attempt >= app.CONNECT_WARN_AFTER else 0)
+    
+    assert [delay for delay, _ in app.root.scheduled.values()] == [1000, 2000, 4000, 8000, 16000, 30000, 30000]
+    assert all(callback == app.connect_database for _, callback in app.root.scheduled.values())
+
+
+@requires_mysql
+def test_startup_closes_when_the_schema_cannot_be_migrated(monkeypatch):
+    import main
+    from database import migrations
+    errors = []
+    monkeypatch.setattr(main.messagebox, 'showerror', lambda *args: errors.append(args))
+    monkeypatch.setattr(main.db, 'test_connection', lambda: True)
+    monkeypatch.setattr(migrations.migrations, 'run', lambda: False)
+    app = main.LaundryApp()
+    app.root = FakeRoot()
+    
+    status = app.initialize_database()
+    assert status == 'esquema'
+    app.on_database_result(status)
+    assert errors and app.root.destroyed
+    assert app.root.scheduled == {}
+    
+    monkeypatch.setattr(main.db, 'test_connection', lambda: False)
+    assert app.initialize_database() == 'sin_conexion'
+
+
+class Connection:
+    def close(self):
+        pass
+
+
+@requires_mysql
+def test_connect_probe_uses_the_connect_timeout_only(monkeypatch, mysql_server):
+    from database import db_config
+    calls = []
+    
+    def connect(**kwargs):
+        calls.append(kwargs)
+        return Connection()
+    
+    monkeypatch.setattr(db_config.mysql.connector, 'connect', connect)
+    database = db_config.DatabaseConfig()
+    database.connect_timeout = 2.5
+    assert not database.ready
+    
+    assert database.connect()
+    assert database.ready
+    database.pool.acquire()
+    # La prueba falla rápido; las conexiones del pool no heredan ese timeout,
+    # el chequeo de socket previo las acota sin dejarlo en cada consulta
+    assert calls[0]['connection_timeout'] == 2.5
+    assert 'connection_timeout' not in calls[1]
+    assert mysql_server.connections == [((database.host, database.port), 2.5)]
+
+
+@requires_mysql
+def test_pool_reconnect_after_a_drop_fails_within_the_connect_timeout(monkeypatch, mysql_server):
+    import socket
+    from mysql.connector import errors
+    from database import db_config
+    from database.journal import is_retryable
+    calls = []
+    
+    def connect(**kwargs):
+        calls.append(kwargs)
+        return Connection()
+    
+    monkeypatch.setattr(db_config.mysql.connector, 'connect', connect)
+    database = db_config.DatabaseConfig()
+    database.connect_timeout = 2.5
+    assert database.connect()
+    
+    # El servidor cae a mitad de sesión: el pool no tiene conexiones ociosas
+    mysql_server.error = socket.timeout("timed out")
+    with pytest.raises(errors.InterfaceError) as raised:
+        database.pool.acquire()
+    
+    # Solo la prueba inicial llegó al conector; la reconexión cortó en el socket
+    assert len(calls) == 1
+    assert mysql_server.connections[-1] == ((database.host, database.port), 2.5)
+    assert is_retryable(raised.value)
+    # El cupo del préstamo fallido se devuelve al pool
+    assert database.pool._slots._value == database.pool.size
+
+
+@requires_mysql
+def test_needs_rehash_for_plain_text_and_other_costs(monkeypatch):
+    from src.auth import passwords
+    monkeypatch.setattr(passwords, 'BCRYPT_ROUNDS', 12)
+    
+    assert passwords.needs_rehash('secreto')
+    assert passwords.needs_rehash('')
+    assert passwords.needs_rehash('$2b$10$' + 'a' * 53)
+    assert not passwords.needs_rehash('$2b$12$' + 'a' * 53)
+    assert not passwords.needs_rehash('$2y$12$' + 'a' * 53)
+    assert passwords.needs_rehash('$2b$xx$')
+
+
+@requires_mysql
+def test_verify_password_with_legacy_plain_text():
+    from src.auth.passwords import verify_password
+    assert verify_password('secreto', 'secreto')
+    assert not verify_password('Secreto', 'secreto')
+    assert not verify_password('', None)
+
+
+@requires_mysql
+def test_verify_and_hash_with_bcrypt():
+    pytest.importorskip('bcrypt')
+    from src.auth.passwords import hash_password, needs_rehash, verify_password
+    
+    stored = hash_password('secreto', rounds=4)
+    assert stored.startswith('$2b$04$')
+    assert verify_password('secreto', stored)
+    assert not verify_password('otro', stored)
+    assert needs_rehash(stored)
+    # Un hash dañado no lanza: simplemente no coincide
+    assert not verify_password('secreto', '$2b$04$dañado')
+
+
+@requires_mysql
+def test_rehash_does_not_overwrite_a_changed_password(monkeypatch):
+    from src.auth import passwords
+    updates = []
+    
+    class Database:
+        def execute_update(self, query, params):
+            updates.append((' '.join(query.split()), params))
+            return 0
+    
+    monkeypatch.setattr(passwords, 'db', Database())
+    monkeypatch.setattr(passwords, 'hash_password', lambda password: 'nuevo-hash')
+    
+    assert passwords._rehash(7, 'secreto', 'secreto') == 0
+    assert updates == [(
+        "UPDATE usuarios SET password = %s WHERE id = %s AND password = %s",
+        ('nuevo-hash', 7, 'secreto')
+    )]
@@ -0,0 +1,716 @@
+"""
+Pruebas del lado secretario: cola de envío, diario local, réplica, historial y placas
+No necesitan un servidor MySQL: las conexiones son objetos de prueba.
+"""
+
+from contextlib import contextmanager
+
+import pytest
+
+from conftest import FakeRoot, requires_mysql
+
+
+class FakeJournal:
+    """Diario en memoria con el replay que se le indique"""
+    
+    def __init__(self):
+        self.ops = []
+        self.replays = 0
+        self.error = None
+    
+    def append(self, tipo, datos, registro_id=None):
+        op_uuid = f"op-{self.replays}-{len(self.ops)}"
+        self.ops.append((op_uuid, tipo, datos))
+        return op_uuid
+    
+    def count(self, estado='pendiente'):
+        return len(self.ops) if estado == 'pendiente' else 0
+    
+    def status(self, op_uuid):
+        from database.journal import APLICADA, PENDIENTE
+        return PENDIENTE if any(op[0] == op_uuid for op in self.ops) else APLICADA
+    
+    def submit(self, tipo, datos, registro_id=None):
+        raise AssertionError("submit() no debe aplicar en MySQL desde el hilo de Tk")
+    
+    def replay(self):
+        self.replays += 1
+        if self.error:
+            raise self.error
+        applied, self.ops = len(self.ops), []
+        return applied, 0
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    from src.utils.background import BackgroundExecutor
+    from secretary import register_queue
+    root = FakeRoot()
+    executor = BackgroundExecutor(max_workers=1)
+    executor.bind(root)
+    monkeypatch.setattr(register_queue, 'background', executor)
+    
+    queue = register_queue.RegistrationQueue(FakeJournal(), batch_size=3, flush_delay=3000, retry_delay=5000)
+    queue.bind(root)
+    queue.root = root
+    queue.executor = executor
+    yield queue
+    executor.shutdown()
+
+
+def finish_flush(queue):
+    """Esperar el replay en el hilo de trabajo y entregar su resultado"""
+    queue._task.future.exception(timeout=2)
+    queue.root.run_pending()
+
+
+@requires_mysql
+def test_queue_sends_a_batch_when_it_fills_up(queue):
+    queue.add({'placa': 'AAA111'})
+    queue.add({'placa': 'BBB222'})
+    # Por debajo del lote solo queda el temporizador
+    assert queue.journal.replays == 0
+    assert queue.root.delays() == [3000]
+    
+    queue.add({'placa': 'CCC333'})
+    assert queue.flushing
+    finish_flush(queue)
+    assert queue.journal.replays == 1
+    assert queue.count == 0
+    assert not queue.flushing
+
+
+@requires_mysql
+def test_queue_retries_later_while_offline(queue):
+    from mysql.connector import errors
+    queue.journal.error = errors.InterfaceError("Servidor caído")
+    for placa in ('AAA111', 'BBB222', 'CCC333'):
+        queue.add({'placa': placa})
+    finish_flush(queue)
+    
+    assert queue.offline
+    assert queue.count == 3
+    assert queue.root.delays() == [5000]
+    
+    # Sin conexión, llenar el lote no fuerza otro envío inmediato
+    queue.add({'placa': 'DDD444'})
+    assert not queue.flushing
+    
+    queue.journal.error = None
+    queue.root.run_pending()
+    finish_flush(queue)
+    assert not queue.offline
+    assert queue.count == 0
+
+
+@requires_mysql
+def test_queue_submit_sends_in_the_background_and_reports_the_result(queue):
+    from mysql.connector import errors
+    from database.journal import APLICADA, PENDIENTE
+    results = []
+    
+    queue.submit('update', {'placa': 'AAA111'}, 7, callback=results.append)
+    # El hilo de Tk solo escribió en el diario; el envío ya está en curso
+    assert queue.flushing and results == []
+    
+    # Lo que llega durante el envío sale en el siguiente, sin esperar el lote
+    queue.submit('delete', {}, 8, callback=results.append)
+    while queue.flushing:
+        finish_flush(queue)
+    assert results == [APLICADA, APLICADA]
+    assert queue.count == 0
+    
+    # Sin conexión la operación queda en el diario y se reintenta más tarde
+    queue.journal.error = errors.InterfaceError("Servidor caído")
+    queue.submit('delete', {}, 9, callback=results.append)
+    finish_flush(queue)
+    assert results[-1] == PENDIENTE
+    assert queue.count == 1
+    assert queue.root.delays() == [5000]
+
+
+class FakeRegistrosCursor:
+    """Cursor de MySQL que guarda los registros insertados"""
+    
+    def __init__(self, database):
+        self.database = database
+        self.rowcount = 0
+    
+    def execute(self, query, params=None):
+        if query.strip().startswith("DELETE FROM registros"):
+            self.database.deleted.append(params[0])
+    
+    def executemany(self, query, rows):
+        if self.database.error:
+            raise self.database.error
+        if any(row['placa'] == 'MAL' for row in rows):
+            from mysql.connector import errors
+            raise errors.DatabaseError("Servicio inexistente")
+        self.database.inserted.extend(rows)
+        self.rowcount = len(rows)
+    
+    def fetchall(self):
+        return []
+
+
+class FakeRegistrosDatabase:
+    """MySQL de prueba para el diario: error de conexión a pedido"""
+    
+    def __init__(self):
+        self.inserted = []
+        self.deleted = []
+        self.error = None
+    
+    @contextmanager
+    def transaction(self):
+        if self.error:
+            raise self.error
+        yield FakeRegistrosCursor(self)
+
+
+def registro(placa):
+    return {
+        'fecha': '2025-10-01', 'hora': '10:00:00', 'vehiculo': 'car', 'vehiculo_nombre': 'Automóvil',
+        'placa': placa, 'id_servicio': 1, 'servicio_nombre': 'Básico', 'costo': 20000,
+        'porcentaje': 50, 'comision_calculada': '10000.00', 'ganancia_neta': '10000.00',
+        'id_lavador': 1, 'lavador_nombre': 'Ana Díaz', 'observaciones': '', 'pago': 'Pendiente',
+        'id_usuario': 1, 'usuario_nombre': 'Secretaria'
+    }
+
+
+@pytest.fixture
+def journal(tmp_path):
+    from database.journal import OfflineJournal
+    database = FakeRegistrosDatabase()
+    journal = OfflineJournal(database, str(tmp_path / 'diario_local.sqlite3'))
+    journal.database = database
+    return journal
+
+
+@requires_mysql
+def test_journal_keeps_operations_on_disk_until_replayed(journal, tmp_path):
+    from mysql.connector import errors
+    from database.journal import APLICADA, PENDIENTE, OfflineJournal
+    journal.database.error = errors.InterfaceError("Servidor caído")
+    
+    assert journal.submit('insert', registro('AAA111')) == PENDIENTE
+    journal.database.error = None
+    # Con operaciones pendientes, las nuevas van detrás aunque haya conexión
+    assert journal.submit('delete', {}, registro_id=7) == PENDIENTE
+    
+    # Otra instancia sobre el mismo archivo (reinicio de la aplicación)
+    reopened = OfflineJournal(journal.database, journal.path)
+    pending = reopened.pending()
+    assert [op['tipo'] for op in pending] == ['insert', 'delete']
+    
+    assert reopened.replay() == (2, 0)
+    assert reopened.count() == 0
+    # El INSERT lleva el uuid de la operación: reenviarlo no lo duplica
+    assert journal.database.inserted[0]['uuid'] == pending[0]['uuid']
+    assert journal.database.deleted == [7]
+    assert journal.submit('insert', registro('BBB222')) == APLICADA
+
+
+@requires_mysql
+def test_journal_sets_aside_rejected_operations(journal):
+    from database.journal import APLICADA
+    uuids = [journal.append('insert', registro(placa)) for placa in ('AAA111', 'MAL', 'CCC333')]
+    
+    # El lote falla; se reintenta de a una y solo se aparta la inválida
+    assert journal.replay() == (2, 1)
+    assert [row['placa'] for row in journal.database.inserted] == ['AAA111', 'CCC333']
+    assert journal.count() == 0
+    assert journal.count('rechazada') == 1
+    assert [journal.status(op_uuid) for op_uuid in uuids] == [APLICADA, 'rechazada', APLICADA]
+
+
+@requires_mysql
+def test_journal_replay_stops_on_a_connection_error(journal):
+    from mysql.connector import errors
+    journal.append('insert', registro('AAA111'))
+    journal.database.error = errors.OperationalError("Conexión perdida")
+    
+    with pytest.raises(errors.OperationalError):
+        journal.replay()
+    assert journal.count() == 1
+
+
+class FakeReplicaCursor:
+    """Cursor que responde las consultas de sincronización de la réplica"""
+    
+    def __init__(self, database):
+        self.database = database
+        self.result = []
+    
+    def execute(self, query, params=()):
+        from database.replica import LocalReplica
+        rows = self.database.rows
+        self.database.queries.append(query)
+        if query == LocalReplica.COUNT_QUERY:
+            self.result = [{'registros': sum(row['fecha'] >= params[0] for row in rows)}]
+        elif query == LocalReplica.CHANGES_QUERY:
+            since, cutoff = params
+            self.result = [row for row in rows if row['actualizado_en'] >= since and row['fecha'] >= cutoff]
+        elif query.startswith("SELECT id FROM"):
+            self.result = [{'id': row['id']} for row in rows if row['fecha'] >= params[0]]
+        elif "WHERE id IN" in query:
+            self.result = [row for row in rows if row['id'] in params]
+        else:
+            self.result = [row for row in rows if row['fecha'] >= params[0]]
+    
+    def fetchone(self):
+        return self.result[0]
+    
+    def fetchall(self):
+        return list(self.result)
+
+
+class FakeReplicaDatabase:
+    """MySQL de prueba con la tabla registros en una lista"""
+    
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+        self.online = True
+    
+    @contextmanager
+    def transaction(self):
+        if not self.online:
+            from mysql.connector import errors
+            raise errors.InterfaceError("Servidor caído")
+        yield FakeReplicaCursor(self)
+
+
+def remote_row(id_, days_ago, placa, pago='Pendiente', updated=None):
+    from datetime import date, datetime, timedelta
+    from decimal import Decimal
+    return {
+        'id': id_, 'fecha': date.today() - timedelta(days=days_ago), 'hora': timedelta(hours=9, minutes=id_),
+        'vehiculo': 'car', 'vehiculo_nombre': 'Automóvil', 'placa': placa, 'placa_normalizada': placa,
+        'id_servicio': 1, 'servicio_nombre': 'Básico', 'costo': Decimal('20000.00'),
+        'porcentaje': Decimal('50.00'), 'comision_calculada': Decimal('10000.00'),
+        'ganancia_neta': Decimal('10000.00'), 'id_lavador': 1, 'lavador_nombre': 'Ana Díaz',
+        'pago': pago, 'usuario_nombre': 'Secretaria',
+        'actualizado_en': updated or datetime(2025, 1, 1, 12, 0, 0)
+    }
+
+
+@pytest.fixture
+def replica(tmp_path):
+    from database.replica import LocalReplica
+    database = FakeReplicaDatabase([remote_row(1, 0, 'AAA111'), remote_row(2, 3, 'BBB222'),
+                                    remote_row(3, 45, 'CCC333')])
+    replica = LocalReplica(database, str(tmp_path / 'replica_local.sqlite3'), days=30, max_age=10)
+    replica.database = database
+    return replica
+
+
+@requires_mysql
+def test_replica_loads_the_period_with_mysql_types(replica):
+    from datetime import date, timedelta
+    assert replica.covers(date.today().isoformat())
+    assert not replica.covers((date.today() - timedelta(days=45)).isoformat())
+    
+    rows = replica.execute_query(
+        "SELECT id, fecha, hora, lavador FROM vista_registros_completos WHERE placa_normalizada = %s",
+        ('AAA111',)
+    )
+    assert rows == [{'id': 1, 'fecha': date.today(), 'hora': timedelta(hours=9, minutes=1),
+                     'lavador': 'Ana Díaz'}]
+    # La fila de hace 45 días queda fuera del período
+    assert replica.execute_query("SELECT COUNT(*) as total FROM registros")[0]['total'] == 2
+
+
+@requires_mysql
+def test_replica_syncs_changes_and_deletions_incrementally(replica):
+    from datetime import datetime
+    from database.replica import LocalReplica
+    replica.sync()
+    database = replica.database
+    
+    database.rows[0] = remote_row(1, 0, 'AAA111', pago='Pagado', updated=datetime(2025, 1, 2, 8, 0, 0))
+    del database.rows[1]
+    replica.mark_stale()
+    database.queries.clear()
+    assert replica.sync()
+    
+    assert LocalReplica.CHANGES_QUERY in database.queries
+    rows = replica.execute_query("SELECT id, pago FROM registros ORDER BY id")
+    assert rows == [{'id': 1, 'pago': 'Pagado'}]
+
+
+@requires_mysql
+def test_replica_without_a_first_sync_does_not_answer(replica):
+    replica.database.online = False
+    assert not replica.sync()
+    assert not replica.covers()
+    assert replica.execute_query("SELECT * FROM registros") is None
+
+
+@requires_mysql
+def test_calculated_fields_round_half_up_like_mysql():
+    from database.materialized import calculated_fields
+    
+    fields = calculated_fields(12345, '33.33', 'car')
+    assert fields == {'comision_calculada': '4114.59', 'ganancia_neta': '8230.41',
+                      'vehiculo_nombre': 'Automóvil'}
+    # 5.025 sube a 5.03 (ROUND de MySQL con DECIMAL), no queda en 5.02
+    assert calculated_fields('10.05', 50, 'motorcycle')['comision_calculada'] == '5.03'
+    assert calculated_fields(None, None, 'otro') == {
+        'comision_calculada': '0.00', 'ganancia_neta': '0.00', 'vehiculo_nombre': None
+    }
+
+
+@requires_mysql
+def test_history_next_page_starts_after_the_last_loaded_row():
+    from datetime import date, timedelta
+    from secretary.history_data import HistoryQuery
+    history = HistoryQuery({'fecha': '', 'placa': '', 'id_lavador': 3})
+    
+    query, params = history.rows_query(limit=100)
+    assert query.endswith("ORDER BY fecha DESC, hora DESC, id DESC LIMIT %s")
+    assert "id_lavador = %s" in query
+    assert params == [3, 100]
+    
+    last = {'fecha': date(2025, 10, 1), 'hora': timedelta(hours=8, minutes=5), 'id': 77}
+    query, params = history.rows_query(after=last, limit=100)
+    assert "fecha < %s" in query and "hora < %s" in query and "id < %s" in query
+    # Fecha y hora como texto: la réplica SQLite compara igual que MySQL
+    assert params == [3, '2025-10-01', '2025-10-01', '08:05:00', '08:05:00', 77, 100]
+
+
+@requires_mysql
+def test_history_filters_by_the_plates_found_in_the_index():
+    from secretary.history_data import HistoryQuery
+    
+    found = HistoryQuery({'fecha': '2025-10-01', 'placa': 'abc', 'id_lavador': None,
+                          'placas': ['ABC123', 'ABC12D']})
+    assert found.where == "1=1 AND fecha = %s AND placa_normalizada IN (%s, %s)"
+    assert found.params == ['2025-10-01', 'ABC123', 'ABC12D']
+    
+    # Ninguna placa coincide: la consulta no devuelve filas
+    none = HistoryQuery({'fecha': '', 'placa': 'zzz', 'id_lavador': None, 'placas': []})
+    assert none.where == "1=1 AND placa_normalizada IN (NULL)"
+    
+    # Sin índice (demasiadas placas) se filtra por LIKE con el texto normalizado
+    like = HistoryQuery({'fecha': '', 'placa': 'ab-1', 'id_lavador': None})
+    assert like.params == ['%AB1%']
+
+
+class FakePlatesDatabase:
+    """Placas de registros; verifica que ninguna consulta corra con el candado tomado"""
+    
+    def __init__(self, plates):
+        from datetime import datetime
+        self.index = None
+        self.plates = list(plates)
+        self.watermark = datetime(2025, 10, 1, 8, 0, 0)
+        self.queries = []
+        self.online = True
+    
+    def execute_query(self, query, params=None):
+        assert not self.index._lock.locked()
+        if not self.online:
+            return None
+        self.queries.append(query.split()[1])
+        if 'MAX(actualizado_en)' in query:
+            return [{'actualizado_en': self.watermark}]
+        return [{'placa_normalizada': plate} for plate in self.plates]
+
+
+@pytest.fixture
+def plates():
+    from database.plates import PlateIndex
+    database = FakePlatesDatabase(['ABC123', 'ABC12D', 'XYZ789', 'BCA321'])
+    database.index = PlateIndex(database, ttl=0)
+    return database
+
+
+@requires_mysql
+def test_normalize_plate_matches_the_generated_column():
+    from database.plates import normalize_plate
+    # UPPER(REPLACE(REPLACE(TRIM(placa), ' ', ''), '-', ''))
+    assert normalize_plate(' abc-123 ') == 'ABC123'
+    assert normalize_plate('ab c1 2-3') == 'ABC123'
+    assert normalize_plate('ABC.123') == 'ABC.123'
+    assert normalize_plate(None) == ''
+
+
+@requires_mysql
+def test_one_edit_apart():
+    from database.plates import one_edit_apart
+    assert one_edit_apart('ABC123', 'ABC123')
+    assert one_edit_apart('ABC123', 'ABD123')
+    assert one_edit_apart('ABC123', 'ABC1234')
+    assert one_edit_apart('ABC123', 'AC123')
+    assert not one_edit_apart('ABC123', 'ACB123')
+    assert not one_edit_apart('ABC123', 'ABC1')
+
+
+@requires_mysql
+def test_plate_search_by_prefix_content_and_one_typo(plates):
+    index = plates.index
+    # Menos de tres letras: prefijo
+    assert index.search('ab') == (['ABC123', 'ABC12D'], False)
+    # Trigramas: contenido en cualquier posición
+    assert index.search('c12') == (['ABC123', 'ABC12D'], False)
+    assert index.search('bc', limit=1) == (['BCA321'], False)
+    # Sin coincidencias, una placa completa con un error devuelve las parecidas
+    assert index.search('XYZ78') == (['XYZ789'], False)
+    assert index.search('XYW789') == (['XYZ789'], True)
+    assert index.search('QQQ999') == ([], False)
+
+
+@requires_mysql
+def test_plate_index_refresh_adds_only_new_plates(plates):
+    from datetime import timedelta
+    index = plates.index
+    index.refresh()
+    assert plates.queries == ['MAX(actualizado_en)', 'DISTINCT']
+    
+    # Misma marca: solo la consulta de la marca
+    plates.queries.clear()
+    index.refresh()
+    assert plates.queries == ['MAX(actualizado_en)']
+    
+    plates.plates = ['NEW001']
+    plates.watermark += timedelta(minutes=5)
+    index.refresh()
+    assert len(index) == 5
+    assert index.search('NEW') == (['NEW001'], False)
+    
+    # Sin conexión se sigue buscando en lo cargado
+    plates.online = False
+    assert index.search('XYZ') == (['XYZ789'], False)
+
+
+class FakeVisitsDatabase:
+    """Filas de resumen_placas por servicio de cada placa"""
+    
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+    
+    def execute_query(self, query, params=None):
+        self.queries += 1
+        return self.rows.get(params[0], [])
+
+
+@requires_mysql
+def test_plate_visits_summarize_and_cache_per_plate():
+    from datetime import date
+    from decimal import Decimal
+    from database.plate_summary import PlateSummary
+    
+    def row(servicio, cantidad, total, primera, ultima):
+        return {'servicio': servicio, 'cantidad': cantidad, 'total_costo': Decimal(total),
+                'primera_visita': date(2025, *primera), 'ultima_visita': date(2025, *ultima)}
+    
+    database = FakeVisitsDatabase({'ABC123': [
+        row('Básico', 3, '60000', (1, 5), (9, 1)),
+        row('Completo', 3, '90000', (2, 1), (10, 2)),
+        row(None, 1, '15000', (3, 3), (3, 3))
+    ]})
+    summary = PlateSummary(database, cache_size=1, ttl=60)
+    
+    visits = summary.visits('abc-123')
+    assert visits == {
+        'placa': 'ABC123', 'visitas': 7, 'gasto_total': Decimal('165000'),
+        'primera_visita': date(2025, 1, 5), 'ultima_visita': date(2025, 10, 2),
+        # Empate en cantidad: gana el de la visita más reciente
+        'servicio_favorito': 'Completo', 'veces_favorito': 3
+    }
+    assert summary.visits('ABC 123') is visits
+    assert database.queries == 1
+    
+    # Una placa que nunca vino también se guarda en la caché (de tamaño 1)
+    assert summary.visits('ZZZ999') is None
+    summary.visits('ABC123')
+    assert database.queries == 3
+    
+    summary.invalidate(['abc123'])
+    summary.visits('ABC123')
+    assert database.queries == 4
+
+
+class FakeTree:
+    """ttk.Treeview mínimo que cuenta las llamadas a Tcl"""
+    
+    def __init__(self):
+        self.rows = {}
+        self.order = []
+        self.calls = []
+        self.idle = []
+        self.next_iid = 0
+    
+    def get_children(self):
+        return tuple(self.order)
+    
+    def delete(self, *iids):
+        self.calls.append('delete')
+        for iid in iids:
+            self.order.remove(iid)
+            del self.rows[iid]
+    
+    def insert(self, parent, index, iid=None, values=(), tags=()):
+        self.calls.append('insert')
+        if iid is None:
+            self.next_iid += 1
+            iid = f"I{self.next_iid:03d}"
+        self.rows[iid] = (values, tags)
+        self.order.insert(len(self.order) if index == 'end' else index, iid)
+        return iid
+    
+    def exists(self, iid):
+        return iid in self.rows
+    
+    def item(self, iid, values, tags):
+        self.calls.append('item')
+        self.rows[iid] = (values, tags)
+    
+    def move(self, iid, parent, index):
+        self.calls.append('move')
+        self.order.remove(iid)
+        self.order.insert(index, iid)
+    
+    def after_idle(self, callback):
+        self.idle.append(callback)
+        return f"idle#{len(self.idle)}"
+    
+    def after_cancel(self, after_id):
+        self.idle.clear()
+    
+    def run_idle(self):
+        while self.idle:
+            self.idle.pop(0)()
+
+
+def test_treeview_filler_inserts_in_chunks():
+    from src.ui.components import TreeviewFiller
+    tree = FakeTree()
+    filler = TreeviewFiller(tree, chunk_size=2, time_slice=10)
+    
+    filler.replace([((n,), ()) for n in range(5)])
+    # La primera tanda se pinta de inmediato, el resto con after_idle
+    assert len(tree.order) == 2 and filler.pending
+    tree.run_idle()
+    assert [tree.rows[iid][0] for iid in tree.order] == [(n,) for n in range(5)]
+    
+    # replace() borra todo en una sola llamada
+    tree.calls.clear()
+    filler.replace([(('nuevo',), ('pendiente',))])
+    assert tree.calls == ['delete', 'insert']
+    assert [tree.rows[iid] for iid in tree.order] == [(('nuevo',), ('pendiente',))]
+
+
+def test_treeview_filler_sync_touches_only_changed_rows():
+    from src.ui.components import TreeviewFiller
+    tree = FakeTree()
+    filler = TreeviewFiller(tree, chunk_size=100, time_slice=10)
+    filler.sync([(1, ('a',), ()), (2, ('b',), ()), (3, ('c',), ())])
+    
+    tree.calls.clear()
+    filler.sync([(4, ('d',), ()), (1, ('a',), ()), (3, ('C',), ('editado',))])
+    assert tree.order == ['4', '1', '3']
+    assert tree.rows['3'] == (('C',), ('editado',))
+    # Se borra la 2, se inserta la 4 y se actualiza la 3; la 1 no se toca
+    assert sorted(tree.calls) == ['delete', 'insert', 'item']
+
+
+def test_treeview_filler_cancel_keeps_what_was_painted():
+    from src.ui.components import TreeviewFiller
+    tree = FakeTree()
+    filler = TreeviewFiller(tree, chunk_size=2, time_slice=10)
+    
+    filler.replace([((n,), ()) for n in range(6)])
+    filler.cancel()
+    tree.run_idle()
+    assert len(tree.order) == 2
+    assert not filler.pending
+
+
+class FakeFrame:
+    """tk.Frame mínimo para la caché de módulos"""
+    
+    def __init__(self, parent, bg=None):
+        self.visible = False
+    
+    def pack(self, **kwargs):
+        self.visible = True
+    
+    def pack_forget(self):
+        self.visible = False
+    
+    def destroy(self):
+        pass
+
+
+class FakeCashModule:
+    """Cierre de caja que cuenta las cargas anticipadas"""
+    
+    def __init__(self, busy=False):
+        self.prefetches = 0
+        self.refreshes = 0
+        self.busy = busy
+    
+    def prefetch(self):
+        if self.busy:
+            return False
+        self.prefetches += 1
+        return True
+    
+    def refresh(self):
+        self.refreshes += 1
+
+
+@pytest.fixture
+def panel(monkeypatch):
+    from src.utils import module_cache
+    from secretary.secretary_panel import SecretaryPanel
+    monkeypatch.setattr(module_cache.tk, 'Frame', FakeFrame)
+    
+    # Sin setup_ui(): solo la navegación entre módulos, sin ventana
+    panel = SecretaryPanel.__new__(SecretaryPanel)
+    panel.parent = FakeRoot()
+    panel._prefetch_after = None
+    panel.modules = {'register': object(), 'history': object(), 'cash': FakeCashModule()}
+    panel.module_cache = module_cache.ModuleCache(None, lambda name, frame: panel.modules[name])
+    panel.module_cache.show('register')
+    panel.module_cache.preload('cash')
+    return panel
+
+
+@requires_mysql
+def test_panel_prefetches_the_hidden_cash_close_while_registering(panel):
+    from secretary.secretary_panel import SecretaryPanel
+    cash = panel.modules['cash']
+    panel.module_cache.invalidate('cash')
+    
+    panel.prefetch_cash()
+    assert cash.prefetches == 1
+    assert panel.parent.delays() == [SecretaryPanel.CASH_PREFETCH_INTERVAL]
+    
+    # Ya está al día: al abrir el cierre no se vuelve a cargar
+    panel.module_cache.show('cash')
+    assert cash.refreshes == 0
+
+
+@requires_mysql
+def test_panel_prefetch_only_runs_from_the_register_screen(panel):
+    from secretary.secretary_panel import SecretaryPanel
+    cash = panel.modules['cash']
+    panel.module_cache.show('history')
+    
+    panel.prefetch_cash()
+    assert cash.prefetches == 0
+    
+    # Un registro adelanta la próxima actualización y reemplaza la programada
+    panel.schedule_cash_prefetch(SecretaryPanel.CASH_PREFETCH_DELAY)
+    assert panel.parent.delays() == [SecretaryPanel.CASH_PREFETCH_DELAY]
+    
+    cash.busy = True
+    panel.module_cache.show('register')
+    panel.module_cache.invalidate('cash')
+    panel.parent.run_pending()
+    # Con una carga en curso no se marca como fresco
+    assert panel.module_cache._entries['cash']['stale']